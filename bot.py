@@ -3,34 +3,37 @@ import importlib
 import discord
 from discord.ext import commands
 from pathlib import Path
-import json
 import shutil
 import asyncio
 # Now import Logger after the logs directory has been cleared.
 from helpers.Logger import Logger
-
-Logger.set_debug(True)
+from helpers.RateLimit import RestQueue, MAX_RATELIMIT_TIMEOUT
+from helpers.Storage import Database
+from helpers.Users import UserResolver
+from helpers.Dispatcher import MessageDispatcher
+from helpers.Settings import get_settings
+from helpers.EmbeddingWorker import get_embedding_worker
+from helpers.Metrics import MESSAGE_HANDLING_SECONDS, start_metrics_server, count_discord_rate_limits
+from helpers.Tracing import tracer, setup_tracing
 
 # Set a custom NLTK data path and add it to NLTK paths.
 NLTK_DATA_PATH = Path(".\\.venv\\nltk_data")
 import nltk
 nltk.data.path.append(str(NLTK_DATA_PATH))
 
-# Load settings from settings.json.
-settings_path = Path("./settings.json")
-with open(settings_path, "r", encoding="utf-8") as f:
-    settings = json.load(f)
-    # Get bot environment
-    environment = settings["bot"]["environment"]
-    
-    if environment == "development":
-        # Get the bot token from the settings.json file.
-        bot_token = settings["tokens"]["bot_token_development"]
-        guild_id = settings["guild_development"]["guild_id"]
-    else:
-        # Get the bot token from settings.json.
-        bot_token = settings["tokens"]["bot_token_production"]
-        guild_id = settings["guild_production"]["guild_id"]
+# Load settings.json once; cogs read it through bot.settings.
+settings = get_settings()
+# Get bot environment
+environment = settings.environment
+
+if environment == "development":
+    # Get the bot token from the settings.json file.
+    bot_token = settings["tokens"]["bot_token_development"]
+    guild_id = settings["guild_development"]["guild_id"]
+else:
+    # Get the bot token from settings.json.
+    bot_token = settings["tokens"]["bot_token_production"]
+    guild_id = settings["guild_production"]["guild_id"]
 
 # Clear the logs directory BEFORE the Logger is loaded.
 logs_dir = Path("./logs")
@@ -41,6 +44,20 @@ if environment == "development":
     except Exception as e:
         print(f"Failed to clear logs directory {logs_dir}: {e}")
 
+# The base level and optional outputs such as JSON-lines logs come from the "logging" settings section.
+Logger.configure(settings.get("logging", {}))
+# Development always logs everything, including the moderation and AI payloads.
+if environment == "development":
+    Logger.set_debug(True)
+# Per-message logs have their own level ("logging.levels.on_message") so they can be turned down.
+message_log = Logger.get("on_message")
+# Prometheus endpoint, only when "metrics.enabled" is set.
+start_metrics_server(settings.get("metrics", {}))
+# discord.py handles 429s inside its HTTP client; they are counted from its log records.
+count_discord_rate_limits()
+# OpenTelemetry spans, exported over OTLP or to a local file when "tracing.enabled" is set.
+setup_tracing(settings.get("tracing", {}))
+
 # Clear all __pycache__ directories in the root and subdirectories.
 pycache_dirs = list(Path(".").rglob("__pycache__"))
 if environment == "development":
@@ -55,7 +72,7 @@ if environment == "development":
 command_prefix = "!"
 
 class Client(commands.Bot):
-    def __init__(self):
+    def __init__(self, database: Database = None):
         intents = discord.Intents.default()
         intents.messages = True
         intents.guilds = True
@@ -63,9 +80,40 @@ class Client(commands.Bot):
         intents.message_content = True
         intents.members = True
         self.youtube_credentials = None
-        super().__init__(command_prefix=command_prefix, intents=intents)
+        # Long rate limits raise discord.RateLimited instead of silently stalling the call; RestQueue backs off.
+        super().__init__(command_prefix=command_prefix, intents=intents, max_ratelimit_timeout=MAX_RATELIMIT_TIMEOUT)
         # Store global settings in the bot instance for later reference
         self.settings = settings
+        # Shared rate-limit-aware queue for background Discord REST calls.
+        self.rest_queue = RestQueue()
+        # Shared SQLite database used by the repositories in helpers/Repositories.py.
+        self.database = database or Database()
+        # Cached, concurrent user lookups for places that need more than a mention.
+        self.user_resolver = UserResolver(self)
+        # AI replies and moderation run as concurrent, supervised tasks per message.
+        self.dispatcher = MessageDispatcher()
+        # Wiki indexing and AI channel queries embed text in a separate worker process.
+        self.embeddings = get_embedding_worker()
+        self.dispatcher.register("ai", self.process_ai, self.wants_ai,
+                                 timeout=settings.ai.handler_timeout)
+        self.dispatcher.register("moderation", self.process_moderation, self.wants_moderation,
+                                 timeout=settings.get("moderation", {}).get("handler_timeout", 30))
+        self.settings.subscribe(self.on_settings_reloaded)
+
+    async def setup_hook(self):
+        # Pick up edits to settings.json without a restart.
+        self.settings.start_watching()
+
+    def on_settings_reloaded(self, settings):
+        self.dispatcher.register("ai", self.process_ai, self.wants_ai, timeout=settings.ai.handler_timeout)
+        self.dispatcher.register("moderation", self.process_moderation, self.wants_moderation,
+                                 timeout=settings.get("moderation", {}).get("handler_timeout", 30))
+
+    async def close(self):
+        await self.settings.close()
+        await self.dispatcher.close()
+        await self.embeddings.close()
+        await super().close()
 
     async def on_ready(self):
         Logger.info("-----------------------------")
@@ -129,53 +177,56 @@ class Client(commands.Bot):
         await asyncio.to_thread(nltk.download, 'all', download_dir=str(NLTK_DATA_PATH), quiet=True)
         Logger.info("NLTK resources downloaded successfully.")
 
+    def ai_channel_id(self):
+        ai = self.settings.ai
+        return ai.development_channel if self.settings.bot.is_development else ai.production_channel
+
+    def wants_ai(self, message) -> bool:
+        # Cheap checks only: this runs for every message before anything is scheduled.
+        if not self.settings.ai.enabled or message.author.bot:
+            return False
+        target_channel_id = self.ai_channel_id()
+        return bool(target_channel_id) and message.channel.id == target_channel_id
+
+    def wants_moderation(self, message) -> bool:
+        mod_cog = self.get_cog("AutoModeration")
+        return mod_cog is not None and mod_cog.should_moderate(message)
+
     async def process_ai(self, message):
-        if self.settings["ai"]["enabled"]:
-            try:
-                # Reference settings stored in the bot instance.
-                env = self.settings["bot"]["environment"]
-                if env == "development":
-                    target_channel_id = self.settings["ai"].get("development_channel")
-                else:
-                    target_channel_id = self.settings["ai"].get("production_channel")
-                Logger.debug(f"Target AI channel id is {target_channel_id} for environment {env}")
-                if target_channel_id and message.channel.id == target_channel_id:
-                    Logger.info(f"Message received in target AI channel {target_channel_id}; invoking AIHelper.pong for user {message.author}")
-                    AI = self.get_cog("AIHelper")
-                    if AI:
-                        await AI.pong(message)
-                    else:
-                        Logger.error("AIHelper cog not loaded.")
-            except Exception as e:
-                Logger.error(f"Error processing AI in on_message: {e}")
+        message_log.info("Message received in target AI channel %s; invoking AIHelper.pong for user %s", message.channel.id, message.author)
+        AI = self.get_cog("AIHelper")
+        if AI:
+            await AI.pong(message)
         else:
-            Logger.warning("AI is currently turned off. I'm not going to process this message through AI.")
+            Logger.error("AIHelper cog not loaded.")
 
     async def process_moderation(self, message):
-        try:
-            mod_cog = self.get_cog("AutoModeration")
-            if mod_cog:
-                await mod_cog.process_moderation(message)
-            else:
-                Logger.error("AutoModeration cog not loaded.")
-        except Exception as e:
-            Logger.error(f"Error processing moderation in on_message: {e}")
+        mod_cog = self.get_cog("AutoModeration")
+        if mod_cog:
+            await mod_cog.process_moderation(message)
+        else:
+            Logger.error("AutoModeration cog not loaded.")
 
     async def on_message(self, message):
-        Logger.debug(f"Received message from {message.author} in channel {message.channel.id}")
-        try:
+        message_log.debug("Received message from %s in channel %s", message.author, message.channel.id)
+        with MESSAGE_HANDLING_SECONDS.time(), tracer.start_as_current_span("on_message") as span:
+            span.set_attribute("discord.channel_id", message.channel.id)
+            span.set_attribute("discord.message_length", len(message.content))
             # Prevent responding to its own messages.
             if message.author == self.user:
                 return
-            # Process AI related messages.
-            await self.process_ai(message)
-            # Process AutoModeration.
-            await self.process_moderation(message)
-        except Exception as e:
-            Logger.error(f"Error processing on_message event: {e}")
-        # Ensure commands still get processed.
-        await self.process_commands(message)
-
-client = Client()
-client.guild_id = guild_id  # Assign the guild ID to the bot instance.
-client.run(bot_token)
\ No newline at end of file
+            try:
+                # AI and moderation run in the background; neither waits for the other.
+                handlers = self.dispatcher.dispatch(message)
+                span.set_attribute("dispatch.handlers", len(handlers))
+            except Exception as e:
+                Logger.error(f"Error dispatching on_message event: {e}")
+            # Commands are processed right away, not after the handlers finish.
+            with tracer.start_as_current_span("on_message.process_commands"):
+                await self.process_commands(message)
+
+if __name__ == "__main__":
+    # Importing this module (e.g. from tools/replay.py) defines Client without connecting.
+    client = Client()
+    client.guild_id = guild_id  # Assign the guild ID to the bot instance.
+    client.run(bot_token)
\ No newline at end of file
@@ -1,170 +1,128 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import asyncio
-import os
-from pathlib import Path
 from helpers.Logger import Logger
-
-# Define the file paths.
-SETTINGS_PATH = Path("./settings.json")
-WAITLIST_FILE_PATH = Path("./data/Guild/waitlist.json")
-
-# Utility function to load settings.
-def load_settings() -> dict:
-    try:
-        with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
-            settings = json.load(f)
-        Logger.info("Loaded settings.json successfully in Signup command.")
-        return settings
-    except Exception as e:
-        Logger.error("Error loading settings.json: " + str(e))
-        return {}
-
-# Utility function to save settings.
-def save_settings(settings: dict) -> None:
-    try:
-        with open(SETTINGS_PATH, "w", encoding="utf-8") as f:
-            json.dump(settings, f, indent=4)
-        Logger.info("Updated settings.json with new values.")
-    except Exception as e:
-        Logger.error("Error saving settings.json: " + str(e))
-
-# Utility function to load waitlist data.
-def load_waitlist() -> list:
-    if not WAITLIST_FILE_PATH.exists():
-        Logger.info("Waitlist file does not exist. Creating new waitlist.")
-        return []
-    try:
-        with open(WAITLIST_FILE_PATH, "r", encoding="utf-8") as f:
-            waitlist = json.load(f)
-        Logger.info("Loaded waitlist data successfully.")
-        return waitlist
-    except Exception as e:
-        Logger.error("Error loading waitlist.json: " + str(e))
-        return []
-
-# Utility function to save waitlist data.
-def save_waitlist(waitlist: list) -> None:
-    try:
-        os.makedirs(WAITLIST_FILE_PATH.parent, exist_ok=True)
-        with open(WAITLIST_FILE_PATH, "w", encoding="utf-8") as f:
-            json.dump(waitlist, f, indent=4)
-        Logger.info("Saved waitlist data successfully.")
-    except Exception as e:
-        Logger.error("Error saving waitlist.json: " + str(e))
-
-# Function to update the waitlist embed message.
-# It uses the stored waitlist_message_id and waitlist_channel_id from settings["waitlist"].
-async def update_waitlist_embed(bot: commands.Bot, waitlist: list, settings: dict):
-    try:
-        waitlist_message_id = settings.get("waitlist", {}).get("waitlist_message_id", 0)
-        channel_id = settings.get("waitlist", {}).get("waitlist_channel_id")
-        if waitlist_message_id == 0 or channel_id is None:
-            Logger.error("Waitlist embed message ID or channel ID is not set in settings.json.")
-            return
-        channel = bot.get_channel(channel_id)
-        if channel is None:
-            Logger.error("Waitlist channel not found during embed update.")
-            return
-        message = await channel.fetch_message(waitlist_message_id)
-        # Construct the updated embed.
-        mentions = []
-        for uid in waitlist:
-            user = bot.get_user(uid) or await bot.fetch_user(uid)
-            mentions.append(user.mention)
-        waitlist_str = "\n".join(mentions) if mentions else "No Players Yet..."
-        player_count = len(waitlist)
-        # Use the existing embed as a basis (or create a new one if absent).
-        embed = message.embeds[0] if message.embeds else discord.Embed(
-            title="Hateocracy 2 Guild Waitlist",
-            description="Click below to sign up for the Hateocracy 2 guild waitlist",
-            color=discord.Color.blue()
-        )
-        if embed.fields:
-            embed.set_field_at(0, name="Current Waitlist", value=waitlist_str, inline=False)
-        else:
-            embed.add_field(name="Current Waitlist", value=waitlist_str, inline=False)
-        embed.set_footer(text=f"Players {player_count}/30")
-        # Edit the message with the updated embed and persistent view.
-        await message.edit(embed=embed, view=WaitlistView(bot, settings))
-        Logger.info(f"Updated waitlist embed message (ID: {waitlist_message_id}) with {player_count} player(s).")
-    except Exception as e:
-        Logger.error("Error updating waitlist embed: " + str(e))
+from helpers.Repositories import WaitlistRepository
+from helpers.Waitlist import WaitlistRenderer, WaitlistService, build_waitlist_embed
 
 # Define a view with buttons for joining and leaving the waitlist.
 class WaitlistView(discord.ui.View):
-    def __init__(self, bot: commands.Bot, settings: dict):
+    def __init__(self, bot: commands.Bot, settings):
         # Set timeout to None for a persistent view.
         super().__init__(timeout=None)
         self.bot = bot
         self.settings = settings
 
+    def waitlist_role(self, guild: discord.Guild):
+        waitlist_role_id = self.settings.waitlist.waitlist_role
+        if not waitlist_role_id or guild is None:
+            return None
+        role = guild.get_role(waitlist_role_id)
+        if role is None:
+            Logger.error("Waitlist role not found in the guild.")
+        return role
+
+    def render(self):
+        service = self.bot.waitlist_service
+        self.bot.waitlist_renderer.request(service.members, service.queued)
+
     @discord.ui.button(label="Join Waitlist", style=discord.ButtonStyle.green, custom_id="join_waitlist")
     async def join_waitlist(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
-            waitlist = load_waitlist()
-            user_id = interaction.user.id
-            if user_id in waitlist:
+            # The service serialises changes, so simultaneous clicks cannot lose entries.
+            result = await self.bot.waitlist_service.join(interaction.user.id)
+            if result == "already_joined":
                 Logger.info(f"User {interaction.user} attempted to join waitlist but is already in it.")
                 await interaction.response.send_message("You are already in the waitlist.", ephemeral=True)
                 return
-            waitlist.append(user_id)
-            save_waitlist(waitlist)
+            if result == "already_queued":
+                await interaction.response.send_message("The waitlist is full and you are already in the queue.", ephemeral=True)
+                return
+            if result == "queued":
+                Logger.info(f"User {interaction.user} queued for the full waitlist.")
+                await interaction.response.send_message("The waitlist is full; you have been queued and will be added when a spot opens.", ephemeral=True)
+                self.render()
+                return
             Logger.info(f"User {interaction.user} added to waitlist.")
-            # Add the waitlist role to the user.
-            waitlist_role_id = self.settings.get("waitlist", {}).get("waitlist_role")
-            if waitlist_role_id and interaction.guild:
-                role = interaction.guild.get_role(waitlist_role_id)
-                if role:
-                    await interaction.user.add_roles(role, reason="Joined waitlist")
-                    Logger.info(f"Assigned waitlist role to {interaction.user}.")
-                else:
-                    Logger.error("Waitlist role not found in the guild.")
-            await update_waitlist_embed(self.bot, waitlist, self.settings)
+            # Confirm right away; the role and embed updates happen after the response.
             await interaction.response.send_message("You have joined the waitlist.", ephemeral=True)
+            self.render()
+            # Add the waitlist role to the user.
+            role = self.waitlist_role(interaction.guild)
+            if role:
+                await interaction.user.add_roles(role, reason="Joined waitlist")
+                Logger.info(f"Assigned waitlist role to {interaction.user}.")
         except Exception as e:
             Logger.error("Error in join_waitlist callback: " + str(e))
-            await interaction.response.send_message("Something went wrong. Error Code: JOIN_FAIL", ephemeral=True)
+            if not interaction.response.is_done():
+                await interaction.response.send_message("Something went wrong. Error Code: JOIN_FAIL", ephemeral=True)
 
     @discord.ui.button(label="Leave Waitlist", style=discord.ButtonStyle.red, custom_id="leave_waitlist")
     async def leave_waitlist(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
-            waitlist = load_waitlist()
-            user_id = interaction.user.id
-            if user_id not in waitlist:
+            result, promoted = await self.bot.waitlist_service.leave(interaction.user.id)
+            if result == "missing":
                 Logger.info(f"User {interaction.user} attempted to leave waitlist but was not in it.")
                 await interaction.response.send_message("You are not in the waitlist.", ephemeral=True)
                 return
-            waitlist.remove(user_id)
-            save_waitlist(waitlist)
+            if result == "left_queue":
+                Logger.info(f"User {interaction.user} left the waitlist queue.")
+                await interaction.response.send_message("You have left the waitlist queue.", ephemeral=True)
+                self.render()
+                return
             Logger.info(f"User {interaction.user} removed from waitlist.")
-            # Remove the waitlist role from the user.
-            waitlist_role_id = self.settings.get("waitlist", {}).get("waitlist_role")
-            if waitlist_role_id and interaction.guild:
-                role = interaction.guild.get_role(waitlist_role_id)
-                if role:
-                    await interaction.user.remove_roles(role, reason="Left waitlist")
-                    Logger.info(f"Removed waitlist role from {interaction.user}.")
-                else:
-                    Logger.error("Waitlist role not found in the guild.")
-            await update_waitlist_embed(self.bot, waitlist, self.settings)
+            # Confirm right away; the role and embed updates happen after the response.
             await interaction.response.send_message("You have left the waitlist.", ephemeral=True)
+            self.render()
+            role = self.waitlist_role(interaction.guild)
+            if role:
+                # Remove the waitlist role from the user.
+                await interaction.user.remove_roles(role, reason="Left waitlist")
+                Logger.info(f"Removed waitlist role from {interaction.user}.")
+                # Players promoted from the queue get the role in the background.
+                for promoted_id in promoted:
+                    member = interaction.guild.get_member(promoted_id)
+                    if member is not None:
+                        self.bot.rest_queue.submit(lambda member=member: member.add_roles(role, reason="Promoted from waitlist queue"), f"waitlist role for {promoted_id}")
+                    Logger.info(f"User {promoted_id} promoted from the waitlist queue.")
         except Exception as e:
             Logger.error("Error in leave_waitlist callback: " + str(e))
-            await interaction.response.send_message("Something went wrong. Error Code: LEAVE_FAIL", ephemeral=True)
+            if not interaction.response.is_done():
+                await interaction.response.send_message("Something went wrong. Error Code: LEAVE_FAIL", ephemeral=True)
 
 class Signup(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Load settings only once and store them.
-        self.settings = load_settings()
+        # Shared settings service (bot.settings).
+        self.settings = self.bot.settings
         # Cache the admin and developer role IDs from the guild settings.
         self.admin_role = self.settings.get("guild", {}).get("admin_role")
         self.developer_role = self.settings.get("guild", {}).get("developer_role")
         # Register persistent view so that interactions persist through restarts.
-        self.bot.add_view(WaitlistView(self.bot, self.settings))
+        self.view = WaitlistView(self.bot, self.settings)
+        self.bot.add_view(self.view)
+        # Shared with SignupClear: the waitlist state and the renderer that
+        # coalesces embed edits to at most one per interval.
+        self.repository = WaitlistRepository(self.bot.database)
+        waitlist_settings = self.settings.waitlist
+        self.bot.waitlist_service = WaitlistService(self.repository, capacity=waitlist_settings.capacity)
+        self.bot.waitlist_renderer = WaitlistRenderer(self.bot, lambda: self.view, interval=waitlist_settings.edit_interval)
+        self.bot.waitlist_renderer.capacity = self.bot.waitlist_service.capacity
+
+    async def cog_load(self):
+        await self.bot.waitlist_service.load()
+        # The embed's location is runtime state kept in the database; older
+        # installs had it in settings.json, which is imported once here.
+        channel_id, message_id = await self.repository.message_location()
+        if not message_id:
+            legacy = self.settings.get("waitlist", {})
+            channel_id, message_id = legacy.get("waitlist_channel_id"), legacy.get("waitlist_message_id", 0)
+            if message_id:
+                await self.repository.set_message_location(channel_id, message_id)
+        self.bot.waitlist_renderer.set_location(channel_id, message_id)
+
+    async def cog_unload(self):
+        await self.bot.waitlist_service.close()
 
     # Command to post the waitlist embed in the channel where the command was run.
     # Restricted to users with admin or developer roles.
@@ -184,8 +142,8 @@ class Signup(commands.Cog):
             return
 
         try:
-            waitlist_message_id = self.settings.get("waitlist", {}).get("waitlist_message_id", 0)
-            if waitlist_message_id != 0:
+            waitlist_message_id = self.bot.waitlist_renderer.message_id
+            if waitlist_message_id:
                 Logger.info(f"Waitlist embed already exists with message ID {waitlist_message_id}.")
                 await interaction.followup.send("Waitlist embed already exists.", ephemeral=True)
                 return
@@ -198,21 +156,13 @@ class Signup(commands.Cog):
                 return
 
             # Create the waitlist embed.
-            embed = discord.Embed(
-                title="Hateocracy 2 Guild Waitlist",
-                description="Click below to sign up for the Hateocracy 2 guild waitlist",
-                color=discord.Color.blue()
-            )
-            embed.add_field(name="Current Waitlist", value="No Players Yet...", inline=False)
-            embed.set_footer(text="Players 0/30")
-            view = WaitlistView(self.bot, self.settings)
-            message = await channel.send(embed=embed, view=view)
+            service = self.bot.waitlist_service
+            embed = build_waitlist_embed(service.members, service.capacity, service.queued)
+            message = await channel.send(embed=embed, view=self.view)
             Logger.info(f"Posted new waitlist embed in channel {channel.id} with message ID {message.id}.")
-            # Update settings.json with the new waitlist_message_id and waitlist_channel_id.
-            self.settings.setdefault("waitlist", {})
-            self.settings["waitlist"]["waitlist_message_id"] = message.id
-            self.settings["waitlist"]["waitlist_channel_id"] = channel.id
-            save_settings(self.settings)
+            # Remember where the embed lives so later updates can edit it.
+            await self.repository.set_message_location(channel.id, message.id)
+            self.bot.waitlist_renderer.set_location(channel.id, message.id)
             await interaction.followup.send("Waitlist embed posted successfully.", ephemeral=True)
         except Exception as e:
             Logger.error("Failed to post waitlist embed: " + str(e))
@@ -1,97 +1,13 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
-from pathlib import Path
+import asyncio
 from helpers.Logger import Logger
-
-# Define file paths.
-SETTINGS_PATH = Path("./settings.json")
-WAITLIST_FILE_PATH = Path("./data/Guild/waitlist.json")
-
-# Utility function to load settings.
-def load_settings() -> dict:
-    try:
-        with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
-            settings = json.load(f)
-        Logger.info("Loaded settings.json successfully in SignupClear command.")
-        return settings
-    except Exception as e:
-        Logger.error("Error loading settings.json: " + str(e))
-        return {}
-
-# Utility function to save settings.
-def save_settings(settings: dict) -> None:
-    try:
-        with open(SETTINGS_PATH, "w", encoding="utf-8") as f:
-            json.dump(settings, f, indent=4)
-        Logger.info("Updated settings.json with new values in SignupClear command.")
-    except Exception as e:
-        Logger.error("Error saving settings.json: " + str(e))
-
-# Utility function to load waitlist data.
-def load_waitlist() -> list:
-    if not WAITLIST_FILE_PATH.exists():
-        Logger.info("Waitlist file does not exist. Creating a new waitlist.")
-        return []
-    try:
-        with open(WAITLIST_FILE_PATH, "r", encoding="utf-8") as f:
-            waitlist = json.load(f)
-        Logger.info("Loaded waitlist data successfully in SignupClear command.")
-        return waitlist
-    except Exception as e:
-        Logger.error("Error loading waitlist.json: " + str(e))
-        return []
-
-# Utility function to save waitlist data.
-def save_waitlist(waitlist: list) -> None:
-    try:
-        os.makedirs(WAITLIST_FILE_PATH.parent, exist_ok=True)
-        with open(WAITLIST_FILE_PATH, "w", encoding="utf-8") as f:
-            json.dump(waitlist, f, indent=4)
-        Logger.info("Saved waitlist data successfully in SignupClear command.")
-    except Exception as e:
-        Logger.error("Error saving waitlist.json: " + str(e))
-
-# Function to update the original waitlist embed.
-# This function re-reads the settings file so that it uses an updated waitlist_message_id and waitlist_channel_id.
-async def update_waitlist_embed(bot: commands.Bot, settings: dict):
-    try:
-        # Reload settings to get the most up-to-date values.
-        updated_settings = load_settings()
-        waitlist_message_id = updated_settings.get("waitlist", {}).get("waitlist_message_id", 0)
-        if waitlist_message_id == 0:
-            Logger.error("Waitlist embed message ID is not set in settings.json.")
-            return
-        channel_id = updated_settings.get("waitlist", {}).get("waitlist_channel_id")
-        if not channel_id:
-            Logger.error("Waitlist channel ID is not set in settings.json.")
-            return
-        channel = bot.get_channel(channel_id)
-        if channel is None:
-            Logger.error("Waitlist channel not found during waitlist embed update.")
-            return
-        message = await channel.fetch_message(waitlist_message_id)
-        # Prepare the updated embed content.
-        embed = discord.Embed(
-            title="Hateocracy 2 Guild Waitlist",
-            description="Click below to sign up for the Hateocracy 2 guild waitlist",
-            color=discord.Color.blue()
-        )
-        embed.add_field(name="Current Waitlist", value="No Players Yet...", inline=False)
-        embed.set_footer(text="Players 0/30")
-        # Import the original WaitlistView from the Signup cog to restore join/leave buttons.
-        from cogs.Guild.Signup import WaitlistView  # Ensure the path is correct.
-        view = WaitlistView(bot, updated_settings)
-        await message.edit(embed=embed, view=view)
-        Logger.info(f"Waitlist embed (ID: {waitlist_message_id}) updated (cleared) successfully.")
-    except Exception as e:
-        Logger.error("Error updating waitlist embed in SignupClear: " + str(e))
+from helpers.RoleJobs import BulkRoleRemover
 
 # Persistent view for confirming waitlist reset.
 class ConfirmResetView(discord.ui.View):
-    def __init__(self, bot: commands.Bot, settings: dict):
+    def __init__(self, bot: commands.Bot, settings):
         # timeout=None makes the view persistent.
         super().__init__(timeout=None)
         self.bot = bot
@@ -100,13 +16,28 @@ class ConfirmResetView(discord.ui.View):
     @discord.ui.button(label="Confirm Waitlist Reset", style=discord.ButtonStyle.green, custom_id="confirm_waitlist_reset")
     async def confirm_reset(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
-            # Clear the waitlist file.
-            save_waitlist([])  # Write an empty list to clear the waitlist.
-            Logger.info(f"Waitlist file cleared by {interaction.user} via reset command.")
-            # Update the original signup embed (restoring the join/leave buttons).
-            await update_waitlist_embed(self.bot, self.settings)
+            # Clear the shared waitlist service (persists immediately).
+            removed = await self.bot.waitlist_service.clear()
+            Logger.info(f"Waitlist cleared by {interaction.user} via reset command.")
+            # Everyone holding the role plus everyone who was listed, in case the member cache is incomplete.
+            waitlist_role_id = self.settings.waitlist.waitlist_role
+            role = interaction.guild.get_role(waitlist_role_id) if waitlist_role_id and interaction.guild else None
+            holders = set(removed)
+            if role is not None:
+                holders |= {member.id for member in role.members}
             # Send an ephemeral confirmation message without delete_after (ephemeral messages auto-delete).
-            await interaction.response.send_message("Waitlist has been reset.", ephemeral=True)
+            if role is None or not holders:
+                await interaction.response.send_message("Waitlist has been reset.", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"Waitlist has been reset. Removing the waitlist role: 0/{len(holders)}", ephemeral=True)
+            # Reset the original signup embed through the shared renderer (keeps the join/leave buttons).
+            self.bot.waitlist_renderer.request([], 0)
+            if role is not None and holders:
+                async def report_progress(done: int, total: int):
+                    status = "done" if done >= total else "in progress"
+                    await interaction.edit_original_response(content=f"Waitlist has been reset. Removing the waitlist role: {done}/{total} ({status})")
+                # Runs in the background through the rate-limited REST queue and resumes after a restart.
+                await self.bot.role_jobs.start(interaction.guild.id, role.id, list(holders), report_progress)
             Logger.info("Waitlist reset confirmed by user " + str(interaction.user))
         except Exception as e:
             Logger.error("Error in confirm_reset callback: " + str(e))
@@ -118,13 +49,23 @@ class ConfirmResetView(discord.ui.View):
 class SignupClear(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Load settings once and cache them.
-        self.settings = load_settings()
+        # Shared settings service (bot.settings).
+        self.settings = self.bot.settings
         # Cache role IDs for admin and developer from settings["guild"].
         self.admin_role = self.settings.get("guild", {}).get("admin_role")
         self.developer_role = self.settings.get("guild", {}).get("developer_role")
         # Register the persistent view for confirmation so that it works through restarts.
         self.bot.add_view(ConfirmResetView(self.bot, self.settings))
+        # Bulk role removal for resets; unfinished jobs resume once the bot is ready.
+        self.bot.role_jobs = BulkRoleRemover(self.bot)
+        self.resume_task = None
+
+    async def cog_load(self):
+        self.resume_task = asyncio.create_task(self.bot.role_jobs.resume())
+
+    async def cog_unload(self):
+        if self.resume_task is not None:
+            self.resume_task.cancel()
 
     # Slash command /signup-clear; description must be 100 characters or less.
     @app_commands.command(name="signup-clear", description="Clear the waitlist embed and data")
@@ -1,16 +1,16 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
-import pytz
+import datetime
 from helpers.Logger import Logger
-
-REMINDERS_DIR = "./data/Reminders"
+from helpers.Recurrence import Recurrence, UTC
+from helpers.Timezones import TIMEZONES, utc_offset_label
+from helpers.Repositories import ReminderRepository
 
 class Reminder(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self.reminders = ReminderRepository(bot.database)
         Logger.info("Reminder cog initialized successfully.")
 
     @app_commands.command(name="remindme", description="Set reminder time, timezone, and frequency for user pings")
@@ -26,11 +26,13 @@ class Reminder(commands.Cog):
                 await interaction.response.send_message("Time must be in military format (e.g. 0400).", ephemeral=True)
                 return
 
-            # Validate timezone using pytz common timezones
-            if timezone not in pytz.all_timezones:
+            # Validate timezone with a set lookup; aliases like "PST" and any casing are accepted
+            resolved_timezone = TIMEZONES.resolve(timezone)
+            if resolved_timezone is None:
                 Logger.error(f"Validation failed for timezone input: {timezone} by user {interaction.user.id}")
-                await interaction.response.send_message("Invalid timezone provided.", ephemeral=True)
+                await interaction.response.send_message("Invalid timezone provided. Pick one of the suggestions, e.g. America/New_York.", ephemeral=True)
                 return
+            timezone = resolved_timezone
 
             # Validate frequency is a positive integer
             if frequency < 1:
@@ -38,27 +40,35 @@ class Reminder(commands.Cog):
                 await interaction.response.send_message("Frequency must be a positive integer.", ephemeral=True)
                 return
 
+            # Precompute the first fire instant; this also rejects out-of-range times like 2500
+            try:
+                recurrence = Recurrence(time, timezone, frequency)
+            except ValueError:
+                Logger.error(f"Validation failed for military time input: {time} by user {interaction.user.id}")
+                await interaction.response.send_message("Time must be in military format (e.g. 0400).", ephemeral=True)
+                return
+            next_fire = recurrence.first_fire(datetime.datetime.now(UTC))
+
             # Prepare the reminder data with the new 'last_reminded' field
             reminder_data = {
                 "time": time,
                 "timezone": timezone,
                 "frequency": frequency,
-                "last_reminded": ""
+                "last_reminded": "",
+                "next_fire": next_fire.timestamp()
             }
             Logger.info(f"Prepared reminder data for user {interaction.user.id}: {reminder_data}")
 
-            # Ensure the reminders directory exists
-            if not os.path.exists(REMINDERS_DIR):
-                os.makedirs(REMINDERS_DIR, exist_ok=True)
-                Logger.info(f"Created directory for reminders: {REMINDERS_DIR}")
+            # Save the reminder (overwrites any existing reminder for the user)
+            await self.reminders.upsert(interaction.user.id, reminder_data)
+            Logger.info(f"Successfully saved reminder data for user {interaction.user.id}")
 
-            # Create file path for the user's reminder data file
-            file_path = os.path.join(REMINDERS_DIR, f"{interaction.user.id}.json")
-            
-            # Write the reminder data to the file (overwrite if exists)
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(reminder_data, f, indent=4)
-            Logger.info(f"Successfully wrote reminder data to file: {file_path}")
+            # Push the reminder straight into the scheduler's heap
+            scheduler = getattr(self.bot, "reminder_scheduler", None)
+            if scheduler is not None:
+                scheduler.schedule(interaction.user.id, reminder_data)
+            else:
+                Logger.warning("Reminder scheduler is not running; the reminder will be picked up when it starts.")
 
             # Removed the Logger.LogDiscord call since it's not defined in Logger.py
 
@@ -69,10 +79,12 @@ class Reminder(commands.Cog):
 
     @remindme.autocomplete("timezone")
     async def timezone_autocomplete(self, interaction: discord.Interaction, current: str):
-        # Filter through pytz.common_timezones and return matching top 25 results
-        timezones = [tz for tz in pytz.common_timezones if current.lower() in tz.lower()]
-        suggestions = [app_commands.Choice(name=tz, value=tz) for tz in timezones[:25]]
-        Logger.info(f"Provided {len(suggestions)} autocomplete suggestions for timezone by user {interaction.user.id}")
+        # Prebuilt prefix/fuzzy index; the choice name shows the zone's current UTC offset
+        suggestions = [
+            app_commands.Choice(name=f"{tz} ({utc_offset_label(tz)})", value=tz)
+            for tz in TIMEZONES.search(current)
+        ]
+        Logger.debug(f"Provided {len(suggestions)} autocomplete suggestions for timezone by user {interaction.user.id}")
         return suggestions
 
 async def setup(bot: commands.Bot):
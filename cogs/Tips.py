@@ -1,24 +1,50 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-from pathlib import Path
 import asyncio
 import datetime
 from helpers.Logger import Logger
+from helpers.Repositories import TipRepository
+from helpers.WriteBehind import DebouncedWriter
 
 class Tips(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Load settings from settings.json.
-        settings_path = Path("./settings.json")
-        with open(settings_path, "r", encoding="utf-8") as f:
-            self.settings = json.load(f)
-        # Define path to tips data file.
-        self.tips_file = Path("./data/tips.json")
-        if not self.tips_file.exists():
-            with open(self.tips_file, "w", encoding="utf-8") as f:
-                json.dump({}, f, indent=4)
+        # Shared settings service; lookups always see the latest settings.json.
+        self.settings = self.bot.settings
+        # Tips are stored in the shared database and kept in memory while the cog is loaded.
+        self.tips = TipRepository(self.bot.database)
+        self.tip_entries = {}
+        # IDs of tip voting messages, for rejecting unrelated reactions without any lookup.
+        self.tracked_message_ids = set()
+        # Per-tip locks around the approve-and-post step and the reconciliation merge.
+        self.approval_locks = {}
+        # Votes seen while a tip's reactions are being re-read: message_id -> [(emoji, user_id, added)].
+        self.live_votes = {}
+        # Vote changes are written behind, coalesced to at most one write per second.
+        self.writer = DebouncedWriter(self.flush_tips, delay=self.settings.get("tips", {}).get("flush_seconds", 1.0), name="Tips")
+
+    async def cog_load(self):
+        self.tip_entries = await self.tips.all()
+        self.tracked_message_ids = set(self.tip_entries)
+        Logger.info(f"Loaded {len(self.tip_entries)} tip(s) into memory.")
+        # Correct the stored votes against the actual reactions in the background.
+        self.reconcile_task = asyncio.create_task(self.reconcile_votes())
+
+    async def cog_unload(self):
+        self.reconcile_task.cancel()
+        await self.writer.close()
+
+    async def flush_tips(self, message_ids: set):
+        # Snapshot the entries so later changes wait for the next flush.
+        entries = {}
+        for message_id in message_ids:
+            if message_id in self.tip_entries:
+                entry = dict(self.tip_entries[message_id])
+                entry["upvoters"] = set(entry["upvoters"])
+                entry["downvoters"] = set(entry["downvoters"])
+                entries[message_id] = entry
+        await self.tips.save_many(entries)
 
     @app_commands.command(
         name="tip-add",
@@ -51,11 +77,7 @@ class Tips(commands.Cog):
         voting_embed.set_footer(text="Vote to approve this tip as a verified tip!")
 
         # Determine the tip voting channel based on environment.
-        env = self.settings["bot"]["environment"]
-        if env == "development":
-            voting_channel_id = self.settings["tips"]["development"]["tip_voting_channel"]
-        else:
-            voting_channel_id = self.settings["tips"]["production"]["tip_voting_channel"]
+        voting_channel_id = self.voting_channel_id()
 
         tip_voting_channel = self.bot.get_channel(voting_channel_id)
         if tip_voting_channel is None:
@@ -70,14 +92,8 @@ class Tips(commands.Cog):
             await interaction.response.send_message("Failed to post tip.", ephemeral=True)
             return
 
-        # Save tip data to JSON.
-        try:
-            with open(self.tips_file, "r", encoding="utf-8") as f:
-                tips_data = json.load(f)
-        except Exception as e:
-            Logger.error(f"Failed to load tips data: {e}")
-            tips_data = {}
-        tips_data[str(tip_vote_message.id)] = {
+        # Save tip data to the database.
+        tip_entry = {
             "original_message_id": original_message_id,
             "original_channel_id": original_message.channel.id,
             "content": original_message.content,
@@ -85,11 +101,14 @@ class Tips(commands.Cog):
             "downvotes": 0,
             "approved": False,
             "submitted_by": interaction.user.id,
-            "original_author": original_message.author.id
+            "original_author": original_message.author.id,
+            "upvoters": set(),
+            "downvoters": set()
         }
         try:
-            with open(self.tips_file, "w", encoding="utf-8") as f:
-                json.dump(tips_data, f, indent=4)
+            await self.tips.add(tip_vote_message.id, tip_entry)
+            self.tip_entries[tip_vote_message.id] = tip_entry
+            self.tracked_message_ids.add(tip_vote_message.id)
         except Exception as e:
             Logger.error(f"Failed to save tip data: {e}")
             await interaction.response.send_message("Failed to save tip.", ephemeral=True)
@@ -106,119 +125,175 @@ class Tips(commands.Cog):
 
         await interaction.response.send_message("Tip added successfully!", ephemeral=True)
 
+    def voting_channel_id(self):
+        env = self.settings["bot"]["environment"]
+        if env == "development":
+            return self.settings["tips"]["development"]["tip_voting_channel"]
+        return self.settings["tips"]["production"]["tip_voting_channel"]
+
+    def apply_vote(self, tip_entry: dict, emoji: str, user_id: int, added: bool) -> bool:
+        """Add or remove a user's vote; counts are derived from the voter sets."""
+        if emoji == "👍":
+            voters = tip_entry["upvoters"]
+        elif emoji == "👎":
+            voters = tip_entry["downvoters"]
+        else:
+            return False
+        if added:
+            voters.add(user_id)
+        else:
+            voters.discard(user_id)
+        tip_entry["upvotes"] = len(tip_entry["upvoters"])
+        tip_entry["downvotes"] = len(tip_entry["downvoters"])
+        return True
+
+    def record_live_vote(self, message_id: int, emoji: str, user_id: int, added: bool):
+        """Remember a vote for the reconciliation pass that is currently reading this tip, if any."""
+        journal = self.live_votes.get(message_id)
+        if journal is not None:
+            journal.append((emoji, user_id, added))
+
+    async def reconcile_votes(self):
+        """
+        Re-read the reactions on every pending tip message in one pass and
+        replace the stored voter sets, correcting drift from missed events or restarts.
+        Votes that arrive while a message is being read are replayed on top of it.
+        """
+        await self.bot.wait_until_ready()
+        pending = [message_id for message_id, entry in self.tip_entries.items() if not entry.get("approved", False)]
+        if not pending:
+            return
+        channel = self.bot.get_channel(self.voting_channel_id())
+        if channel is None:
+            Logger.error("Tip voting channel not found; skipping vote reconciliation.")
+            return
+        Logger.info(f"Reconciling votes for {len(pending)} pending tip(s).")
+        corrected = 0
+        for message_id in pending:
+            self.live_votes[message_id] = []
+            try:
+                message = await channel.fetch_message(message_id)
+                voters = {"👍": set(), "👎": set()}
+                for reaction in message.reactions:
+                    emoji = str(reaction.emoji)
+                    if emoji not in voters:
+                        continue
+                    async for user in reaction.users():
+                        if user.id != self.bot.user.id:
+                            voters[emoji].add(user.id)
+            except discord.NotFound:
+                Logger.warning(f"Tip message {message_id} no longer exists; skipping reconciliation.")
+                self.live_votes.pop(message_id, None)
+                continue
+            except Exception as e:
+                Logger.error(f"Failed to fetch tip message {message_id} for reconciliation: {e}")
+                self.live_votes.pop(message_id, None)
+                continue
+            tip_entry = self.tip_entries.get(message_id)
+            if tip_entry is None:
+                self.live_votes.pop(message_id, None)
+                continue
+            lock = self.approval_locks.setdefault(message_id, asyncio.Lock())
+            async with lock:
+                # Nothing awaits between here and the assignment, so no vote can slip in unrecorded.
+                for emoji, user_id, added in self.live_votes.pop(message_id, []):
+                    if added:
+                        voters[emoji].add(user_id)
+                    else:
+                        voters[emoji].discard(user_id)
+                if tip_entry["upvoters"] != voters["👍"] or tip_entry["downvoters"] != voters["👎"]:
+                    tip_entry["upvoters"] = voters["👍"]
+                    tip_entry["downvoters"] = voters["👎"]
+                    tip_entry["upvotes"] = len(voters["👍"])
+                    tip_entry["downvotes"] = len(voters["👎"])
+                    self.writer.mark(message_id)
+                    corrected += 1
+            await self.maybe_approve(message_id, message.guild.id if message.guild else None)
+        Logger.info(f"Vote reconciliation finished; corrected {corrected} tip(s).")
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if payload.message_id not in self.tracked_message_ids:
+            return  # Not a tracked tip message.
         # Ignore if the reaction was made by the bot.
         if payload.user_id == self.bot.user.id:
             return
 
-        try:
-            with open(self.tips_file, "r", encoding="utf-8") as f:
-                tips_data = json.load(f)
-        except Exception as e:
-            Logger.error(f"Error reading tips data: {e}")
-            return
-
-        tip_entry = tips_data.get(str(payload.message_id))
-        if tip_entry is None:
-            return  # Not a tracked tip message.
-
-        emoji = str(payload.emoji)
-        if emoji == "👍":
-            tip_entry["upvotes"] += 1
-            Logger.info(f"Tip {payload.message_id} upvotes increased to {tip_entry['upvotes']}")
-        elif emoji == "👎":
-            tip_entry["downvotes"] += 1
-            Logger.info(f"Tip {payload.message_id} downvotes increased to {tip_entry['downvotes']}")
-        else:
+        tip_entry = self.tip_entries[payload.message_id]
+        if not self.apply_vote(tip_entry, str(payload.emoji), payload.user_id, added=True):
             return  # Ignore other emojis.
+        self.record_live_vote(payload.message_id, str(payload.emoji), payload.user_id, added=True)
+        Logger.info(f"Tip {payload.message_id} votes are now {tip_entry['upvotes']} up / {tip_entry['downvotes']} down")
+        self.writer.mark(payload.message_id)
+        await self.maybe_approve(payload.message_id, payload.guild_id)
 
-        try:
-            with open(self.tips_file, "w", encoding="utf-8") as f:
-                json.dump(tips_data, f, indent=4)
-        except Exception as e:
-            Logger.error(f"Error saving updated tips data: {e}")
-
+    async def maybe_approve(self, message_id: int, guild_id: int):
+        tip_entry = self.tip_entries[message_id]
         # Check for approval only if not already approved.
-        if not tip_entry.get("approved", False):
-            min_votes = self.settings["tips"].get("min_votes", 5)
-            if tip_entry["upvotes"] >= min_votes:
-                env = self.settings["bot"]["environment"]
-                if env == "development":
-                    approved_channel_id = self.settings["tips"]["development"]["tips_channel"]
-                else:
-                    approved_channel_id = self.settings["tips"]["production"]["tips_channel"]
-                approved_channel = self.bot.get_channel(approved_channel_id)
-                if approved_channel is None:
-                    Logger.error("Approved tips channel not found!")
-                    return
-
-                try:
-                    original_author = await self.bot.fetch_user(tip_entry["original_author"])
-                    submitted_by = await self.bot.fetch_user(tip_entry["submitted_by"])
-                except Exception as e:
-                    Logger.error(f"Error fetching user info: {e}")
-                    original_author = None
-                    submitted_by = None
-
-                # Create approved tip embed using usernames (not mentions) and include the vote counts.
-                title = f"Tip by {original_author.name}" if original_author else "Tip"
-                approved_embed = discord.Embed(
-                    title=title,
-                    description=tip_entry["content"],
-                    color=discord.Color.green()
-                )
-                footer_text = f"This tip submitted by {submitted_by.name}" if submitted_by else "Tip submitted"
-                approved_embed.set_footer(text=footer_text)
-                # Add field with a link to the original message.
-                try:
-                    guild_id = payload.guild_id
-                    original_channel_id = tip_entry["original_channel_id"]
-                    original_message_id = tip_entry["original_message_id"]
-                    original_link = f"https://discord.com/channels/{guild_id}/{original_channel_id}/{original_message_id}"
-                    approved_embed.add_field(name="Original Message Link", value=f"[Click here]({original_link})", inline=False)
-                except Exception as e:
-                    Logger.error(f"Error constructing original message link: {e}")
-                # Add field showing the vote counts.
-                vote_field_value = f"Upvotes: {tip_entry['upvotes']} | Downvotes: {tip_entry['downvotes']}"
-                approved_embed.add_field(name="Votes", value=vote_field_value, inline=False)
-                try:
-                    approved_message = await approved_channel.send(embed=approved_embed)
-                    Logger.info(f"Tip {payload.message_id} approved and posted in tips channel: {approved_message.id}")
-                    tip_entry["approved"] = True  # Mark tip as approved.
-                    with open(self.tips_file, "w", encoding="utf-8") as f:
-                        json.dump(tips_data, f, indent=4)
-                except Exception as e:
-                    Logger.error(f"Failed to post approved tip: {e}")
+        if tip_entry.get("approved", False):
+            return
+        min_votes = self.settings["tips"].get("min_votes", 5)
+        if tip_entry["upvotes"] < min_votes:
+            return
+        # Serialise approval per tip so concurrent votes cannot post it twice.
+        lock = self.approval_locks.setdefault(message_id, asyncio.Lock())
+        async with lock:
+            if tip_entry.get("approved", False):
+                return
+            env = self.settings["bot"]["environment"]
+            if env == "development":
+                approved_channel_id = self.settings["tips"]["development"]["tips_channel"]
+            else:
+                approved_channel_id = self.settings["tips"]["production"]["tips_channel"]
+            approved_channel = self.bot.get_channel(approved_channel_id)
+            if approved_channel is None:
+                Logger.error("Approved tips channel not found!")
+                return
+
+            # Both users are resolved concurrently; failures come back as None.
+            original_author, submitted_by = await self.bot.user_resolver.resolve_many(
+                [tip_entry["original_author"], tip_entry["submitted_by"]]
+            )
+
+            # Create approved tip embed using usernames (not mentions) and include the vote counts.
+            title = f"Tip by {original_author.name}" if original_author else "Tip"
+            approved_embed = discord.Embed(
+                title=title,
+                description=tip_entry["content"],
+                color=discord.Color.green()
+            )
+            footer_text = f"This tip submitted by {submitted_by.name}" if submitted_by else "Tip submitted"
+            approved_embed.set_footer(text=footer_text)
+            # Add field with a link to the original message.
+            try:
+                original_channel_id = tip_entry["original_channel_id"]
+                original_message_id = tip_entry["original_message_id"]
+                original_link = f"https://discord.com/channels/{guild_id}/{original_channel_id}/{original_message_id}"
+                approved_embed.add_field(name="Original Message Link", value=f"[Click here]({original_link})", inline=False)
+            except Exception as e:
+                Logger.error(f"Error constructing original message link: {e}")
+            # Add field showing the vote counts.
+            vote_field_value = f"Upvotes: {tip_entry['upvotes']} | Downvotes: {tip_entry['downvotes']}"
+            approved_embed.add_field(name="Votes", value=vote_field_value, inline=False)
+            try:
+                approved_message = await approved_channel.send(embed=approved_embed)
+                Logger.info(f"Tip {message_id} approved and posted in tips channel: {approved_message.id}")
+                tip_entry["approved"] = True  # Mark tip as approved.
+                self.writer.mark(message_id)
+            except Exception as e:
+                Logger.error(f"Failed to post approved tip: {e}")
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
-        try:
-            with open(self.tips_file, "r", encoding="utf-8") as f:
-                tips_data = json.load(f)
-        except Exception as e:
-            Logger.error(f"Error reading tips data on reaction remove: {e}")
-            return
-
-        tip_entry = tips_data.get(str(payload.message_id))
-        if tip_entry is None:
+        if payload.message_id not in self.tracked_message_ids:
             return  # Not tracked.
 
-        emoji = str(payload.emoji)
-        if emoji == "👍":
-            tip_entry["upvotes"] = max(0, tip_entry["upvotes"] - 1)
-            Logger.info(f"Tip {payload.message_id} upvotes decreased to {tip_entry['upvotes']}")
-        elif emoji == "👎":
-            tip_entry["downvotes"] = max(0, tip_entry["downvotes"] - 1)
-            Logger.info(f"Tip {payload.message_id} downvotes decreased to {tip_entry['downvotes']}")
-        else:
+        tip_entry = self.tip_entries[payload.message_id]
+        if not self.apply_vote(tip_entry, str(payload.emoji), payload.user_id, added=False):
             return
-
-        try:
-            with open(self.tips_file, "w", encoding="utf-8") as f:
-                json.dump(tips_data, f, indent=4)
-        except Exception as e:
-            Logger.error(f"Error saving updated tips data on reaction remove: {e}")
+        self.record_live_vote(payload.message_id, str(payload.emoji), payload.user_id, added=False)
+        Logger.info(f"Tip {payload.message_id} votes are now {tip_entry['upvotes']} up / {tip_entry['downvotes']} down")
+        self.writer.mark(payload.message_id)
 
 async def setup(bot: commands.Bot):
     cog = Tips(bot)
@@ -0,0 +1,98 @@
+import asyncio
+import time
+import discord
+from helpers.Logger import Logger
+from helpers.Metrics import HANDLER_SECONDS, HANDLER_OUTCOMES
+from helpers.Tracing import tracer
+
+class MessageHandler:
+    """
+    A named message handler. `predicate(message)` must be a cheap, synchronous
+    check; the coroutine is only scheduled when it returns True.
+    """
+
+    def __init__(self, name: str, handler, predicate=None, timeout: float = None):
+        self.name = name
+        self.handler = handler
+        self.predicate = predicate
+        self.timeout = timeout
+
+    def wants(self, message: discord.Message) -> bool:
+        if self.predicate is None:
+            return True
+        try:
+            return bool(self.predicate(message))
+        except Exception as e:
+            Logger.error(f"Predicate for message handler {self.name} failed: {e}")
+            return False
+
+class MessageDispatcher:
+    """
+    Runs independent message handlers as concurrent, supervised tasks.
+
+    dispatch() returns as soon as the handlers are scheduled, so a slow handler
+    (an OpenAI completion) never delays the others or command processing.
+    Each task is bounded by its handler's timeout, failures are logged rather
+    than propagated, and close() cancels whatever is still running.
+    """
+
+    def __init__(self):
+        self.handlers = []
+        self._tasks = set()
+
+    def register(self, name: str, handler, predicate=None, timeout: float = None) -> MessageHandler:
+        """Add a handler; `handler(message)` is a coroutine function."""
+        entry = MessageHandler(name, handler, predicate, timeout)
+        self.handlers = [h for h in self.handlers if h.name != name] + [entry]
+        return entry
+
+    def unregister(self, name: str):
+        self.handlers = [h for h in self.handlers if h.name != name]
+
+    def dispatch(self, message: discord.Message) -> list:
+        """Schedule every handler whose predicate accepts `message`. Returns the tasks."""
+        tasks = []
+        for entry in self.handlers:
+            if not entry.wants(message):
+                continue
+            task = asyncio.create_task(self._run(entry, message), name=f"{entry.name}:{message.id}")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks.append(task)
+        return tasks
+
+    async def _run(self, entry: MessageHandler, message: discord.Message):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            # Tasks inherit the caller's context, so this span nests under on_message.
+            with tracer.start_as_current_span(f"handler.{entry.name}"):
+                if entry.timeout:
+                    await asyncio.wait_for(entry.handler(message), timeout=entry.timeout)
+                else:
+                    await entry.handler(message)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            Logger.warning(f"Message handler {entry.name} timed out after {entry.timeout}s on message {message.id}.")
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            outcome = "error"
+            Logger.error(f"Message handler {entry.name} failed on message {message.id}: {e}")
+        finally:
+            HANDLER_SECONDS.labels(handler=entry.name).observe(time.perf_counter() - started)
+            HANDLER_OUTCOMES.labels(handler=entry.name, outcome=outcome).inc()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def close(self):
+        """Cancel running handlers and wait for them to unwind."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            Logger.info(f"Cancelled {len(tasks)} running message handler(s).")
@@ -0,0 +1,327 @@
+import os
+import sys
+import time
+import pickle
+import socket
+import struct
+import asyncio
+import secrets
+import itertools
+import dataclasses
+from pathlib import Path
+import nltk
+import numpy as np
+from helpers.Logger import Logger
+from helpers.Metrics import EMBEDDING_SECONDS
+from helpers.Settings import EmbeddingSettings, get_settings
+from helpers.Embeddings import create_embeddings
+from helpers.WikiCleaning import add_nltk_paths, clean_file
+
+# The worker is started as "python -m helpers.EmbeddingWorker" from the repository root.
+ROOT = Path(__file__).resolve().parent.parent
+TOKEN_VARIABLE = "EMBEDDING_WORKER_TOKEN"
+CONNECT_TIMEOUT = 60
+LOAD_TIMEOUT = 600
+# Frames are a 4-byte big-endian length followed by a pickled payload.
+HEADER = struct.Struct("!I")
+INTERACTIVE = 0
+BULK = 1
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return await reader.readexactly(length)
+
+def _write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(HEADER.pack(len(payload)) + payload)
+
+class EmbeddingWorker:
+    """
+    Embeds text for the bot without holding its GIL: the backend from
+    helpers/Embeddings.py runs in a child process that the bot talks to over a
+    local socket, so a full re-index leaves the event loop (gateway heartbeats,
+    commands) alone.
+
+    Requests are queued and coalesced into batches of up to batch_size texts.
+    Interactive requests (an AI channel question) go ahead of bulk ones, and a
+    bulk request is split into batch-sized chunks of which at most
+    max_pending_batches are queued at once. The indexer therefore waits
+    (backpressure) instead of flooding the queue, and a question never waits
+    for more than the batch already in the worker.
+
+    The process also runs the wiki clean stage (clean()), whose tokenizing
+    holds the GIL just like the model does.
+
+    The process starts with the first request and is restarted on the next one
+    if it dies. With "worker": false the backend and the cleaning run in
+    threads of the bot process instead, behind the same queue.
+    """
+
+    def __init__(self, config: EmbeddingSettings):
+        self.config = config
+        self.name = config.backend
+        self.dimensions = None
+        self.batch_size = max(1, config.batch_size)
+        self._sequence = itertools.count()
+        self._queue = None
+        self._bulk_slots = None
+        self._dispatcher = None
+        self._io_lock = None
+        self._backend = None
+        self._process = None
+        self._reader = None
+        self._writer = None
+
+    def start(self):
+        """Start the dispatcher (needs a running event loop)."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._queue = asyncio.PriorityQueue()
+            self._bulk_slots = asyncio.Semaphore(max(1, self.config.max_pending_batches))
+            # One request at a time on the socket: the dispatcher's batches and clean().
+            self._io_lock = asyncio.Lock()
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="embedding-dispatcher")
+
+    async def encode(self, texts, bulk: bool = False) -> np.ndarray:
+        """
+        Embed `texts`, returning an (n, dimensions) float32 array. Use bulk=True
+        for indexing so interactive requests are served first.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dimensions or 0), dtype=np.float32)
+        self.start()
+        started = time.perf_counter()
+        try:
+            if not bulk:
+                return await self._enqueue(INTERACTIVE, texts)
+            chunks = []
+            for offset in range(0, len(texts), self.batch_size):
+                await self._bulk_slots.acquire()
+                chunk = self._enqueue(BULK, texts[offset:offset + self.batch_size])
+                chunk.add_done_callback(lambda _: self._bulk_slots.release())
+                chunks.append(chunk)
+            return np.vstack(await asyncio.gather(*chunks))
+        finally:
+            EMBEDDING_SECONDS.labels(kind="bulk" if bulk else "interactive").observe(time.perf_counter() - started)
+
+    async def clean(self, file: Path, stop_words: set, purge_special_chars: bool = False, purge_lines=()) -> tuple:
+        """
+        Clean one downloaded wiki page in place (helpers/WikiCleaning.py) and
+        return (original lines, cleaned lines, stop words removed). Files go
+        one per request, so embedding batches are not held up behind a whole
+        clean stage.
+        """
+        if not self.config.worker:
+            return await asyncio.to_thread(clean_file, file, stop_words, purge_special_chars, purge_lines)
+        self.start()
+        reply = await self._call({
+            "clean": {"file": str(file), "stop_words": stop_words, "purge_special_chars": purge_special_chars, "purge_lines": list(purge_lines)},
+            "nltk_paths": [str(path) for path in nltk.data.path]
+        })
+        return reply["cleaned"]
+
+    def _enqueue(self, priority: int, texts: list) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._sequence), texts, future))
+        return future
+
+    async def _dispatch(self):
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][2])
+            # Coalesce whatever else is waiting (interactive first) up to batch_size texts.
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if size + len(item[2]) > self.batch_size:
+                    self._queue.put_nowait(item)
+                    break
+                batch.append(item)
+                size += len(item[2])
+            batch = [item for item in batch if not item[3].done()]
+            if not batch:
+                continue
+            try:
+                vectors = await self._run([text for item in batch for text in item[2]])
+            except asyncio.CancelledError:
+                for item in batch:
+                    item[3].cancel()
+                raise
+            except Exception as e:
+                for item in batch:
+                    if not item[3].done():
+                        item[3].set_exception(e)
+                continue
+            offset = 0
+            for _, _, texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+    async def _run(self, texts: list) -> np.ndarray:
+        if not self.config.worker:
+            if self._backend is None:
+                self._backend = create_embeddings(self.config)
+            vectors = await asyncio.to_thread(self._backend.encode, texts)
+            self.name, self.dimensions = self._backend.name, self._backend.dimensions
+            return vectors
+        return (await self._call({"texts": texts}))["vectors"]
+
+    async def _call(self, request: dict) -> dict:
+        async with self._io_lock:
+            if self._writer is None:
+                await self._launch()
+            try:
+                _write_frame(self._writer, pickle.dumps(request))
+                await self._writer.drain()
+                reply = pickle.loads(await _read_frame(self._reader))
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                Logger.error(f"Lost the embedding worker process ({e}); it will be restarted for the next request.")
+                await self._stop_process()
+                raise
+            except asyncio.CancelledError:
+                # The reply would be read as the answer to the next request.
+                await self._stop_process()
+                raise
+        if "error" in reply:
+            raise RuntimeError(f"Embedding worker failed: {reply['error']}")
+        return reply
+
+    async def _launch(self):
+        token = secrets.token_hex(16).encode()
+        connected = asyncio.get_running_loop().create_future()
+
+        async def on_connect(reader, writer):
+            # Only the process started below knows the token.
+            try:
+                accepted = await asyncio.wait_for(_read_frame(reader), 10) == token
+            except Exception:
+                accepted = False
+            if accepted and not connected.done():
+                connected.set_result((reader, writer))
+            else:
+                writer.close()
+
+        server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+        try:
+            port = server.sockets[0].getsockname()[1]
+            self._process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "helpers.EmbeddingWorker", str(port),
+                cwd=str(ROOT), env=dict(os.environ, **{TOKEN_VARIABLE: token.decode()})
+            )
+            exited = asyncio.ensure_future(self._process.wait())
+            try:
+                await asyncio.wait({connected, exited}, timeout=CONNECT_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                exited.cancel()
+            if not connected.done():
+                connected.cancel()
+                await self._stop_process()
+                raise RuntimeError("The embedding worker process did not connect.")
+        finally:
+            server.close()
+        self._reader, self._writer = connected.result()
+        try:
+            _write_frame(self._writer, pickle.dumps(dataclasses.asdict(self.config)))
+            await self._writer.drain()
+            reply = pickle.loads(await asyncio.wait_for(_read_frame(self._reader), LOAD_TIMEOUT))
+        except Exception as e:
+            await self._stop_process()
+            raise RuntimeError(f"The embedding worker process failed to start: {e}")
+        if "error" in reply:
+            await self._stop_process()
+            raise RuntimeError(f"The embedding worker could not load the model: {reply['error']}")
+        self.name, self.dimensions = reply["name"], reply["dimensions"]
+        Logger.info(f"Embedding worker (pid {self._process.pid}) ready with the {self.name} backend.")
+
+    async def _stop_process(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            # Closing the socket makes the worker exit; kill it if it does not.
+            try:
+                await asyncio.wait_for(process.wait(), 5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+    async def close(self):
+        """Stop the dispatcher, fail queued requests and stop the worker process."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+            while not self._queue.empty():
+                self._queue.get_nowait()[3].cancel()
+        await self._stop_process()
+
+_shared = None
+
+def get_embedding_worker() -> EmbeddingWorker:
+    """
+    The process-wide worker for settings["embeddings"] (bot.embeddings). The wiki
+    index and the AI channel's queries must embed with the same model, so
+    changing the section needs a restart and a re-index.
+    """
+    global _shared
+    if _shared is None:
+        _shared = EmbeddingWorker(get_settings().embeddings)
+    return _shared
+
+# ----- Worker process -----
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+def _receive(connection: socket.socket):
+    (length,) = HEADER.unpack(_receive_exactly(connection, HEADER.size))
+    return _receive_exactly(connection, length)
+
+def _send(connection: socket.socket, payload: bytes):
+    connection.sendall(HEADER.pack(len(payload)) + payload)
+
+def main():
+    """Entry point of the worker process: load the backend, then answer requests until the bot disconnects."""
+    # The bot process owns logs/bot.log; the worker's messages go to the inherited stderr.
+    Logger.console_only()
+    port = int(sys.argv[1])
+    token = os.environ.pop(TOKEN_VARIABLE, "")
+    connection = socket.create_connection(("127.0.0.1", port))
+    _send(connection, token.encode())
+    config = EmbeddingSettings(**pickle.loads(_receive(connection)))
+    try:
+        backend = create_embeddings(config).load()
+    except Exception as e:
+        _send(connection, pickle.dumps({"error": f"{type(e).__name__}: {e}"}))
+        return
+    _send(connection, pickle.dumps({"name": backend.name, "dimensions": backend.dimensions}))
+    while True:
+        try:
+            request = pickle.loads(_receive(connection))
+        except (ConnectionError, OSError):
+            break
+        try:
+            if "clean" in request:
+                add_nltk_paths(request["nltk_paths"])
+                reply = {"cleaned": clean_file(**request["clean"])}
+            else:
+                reply = {"vectors": backend.encode(request["texts"])}
+        except Exception as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        try:
+            _send(connection, pickle.dumps(reply))
+        except OSError:
+            break
+    connection.close()
+
+if __name__ == "__main__":
+    main()
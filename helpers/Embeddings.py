@@ -0,0 +1,160 @@
+import abc
+import time
+import threading
+from pathlib import Path
+import numpy as np
+from helpers.Logger import Logger
+from helpers.Settings import EmbeddingSettings
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+# Chroma downloads this ONNX export of MiniLM for its default embedding function.
+CHROMA_MODEL_DIRECTORY = Path.home() / ".cache" / "chroma" / "onnx_models" / DEFAULT_MODEL / "onnx"
+
+class EmbeddingBackend(abc.ABC):
+    """
+    A sentence embedding model, loaded on first use so importing a module that
+    holds one costs nothing. encode(texts) returns an (n, dimensions) float32
+    array of L2-normalized vectors and batches internally; it blocks, so the
+    bot reaches it through helpers/EmbeddingWorker.py.
+    """
+
+    name = "base"
+
+    def __init__(self, batch_size: int = 32):
+        self.batch_size = batch_size
+        self.dimensions = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                self._load()
+                self._loaded = True
+                Logger.info(f"Loaded the {self.name} embedding backend ({self.dimensions} dimensions) in {time.perf_counter() - started:.1f}s.")
+        return self
+
+    def encode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        self.load()
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return self._encode(texts)
+
+    @abc.abstractmethod
+    def _load(self):
+        """Load the model and set self.dimensions."""
+
+    @abc.abstractmethod
+    def _encode(self, texts: list) -> np.ndarray:
+        """Embed a non-empty list of texts."""
+
+class OnnxEmbeddings(EmbeddingBackend):
+    """
+    MiniLM exported to ONNX and run with onnxruntime, without torch. Uses the
+    export Chroma already downloads unless model_directory points at another
+    one (it needs model.onnx and tokenizer.json). With quantize, an int8 copy of
+    the model (model.int8.onnx) is created next to it on first use.
+    """
+
+    def __init__(self, model_directory: str = "", quantize: bool = False, batch_size: int = 32,
+                 threads: int = 0, max_length: int = 256):
+        super().__init__(batch_size)
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.model_directory = Path(model_directory) if model_directory else CHROMA_MODEL_DIRECTORY
+        self.quantize = quantize
+        self.threads = threads
+        self.max_length = max_length
+
+    def model_path(self) -> Path:
+        path = self.model_directory / "model.onnx"
+        if not path.exists() and self.model_directory == CHROMA_MODEL_DIRECTORY:
+            from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+            Logger.info(f"Downloading the {DEFAULT_MODEL} ONNX model to {self.model_directory}...")
+            # Chroma's public embedding function downloads (and verifies) the export on first use.
+            ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])(["warm up"])
+        if not path.exists():
+            raise FileNotFoundError(f"No ONNX embedding model at {path}.")
+        if not self.quantize:
+            return path
+        quantized = self.model_directory / "model.int8.onnx"
+        if not quantized.exists():
+            try:
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+            except ImportError as e:
+                Logger.error("Quantizing the embedding model needs the 'onnx' package. Please install it with 'pip install onnx'.")
+                raise e
+            Logger.info(f"Quantizing {path} to int8...")
+            quantize_dynamic(str(path), str(quantized), weight_type=QuantType.QInt8)
+        return quantized
+
+    def _load(self):
+        import onnxruntime
+        from tokenizers import Tokenizer
+        path = self.model_path()
+        self.tokenizer = Tokenizer.from_file(str(self.model_directory / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        # Pad to the longest text of each batch rather than to max_length.
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.dimensions = self._encode(["warm up"]).shape[1]
+
+    def _encode(self, texts: list) -> np.ndarray:
+        # Batch texts of similar length together so little time goes into padding.
+        order = sorted(range(len(texts)), key=lambda index: len(texts[index]))
+        vectors = None
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.tokenizer.encode_batch([texts[index] for index in batch])
+            input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feed["token_type_ids"] = np.zeros_like(input_ids)
+            hidden = self.session.run(None, feed)[0]
+            # Mean pooling over the real tokens, then L2 normalization (as sentence-transformers does).
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            if vectors is None:
+                vectors = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            vectors[batch] = pooled
+        return vectors
+
+class SentenceTransformerEmbeddings(EmbeddingBackend):
+    """The model through sentence-transformers and PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model: str = DEFAULT_MODEL, batch_size: int = 32):
+        super().__init__(batch_size)
+        self.model_name = model
+
+    def _load(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ModuleNotFoundError as e:
+            Logger.error("Module 'sentence_transformers' not found. Please install it with 'pip install sentence-transformers'.")
+            raise e
+        self.model = SentenceTransformer(self.model_name)
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+
+    def _encode(self, texts: list) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32)
+
+def create_embeddings(config: EmbeddingSettings) -> EmbeddingBackend:
+    """Build the backend described by an "embeddings" settings section."""
+    if config.backend == "onnx":
+        # Only the default model is downloaded for onnx; any other needs its own export.
+        if config.model != DEFAULT_MODEL and not config.model_directory:
+            raise ValueError(f"The onnx embedding backend needs \"model_directory\" for model '{config.model}' (only {DEFAULT_MODEL} is downloaded).")
+        return OnnxEmbeddings(config.model_directory, config.quantize, config.batch_size, config.threads, config.max_length)
+    if config.backend == "torch":
+        return SentenceTransformerEmbeddings(config.model, config.batch_size)
+    raise ValueError(f"Unknown embedding backend: {config.backend} (expected 'onnx' or 'torch')")
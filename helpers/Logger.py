@@ -1,23 +1,26 @@
 import os
 import sys
+import gzip
+import json
 import time
+import queue
+import atexit
+import shutil
 import logging
-import re
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor
 
 LOGS_DIR = "logs"  # Or your preferred logs directory
+LOG_FILE = "bot.log"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Defaults for the "logging" settings section.
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_RETENTION_DAYS = 14
+DEFAULT_MAX_FILES = 50
 
-# A regular expression that matches ANSI escape sequences
-ANSI_ESCAPE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
+class ColorFormatter(logging.Formatter):
+    """Console formatter: colors are added here only, never stored in the message."""
 
-class NoColorFormatter(logging.Formatter):
-    def format(self, record):
-        # First get the unmodified formatted message.
-        s = super().format(record)
-        # Then remove ANSI escape sequences (colors)
-        return ANSI_ESCAPE.sub('', s)
-
-class Logger:
-    _logger = None
     # ANSI escape codes for colors
     COLORS = {
         'DEBUG': '\033[94m',   # Blue
@@ -25,83 +28,285 @@ class Logger:
         'WARNING': '\033[93m', # Yellow
         'ERROR': '\033[91m',   # Red
         'CRITICAL': '\033[41m',# White text on Red background
-        'RESET': '\033[0m',    # Reset to default color
     }
+    RESET = '\033[0m'
+
+    def formatMessage(self, record):
+        color = self.COLORS.get(record.levelname)
+        if color is None:
+            return super().formatMessage(record)
+        original = record.message
+        record.message = f"{color}{original}{self.RESET}"
+        try:
+            return super().formatMessage(record)
+        finally:
+            record.message = original
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers and offline analysis."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RotatingLogFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Rotates at midnight and whenever the file reaches `max_bytes`.
+    Rotated files are gzip-compressed on a background thread, which also
+    enforces retention (age in days and number of rotated files).
+    """
+
+    def __init__(self, filename: str, max_bytes: int = DEFAULT_MAX_BYTES, compress: bool = True,
+                 retention_days: int = DEFAULT_RETENTION_DAYS, max_files: int = DEFAULT_MAX_FILES):
+        super().__init__(filename, when="midnight", backupCount=0, encoding="utf-8")
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.retention_days = retention_days
+        self.max_files = max_files
+        self.namer = self._unique_name
+        self.rotator = self._rotate
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-rotation")
+        self._compressor.submit(self._apply_retention)
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes > 0 and self.stream is not None:
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def _unique_name(self, default_name: str) -> str:
+        # Size rollovers can happen several times a day; never overwrite an earlier file.
+        candidate = default_name
+        index = 1
+        while os.path.exists(candidate) or os.path.exists(candidate + ".gz"):
+            candidate = f"{default_name}.{index}"
+            index += 1
+        return candidate
+
+    def _rotate(self, source: str, dest: str):
+        if os.path.exists(source):
+            os.rename(source, dest)
+            self._compressor.submit(self._finish_rotation, dest)
+
+    def _finish_rotation(self, path: str):
+        try:
+            if self.compress:
+                with open(path, "rb") as f_in, gzip.open(path + ".gz", "wb") as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+                os.remove(path)
+            self._apply_retention()
+        except Exception as e:
+            sys.stderr.write(f"Log rotation failed for {path}: {e}\n")
+
+    def _apply_retention(self):
+        directory, base = os.path.split(self.baseFilename)
+        rotated = []
+        for name in os.listdir(directory):
+            if name.startswith(base + "."):
+                path = os.path.join(directory, name)
+                rotated.append((os.path.getmtime(path), path))
+        rotated.sort(reverse=True)
+        cutoff = time.time() - self.retention_days * 86400
+        for index, (modified, path) in enumerate(rotated):
+            if index >= self.max_files or modified < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        super().close()
+        self._compressor.shutdown(wait=True)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over untouched.
+    The stock prepare() formats the message on the calling thread; here the
+    %-args are merged by the listener thread instead, so a log call on the
+    event loop costs little more than a queue put.
+    """
+
+    def prepare(self, record):
+        return record
+
+class Logger:
+    _logger = None
+    _listener = None
+    _handlers = []
+    # Set by console_only() in child processes; they must not open logs/.
+    _console_only = False
+
+    @classmethod
+    def console_only(cls):
+        """
+        Log to stderr only, never to the files in logs/. Call this first in a
+        child process (e.g. the embedding worker): only the bot process may own
+        bot.log, since each handler rotates, compresses and prunes it on its own.
+        """
+        cls._console_only = True
 
     @classmethod
     def _initialize(cls, debug=False):
         if cls._logger is not None:
             return  # Already initialized
 
-        if not os.path.exists(LOGS_DIR):
+        log_path = os.path.join(LOGS_DIR, LOG_FILE)
+        if not cls._console_only and not os.path.exists(LOGS_DIR):
             os.makedirs(LOGS_DIR, exist_ok=True)
 
-        timestamp = int(time.time())
-        date_str = time.strftime("%Y-%m-%d")
-        log_filename = f"{date_str}-{timestamp}.log"
-        log_path = os.path.join(LOGS_DIR, log_filename)
+        level = logging.DEBUG if debug else logging.INFO
 
         logger = logging.getLogger("process_uploads")
-        logger.setLevel(logging.DEBUG if debug else logging.INFO)
-        
+        logger.setLevel(level)
+        logger.propagate = False
+
         # Clear any previous handlers
         if logger.hasHandlers():
             logger.handlers.clear()
 
-        # Create console handler with color
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.DEBUG if debug else logging.INFO)
-        console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(console_formatter)
+        # Console handler with color.
+        console_handler = logging.StreamHandler(sys.stderr if cls._console_only else sys.stdout)
+        console_handler.setFormatter(ColorFormatter(LOG_FORMAT))
+        cls._handlers = [console_handler]
 
-        # Create file handler without color by using our custom NoColorFormatter
-        file_handler = logging.FileHandler(log_path, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG if debug else logging.INFO)
-        file_formatter = NoColorFormatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(file_formatter)
+        if not cls._console_only:
+            # File handler, plain text, rotated by size and day.
+            file_handler = RotatingLogFileHandler(log_path)
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            cls._handlers.append(file_handler)
 
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        # Formatting and I/O happen on the listener thread; callers only enqueue.
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(_DeferredQueueHandler(log_queue))
+        cls._listener = logging.handlers.QueueListener(log_queue, *cls._handlers, respect_handler_level=True)
+        cls._listener.start()
+        atexit.register(cls.shutdown)
 
-        logger.info(f"Logger initialized. Log file at: {log_path}")
         cls._logger = logger
+        if cls._console_only:
+            logger.debug("Logger initialized (console only).")
+        else:
+            logger.info("Logger initialized. Log file at: %s", log_path)
+
+    @classmethod
+    def configure(cls, log_settings: dict):
+        """
+        Apply the "logging" settings section:
+        {
+            "level": "INFO", "max_bytes": 10485760, "retention_days": 14, "max_files": 50, "compress": true,
+            "levels": {"reminders": "WARNING", "on_message": "INFO"},
+            "json_lines": false, "json_path": "logs/bot.jsonl"
+        }
+        """
+        cls._initialize()
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        # Both file sinks share the rotation, compression and retention settings.
+        rotation = {
+            "max_bytes": log_settings.get("max_bytes", DEFAULT_MAX_BYTES),
+            "compress": log_settings.get("compress", True),
+            "retention_days": log_settings.get("retention_days", DEFAULT_RETENTION_DAYS),
+            "max_files": log_settings.get("max_files", DEFAULT_MAX_FILES),
+        }
+        file_handler = RotatingLogFileHandler(os.path.join(LOGS_DIR, LOG_FILE), **rotation)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers = [cls._handlers[0], file_handler]
+        json_path = None
+        if log_settings.get("json_lines", False):
+            json_path = log_settings.get("json_path", os.path.join(LOGS_DIR, "bot.jsonl"))
+            os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+            json_handler = RotatingLogFileHandler(json_path, **rotation)
+            json_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(json_handler)
+        previous = cls._handlers[1:]
+        cls._restart_listener(handlers)
+        for handler in previous:
+            handler.close()
+
+        cls.set_level(log_settings.get("level", "INFO"))
+        # Per-subsystem levels only affect loggers obtained through Logger.get().
+        for subsystem, level in log_settings.get("levels", {}).items():
+            cls.get(subsystem).setLevel(level.upper())
+        if json_path:
+            cls._logger.info("JSON-lines logging enabled at %s", json_path)
 
     @classmethod
-    def _colorize(cls, level, msg):
-        """Colorize the log message based on the log level."""
-        color = cls.COLORS.get(level, cls.COLORS['RESET'])
-        return f"{color}{msg}{cls.COLORS['RESET']}"
+    def get(cls, subsystem: str) -> logging.Logger:
+        """
+        Logger for a noisy subsystem (e.g. "reminders", "on_message") whose level
+        can be set separately in settings; it writes through the same handlers.
+        """
+        cls._initialize()
+        return cls._logger.getChild(subsystem)
+
+    @classmethod
+    def _restart_listener(cls, handlers: list):
+        log_queue = cls._listener.queue
+        cls._listener.stop()
+        cls._handlers = handlers
+        cls._listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        cls._listener.start()
+
+    @classmethod
+    def is_enabled_for(cls, level: int) -> bool:
+        """Cheap level check for callers that need to build expensive log arguments."""
+        if cls._logger is None:
+            cls._initialize()
+        return cls._logger.isEnabledFor(level)
 
     @classmethod
     def debug(cls, msg, *args, **kwargs):
         if cls._logger is None:
             cls._initialize(debug=True)
-        cls._logger.debug(cls._colorize('DEBUG', msg), *args, **kwargs)
+        cls._logger.debug(msg, *args, **kwargs)
 
     @classmethod
     def info(cls, msg, *args, **kwargs):
         if cls._logger is None:
             cls._initialize(debug=False)
-        cls._logger.info(cls._colorize('INFO', msg), *args, **kwargs)
+        cls._logger.info(msg, *args, **kwargs)
 
     @classmethod
     def warning(cls, msg, *args, **kwargs):
         if cls._logger is None:
             cls._initialize(debug=False)
-        cls._logger.warning(cls._colorize('WARNING', msg), *args, **kwargs)
+        cls._logger.warning(msg, *args, **kwargs)
 
     @classmethod
     def error(cls, msg, *args, **kwargs):
         if cls._logger is None:
             cls._initialize(debug=False)
-        cls._logger.error(cls._colorize('ERROR', msg), *args, **kwargs)
+        cls._logger.error(msg, *args, **kwargs)
 
     @classmethod
     def critical(cls, msg, *args, **kwargs):
         if cls._logger is None:
             cls._initialize(debug=False)
-        cls._logger.critical(cls._colorize('CRITICAL', msg), *args, **kwargs)
+        cls._logger.critical(msg, *args, **kwargs)
+
+    @classmethod
+    def set_level(cls, level):
+        """Set the base level, e.g. "WARNING" to keep load tests quiet."""
+        cls._initialize()
+        cls._logger.setLevel(level.upper() if isinstance(level, str) else level)
 
     @classmethod
     def set_debug(cls, debug=True):
-        cls._initialize(debug=debug)
\ No newline at end of file
+        cls._initialize(debug=debug)
+        cls._logger.setLevel(logging.DEBUG if debug else logging.INFO)
+
+    @classmethod
+    def shutdown(cls):
+        """Flush queued records, stop the listener thread and finish pending compression."""
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
+            for handler in cls._handlers:
+                handler.close()
@@ -0,0 +1,86 @@
+import logging
+from prometheus_client import Counter, Histogram, start_http_server
+from helpers.Logger import Logger
+
+# Buckets for work measured in minutes rather than milliseconds.
+LONG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, float("inf"))
+
+MESSAGE_HANDLING_SECONDS = Histogram(
+    "hatebot_on_message_seconds", "Time Client.on_message takes to dispatch handlers and process commands"
+)
+HANDLER_SECONDS = Histogram(
+    "hatebot_message_handler_seconds", "Run time of each concurrent message handler", ["handler"], buckets=(
+        0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+)
+HANDLER_OUTCOMES = Counter(
+    "hatebot_message_handler_total", "Message handler runs by outcome (ok/timeout/error/cancelled)", ["handler", "outcome"]
+)
+AI_WAIT_SECONDS = Histogram(
+    "hatebot_ai_wait_seconds", "Time from a message being sent to its OpenAI completion being requested"
+)
+AI_COMPLETION_SECONDS = Histogram(
+    "hatebot_ai_completion_seconds", "OpenAI chat completion latency"
+)
+AI_SKIPPED = Counter(
+    "hatebot_ai_skipped_total", "AI channel messages skipped because a completion was already running"
+)
+AI_TOKENS = Counter(
+    "hatebot_ai_tokens_total", "Tokens sent to and received from OpenAI", ["kind"]
+)
+CHROMA_QUERY_SECONDS = Histogram(
+    "hatebot_chroma_query_seconds", "Knowledge base (Chroma) query latency"
+)
+MODERATION_SECONDS = Histogram(
+    "hatebot_moderation_api_seconds", "OpenAI moderation API latency"
+)
+MODERATION_VERDICTS = Counter(
+    "hatebot_moderation_verdicts_total", "Moderation outcomes", ["verdict"]
+)
+REMINDER_LAG_SECONDS = Histogram(
+    "hatebot_reminder_lag_seconds", "Delay between a reminder's scheduled and actual delivery time",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, float("inf"))
+)
+EMBEDDING_SECONDS = Histogram(
+    "hatebot_embedding_seconds", "Time an embedding request takes, queueing included", ["kind"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float("inf"))
+)
+WIKI_STAGE_SECONDS = Histogram(
+    "hatebot_wiki_stage_seconds", "Duration of each wiki crawl/index stage", ["stage"], buckets=LONG_BUCKETS
+)
+DISCORD_RATE_LIMITS = Counter(
+    "hatebot_discord_rate_limits_total", "Discord REST responses that were rate limited (HTTP 429)"
+)
+
+class _RateLimitCounter(logging.Handler):
+    """
+    Counts 429 responses from discord.py's own log records. Its HTTP client
+    waits out most rate limits internally, so the warning it logs for every
+    429 is the one place all of them surface.
+    """
+
+    def emit(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith("We are being rate limited."):
+            DISCORD_RATE_LIMITS.inc()
+
+def count_discord_rate_limits():
+    """Feed DISCORD_RATE_LIMITS from the "discord.http" logger (safe to call more than once)."""
+    logger = logging.getLogger("discord.http")
+    if not any(isinstance(handler, _RateLimitCounter) for handler in logger.handlers):
+        logger.addHandler(_RateLimitCounter(logging.WARNING))
+
+def start_metrics_server(metrics_settings: dict) -> bool:
+    """
+    Start the Prometheus HTTP endpoint from the "metrics" settings section:
+    {"enabled": false, "host": "127.0.0.1", "port": 9108}
+    """
+    if not metrics_settings.get("enabled", False):
+        return False
+    host = metrics_settings.get("host", "127.0.0.1")
+    port = metrics_settings.get("port", 9108)
+    try:
+        start_http_server(port, addr=host)
+        Logger.info(f"Prometheus metrics available at http://{host}:{port}/metrics")
+        return True
+    except Exception as e:
+        Logger.error(f"Failed to start the metrics endpoint on {host}:{port}: {e}")
+        return False
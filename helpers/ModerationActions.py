@@ -0,0 +1,90 @@
+import asyncio
+import discord
+from helpers.Logger import Logger
+from helpers.RateLimit import RestQueue
+
+# Discord allows at most 10 embeds and 6000 embed characters per message.
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARACTERS = 6000
+
+class LogBatcher:
+    """
+    Collects log embeds per channel and sends them as a single message once
+    the batch window closes, so a burst of violations is one REST call.
+    """
+
+    def __init__(self, rest_queue: RestQueue, batch_window: float = 2.0):
+        self.rest_queue = rest_queue
+        self.batch_window = batch_window
+        self._pending = {}
+        self._flush_tasks = {}
+
+    def add(self, channel: discord.abc.Messageable, embed: discord.Embed):
+        channel_id = channel.id
+        self._pending.setdefault(channel_id, (channel, []))[1].append(embed)
+        if channel_id not in self._flush_tasks:
+            self._flush_tasks[channel_id] = asyncio.create_task(self._flush_later(channel_id))
+
+    async def _flush_later(self, channel_id: int):
+        try:
+            await asyncio.sleep(self.batch_window)
+        finally:
+            self._flush_tasks.pop(channel_id, None)
+        channel, embeds = self._pending.pop(channel_id, (None, []))
+        for batch in self._pack(embeds):
+            self.rest_queue.submit(lambda batch=batch: channel.send(embeds=batch), f"log embed batch to channel {channel_id}")
+            Logger.info(f"Queued {len(batch)} moderation log embed(s) for channel {channel_id}")
+
+    @staticmethod
+    def _pack(embeds: list) -> list:
+        """Split embeds into message-sized batches."""
+        batches = []
+        current = []
+        current_size = 0
+        for embed in embeds:
+            size = len(embed)
+            if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or current_size + size > MAX_EMBED_CHARACTERS):
+                batches.append(current)
+                current = []
+                current_size = 0
+            current.append(embed)
+            current_size += size
+        if current:
+            batches.append(current)
+        return batches
+
+class ModerationActionExecutor:
+    """
+    Runs the side effects of a moderation decision.
+    The removal runs first on its own so the message disappears after one
+    round-trip; the remaining actions then run concurrently.
+    """
+
+    def __init__(self, rest_queue: RestQueue, batch_window: float = 2.0):
+        self.rest_queue = rest_queue
+        self.log_batcher = LogBatcher(rest_queue, batch_window)
+
+    async def execute(self, removal=None, actions: list = None, log_channel=None, log_embed: discord.Embed = None):
+        """
+        removal: coroutine factory for deleting the message, or None.
+        actions: list of (description, coroutine factory) run concurrently.
+        log_channel/log_embed: embed to add to the channel's log batch.
+        """
+        if removal is not None:
+            try:
+                await self.rest_queue.call(removal, "message delete")
+            except Exception as e:
+                Logger.error(f"Failed to run moderation removal: {e}")
+        if log_channel is not None and log_embed is not None:
+            self.log_batcher.add(log_channel, log_embed)
+        actions = actions or []
+        results = await asyncio.gather(
+            *(self.rest_queue.call(factory, description) for description, factory in actions),
+            return_exceptions=True
+        )
+        for (description, _), result in zip(actions, results):
+            if isinstance(result, Exception):
+                Logger.error(f"Moderation action '{description}' failed: {result}")
+            else:
+                Logger.debug(f"Moderation action '{description}' completed.")
+        return results
@@ -0,0 +1,178 @@
+import re
+import json
+import time
+import datetime
+from collections import deque, Counter
+from pathlib import Path
+from helpers.Logger import Logger
+
+DEFAULT_LADDER = ["warn", "1m", "1h", "1d"]
+DEFAULT_DECAY_WINDOW = "7d"
+
+def parse_timeout(duration_str: str) -> datetime.timedelta:
+    """
+    Parse a duration string formatted as a number followed by 'm', 'h', or 'd'
+    into a datetime.timedelta object.
+    Example: "1m" -> 1 minute, "2h" -> 2 hours, "3d" -> 3 days.
+    Returns None if parsing fails.
+    """
+    match = re.match(r"(\d+)([mhd])", duration_str)
+    if not match:
+        return None
+    value = int(match.group(1))
+    unit = match.group(2)
+    if unit == "m":
+        return datetime.timedelta(minutes=value)
+    elif unit == "h":
+        return datetime.timedelta(hours=value)
+    elif unit == "d":
+        return datetime.timedelta(days=value)
+    return None
+
+class PenaltyPolicy:
+    """
+    An escalation ladder such as ["warn", "1m", "1h", "1d"].
+    The Nth violation inside the decay window gets the Nth step; anything past
+    the end of the ladder gets the last step.
+    """
+
+    def __init__(self, ladder: list, decay_window: datetime.timedelta):
+        if not ladder:
+            raise ValueError("Penalty ladder must contain at least one step.")
+        self.ladder = list(ladder)
+        self.decay_window = decay_window
+        # Pre-parse the ladder so decisions never re-parse duration strings.
+        self._durations = [None if step == "warn" else parse_timeout(step) for step in self.ladder]
+        for step, duration in zip(self.ladder, self._durations):
+            if step != "warn" and duration is None:
+                raise ValueError(f"Invalid penalty step '{step}'.")
+
+    @classmethod
+    def from_settings(cls, mod_settings: dict) -> "PenaltyPolicy":
+        """
+        Build a policy from the moderation settings section.
+        Without a "penalties" section the ladder is the single legacy
+        timeout_duration, which keeps the old behaviour.
+        """
+        penalty_settings = mod_settings.get("penalties")
+        if penalty_settings is None:
+            ladder = [mod_settings.get("timeout_duration", "1m")]
+            decay = DEFAULT_DECAY_WINDOW
+        else:
+            ladder = penalty_settings.get("ladder", DEFAULT_LADDER)
+            decay = penalty_settings.get("decay_window", DEFAULT_DECAY_WINDOW)
+        decay_window = parse_timeout(decay)
+        if decay_window is None:
+            raise ValueError(f"Invalid penalty decay window '{decay}'.")
+        return cls(ladder, decay_window)
+
+    def step_for(self, count: int) -> tuple:
+        """Return (step, timedelta or None) for the Nth violation in the window."""
+        index = min(max(count, 1), len(self.ladder)) - 1
+        return self.ladder[index], self._durations[index]
+
+class SlidingWindowCounter:
+    """Per-user violation timestamps, pruned to the decay window on access."""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._events = {}
+
+    def _prune(self, user_id: int, now: float) -> deque:
+        events = self._events.get(user_id)
+        if events is None:
+            return None
+        cutoff = now - self.window_seconds
+        while events and events[0] < cutoff:
+            events.popleft()
+        if not events:
+            del self._events[user_id]
+            return None
+        return events
+
+    def count(self, user_id: int, now: float = None) -> int:
+        now = now if now is not None else time.time()
+        events = self._prune(user_id, now)
+        return len(events) if events else 0
+
+    def record(self, user_id: int, timestamp: float = None) -> int:
+        """Record a violation and return the count inside the window, including it."""
+        timestamp = timestamp if timestamp is not None else time.time()
+        self._prune(user_id, timestamp)
+        events = self._events.setdefault(user_id, deque())
+        events.append(timestamp)
+        return len(events)
+
+class PenaltyEngine:
+    """Decides the penalty for a violation from the in-memory sliding window."""
+
+    def __init__(self, policy: PenaltyPolicy, store=None, dry_run: bool = False):
+        self.policy = policy
+        self.dry_run = dry_run
+        self.counter = SlidingWindowCounter(policy.decay_window.total_seconds())
+        if store is not None:
+            self.seed(store)
+
+    @classmethod
+    def from_settings(cls, mod_settings: dict, store=None) -> "PenaltyEngine":
+        policy = PenaltyPolicy.from_settings(mod_settings)
+        dry_run = mod_settings.get("penalties", {}).get("dry_run", False)
+        return cls(policy, store=store, dry_run=dry_run)
+
+    def seed(self, store):
+        """Load violations that are still inside the decay window from the store."""
+        since = time.time() - self.counter.window_seconds
+        seeded = 0
+        for user_id, created_at in store.violations_since(since):
+            self.counter.record(user_id, created_at)
+            seeded += 1
+        Logger.info(f"Penalty engine seeded with {seeded} violation(s) inside the decay window.")
+
+    def decide(self, user_id: int, timestamp: float = None) -> tuple:
+        """
+        Return (step, timedelta or None, window_count) for a new violation by the
+        user without recording it; call record() once the violation is saved.
+        """
+        window_count = self.counter.count(user_id, timestamp) + 1
+        step, duration = self.policy.step_for(window_count)
+        return step, duration, window_count
+
+    def record(self, user_id: int, timestamp: float = None):
+        """Count a saved violation towards the user's decay window."""
+        self.counter.record(user_id, timestamp)
+
+    def simulate(self, history: list) -> dict:
+        """
+        Replay [(user_id, created_at), ...] (oldest first) through a fresh
+        counter under this policy and summarise the penalties it would hand out.
+        """
+        engine = PenaltyEngine(self.policy)
+        steps = Counter()
+        per_user = {}
+        for user_id, created_at in history:
+            step, _, _ = engine.decide(user_id, created_at)
+            engine.record(user_id, created_at)
+            steps[step] += 1
+            per_user.setdefault(user_id, []).append(step)
+        repeat_offenders = sum(1 for user_steps in per_user.values() if len(user_steps) > 1)
+        return {
+            "violations": len(history),
+            "users": len(per_user),
+            "repeat_offenders": repeat_offenders,
+            "steps": dict(steps),
+            "per_user": per_user
+        }
+
+if __name__ == "__main__":
+    # Dry-run the configured ladder over the recorded violation history.
+    # Usage: python -m helpers.Penalties
+    from helpers.Storage import Database
+    from helpers.Repositories import ViolationRepository
+    with open(Path("./settings.json"), "r", encoding="utf-8") as f:
+        mod_settings = json.load(f).get("moderation", {})
+    store = ViolationRepository(Database())
+    engine = PenaltyEngine.from_settings(mod_settings)
+    summary = engine.simulate(store.violations_since(0))
+    summary.pop("per_user")
+    print(f"Ladder: {engine.policy.ladder} | Decay window: {engine.policy.decay_window}")
+    print(json.dumps(summary, indent=4))
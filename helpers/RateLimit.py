@@ -0,0 +1,100 @@
+import asyncio
+import discord
+from helpers.Logger import Logger
+
+# Passed to commands.Bot as max_ratelimit_timeout. discord.py sleeps through
+# shorter 429s itself (per route) and raises discord.RateLimited for longer
+# ones, which RestQueue turns into a queue-wide pause. 30 is the smallest value
+# discord.py accepts.
+MAX_RATELIMIT_TIMEOUT = 30.0
+
+def retry_after_from(error: Exception):
+    """
+    Return the number of seconds to wait if `error` is a Discord rate limit,
+    otherwise None.
+    """
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        try:
+            return float(error.response.headers.get("Retry-After", 1))
+        except Exception:
+            return 1.0
+    return None
+
+class RestQueue:
+    """
+    Shared, rate-limit-aware runner for Discord REST calls.
+    A rate limit longer than MAX_RATELIMIT_TIMEOUT on any call pauses every
+    caller of the queue until Retry-After has passed, after which the call is
+    retried; discord.py waits out shorter ones inside the request.
+
+    call()   runs a request inline (for latency-critical work such as deletes).
+    submit() queues a request for the background workers and returns a future.
+    """
+
+    def __init__(self, workers: int = 2, max_retries: int = 3, max_queue: int = 1000):
+        self.worker_count = workers
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+        self._queue = None
+        self._workers = []
+        self._resume_at = 0.0
+
+    def _ensure_started(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        for index in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+        Logger.debug(f"RestQueue started with {self.worker_count} worker(s).")
+
+    async def _wait_for_resume(self):
+        loop = asyncio.get_running_loop()
+        delay = self._resume_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def call(self, factory, description: str = "request"):
+        """Run `factory()` (a coroutine factory) now, retrying on rate limits."""
+        attempt = 0
+        while True:
+            await self._wait_for_resume()
+            try:
+                return await factory()
+            except Exception as e:
+                # 429s are counted from discord.py's log (helpers/Metrics.py), not here.
+                retry_after = retry_after_from(e)
+                if retry_after is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                loop = asyncio.get_running_loop()
+                self._resume_at = max(self._resume_at, loop.time() + retry_after)
+                Logger.warning(f"Rate limited on {description}; pausing REST queue for {retry_after:.2f}s (attempt {attempt}/{self.max_retries}).")
+
+    def submit(self, factory, description: str = "request") -> asyncio.Future:
+        """Queue `factory()` for a background worker. Returns a future with its result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        # Fire-and-forget callers never await the future; mark failures as retrieved.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            self._queue.put_nowait((factory, description, future))
+        except asyncio.QueueFull:
+            Logger.error(f"RestQueue is full; dropping {description}.")
+            future.set_exception(RuntimeError("RestQueue is full"))
+        return future
+
+    async def _worker(self, index: int):
+        while True:
+            factory, description, future = await self._queue.get()
+            try:
+                result = await self.call(factory, description)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                Logger.error(f"RestQueue worker {index} failed {description}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
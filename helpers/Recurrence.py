@@ -0,0 +1,89 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+UTC = datetime.timezone.utc
+
+def parse_military_time(time_str: str) -> tuple:
+    """Parse 'HHMM' into (hour, minute). Raises ValueError when invalid."""
+    if not (len(time_str) == 4 and time_str.isdigit()):
+        raise ValueError(f"Invalid military time '{time_str}'.")
+    hour = int(time_str[:2])
+    minute = int(time_str[2:])
+    if hour > 23 or minute > 59:
+        raise ValueError(f"Invalid military time '{time_str}'.")
+    return hour, minute
+
+def local_fire_instant(date: datetime.date, hour: int, minute: int, zone: ZoneInfo) -> datetime.datetime:
+    """
+    Return the UTC instant for HH:MM local time on `date`.
+
+    DST is resolved deterministically through fold=0:
+    - in a gap (the wall time does not exist) the pre-transition offset is used,
+      which lands the same distance past the transition (02:30 -> 03:30);
+    - in an overlap (the wall time happens twice) the first occurrence is used.
+    """
+    local = datetime.datetime(date.year, date.month, date.day, hour, minute, tzinfo=zone, fold=0)
+    return local.astimezone(UTC)
+
+class Recurrence:
+    """
+    A daily-granularity recurrence: HH:MM in an IANA zone every `frequency` days.
+    Fire dates are anchored to the previous scheduled local date rather than
+    the moment a reminder was actually sent, so delivery delays never drift the schedule.
+    """
+
+    def __init__(self, time_str: str, timezone: str, frequency: int):
+        if frequency < 1:
+            raise ValueError("Frequency must be a positive integer.")
+        self.hour, self.minute = parse_military_time(time_str)
+        self.zone = ZoneInfo(timezone)
+        self.frequency = frequency
+
+    @classmethod
+    def from_reminder(cls, reminder_data: dict) -> "Recurrence":
+        return cls(reminder_data["time"], reminder_data["timezone"], int(reminder_data["frequency"]))
+
+    def at(self, date: datetime.date) -> datetime.datetime:
+        return local_fire_instant(date, self.hour, self.minute, self.zone)
+
+    def first_fire(self, now: datetime.datetime) -> datetime.datetime:
+        """The first occurrence of HH:MM local time at or after `now`."""
+        today = now.astimezone(self.zone).date()
+        candidate = self.at(today)
+        if candidate < now:
+            candidate = self.at(today + datetime.timedelta(days=1))
+        return candidate
+
+    def next_after(self, previous_fire: datetime.datetime, now: datetime.datetime) -> datetime.datetime:
+        """
+        The next scheduled fire after `previous_fire` that is later than `now`.
+        Periods missed while the bot was offline are skipped rather than replayed.
+        """
+        date = previous_fire.astimezone(self.zone).date() + datetime.timedelta(days=self.frequency)
+        candidate = self.at(date)
+        if candidate <= now:
+            missed_days = (now.astimezone(self.zone).date() - date).days
+            periods = max(missed_days // self.frequency, 0)
+            date += datetime.timedelta(days=periods * self.frequency)
+            candidate = self.at(date)
+            while candidate <= now:
+                date += datetime.timedelta(days=self.frequency)
+                candidate = self.at(date)
+        return candidate
+
+    def initial_fire(self, last_reminded: str, now: datetime.datetime) -> datetime.datetime:
+        """
+        Next fire for a reminder without a stored next_fire (new or migrated).
+        A legacy last_reminded timestamp anchors the schedule to its local date.
+        """
+        if not last_reminded:
+            return self.first_fire(now)
+        previous = datetime.datetime.fromisoformat(last_reminded)
+        if previous.tzinfo is None:
+            previous = previous.replace(tzinfo=self.zone)
+        date = previous.astimezone(self.zone).date() + datetime.timedelta(days=self.frequency)
+        candidate = self.at(date)
+        if candidate < now:
+            # Overdue while the bot was offline: deliver once now, then resume the schedule.
+            return now
+        return candidate
@@ -0,0 +1,506 @@
+import json
+import time
+import datetime
+from pathlib import Path
+from helpers.Logger import Logger
+from helpers.Storage import Database
+
+# Legacy JSON locations, imported once into the database.
+LEGACY_TIPS_FILE = Path("./data/tips.json")
+LEGACY_REMINDERS_DIR = Path("./data/Reminders")
+LEGACY_WAITLIST_FILE = Path("./data/Guild/waitlist.json")
+LEGACY_AI_RESPONSES_FILE = Path("./data/ai_responses.json")
+LEGACY_MODERATION_DIR = Path("./data/moderation")
+
+def parse_legacy_time(value: str) -> float:
+    """
+    Convert a legacy violation timestamp (e.g. '2025-01-01T12:00:00.000000 UTC')
+    into a UTC epoch float. Returns 0.0 if the value cannot be parsed.
+    """
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace(" UTC", "").strip())
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+    except Exception:
+        return 0.0
+
+class Repository:
+    """Base class: creates the schema and runs the one-shot legacy import."""
+
+    SCHEMA = ""
+    LEGACY_KEY = None
+
+    def __init__(self, database: Database):
+        self.database = database
+        if self.SCHEMA:
+            self.database.execute_script(self.SCHEMA)
+        if self.LEGACY_KEY:
+            self.import_legacy()
+
+    def legacy_rows(self) -> list:
+        """Return rows read from the legacy JSON files. Overridden per repository."""
+        return []
+
+    def insert_legacy_rows(self, connection, rows: list):
+        """Write the rows from legacy_rows() inside the import transaction. Overridden per repository."""
+
+    def import_legacy(self) -> int:
+        """Import the legacy JSON data once; the import is recorded in the meta table."""
+        if self.database.get_meta(self.LEGACY_KEY):
+            return 0
+        rows = self.legacy_rows()
+
+        def job(connection):
+            if rows:
+                self.insert_legacy_rows(connection, rows)
+            connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (self.LEGACY_KEY, str(int(time.time())))
+            )
+
+        self.database.write_sync(job)
+        if rows:
+            Logger.info(f"{type(self).__name__}: imported {len(rows)} legacy record(s).")
+        return len(rows)
+
+class TipRepository(Repository):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tips (
+        message_id INTEGER PRIMARY KEY,
+        original_message_id INTEGER,
+        original_channel_id INTEGER,
+        content TEXT,
+        upvotes INTEGER NOT NULL DEFAULT 0,
+        downvotes INTEGER NOT NULL DEFAULT 0,
+        approved INTEGER NOT NULL DEFAULT 0,
+        submitted_by INTEGER,
+        original_author INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS tip_votes (
+        message_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        vote TEXT NOT NULL,
+        PRIMARY KEY (message_id, user_id, vote)
+    );
+    """
+    LEGACY_KEY = "legacy_tips_imported"
+    COLUMNS = ("original_message_id", "original_channel_id", "content", "upvotes", "downvotes",
+               "approved", "submitted_by", "original_author")
+
+    def legacy_rows(self) -> list:
+        if not LEGACY_TIPS_FILE.exists():
+            return []
+        try:
+            with open(LEGACY_TIPS_FILE, "r", encoding="utf-8") as f:
+                tips_data = json.load(f)
+        except Exception as e:
+            Logger.error(f"Error reading legacy tips file {LEGACY_TIPS_FILE}: {e}")
+            return []
+        return [(int(message_id), entry) for message_id, entry in tips_data.items()]
+
+    def insert_legacy_rows(self, connection, rows: list):
+        for message_id, entry in rows:
+            self._insert(connection, message_id, entry)
+
+    def _insert(self, connection, message_id: int, entry: dict):
+        connection.execute(
+            f"INSERT OR REPLACE INTO tips (message_id, {', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (message_id, *(int(entry.get(column, 0)) if column == "approved" else entry.get(column) for column in self.COLUMNS))
+        )
+
+    def _to_entry(self, row) -> dict:
+        entry = dict(zip(self.COLUMNS, row[1:]))
+        entry["approved"] = bool(entry["approved"])
+        return entry
+
+    async def add(self, message_id: int, entry: dict):
+        await self.database.write(lambda connection: self._insert(connection, message_id, entry))
+
+    async def get(self, message_id: int) -> dict:
+        row = await self.database.fetchone(f"SELECT message_id, {', '.join(self.COLUMNS)} FROM tips WHERE message_id = ?", (message_id,))
+        return self._to_entry(row) if row else None
+
+    async def all(self) -> dict:
+        """
+        Return {message_id: entry} for every tip.
+        Each entry also carries "upvoters" and "downvoters" sets of user IDs.
+        """
+        rows = await self.database.fetchall(f"SELECT message_id, {', '.join(self.COLUMNS)} FROM tips")
+        entries = {}
+        for row in rows:
+            entry = self._to_entry(row)
+            entry["upvoters"] = set()
+            entry["downvoters"] = set()
+            entries[row[0]] = entry
+        for message_id, user_id, vote in await self.database.fetchall("SELECT message_id, user_id, vote FROM tip_votes"):
+            if message_id in entries:
+                entries[message_id]["upvoters" if vote == "up" else "downvoters"].add(user_id)
+        return entries
+
+    async def save_many(self, entries: dict):
+        """Write {message_id: entry} (including voter sets, if present) in a single transaction."""
+        def job(connection):
+            for message_id, entry in entries.items():
+                self._insert(connection, message_id, entry)
+                if "upvoters" in entry or "downvoters" in entry:
+                    connection.execute("DELETE FROM tip_votes WHERE message_id = ?", (message_id,))
+                    connection.executemany(
+                        "INSERT INTO tip_votes (message_id, user_id, vote) VALUES (?, ?, ?)",
+                        [(message_id, user_id, "up") for user_id in entry.get("upvoters", ())] +
+                        [(message_id, user_id, "down") for user_id in entry.get("downvoters", ())]
+                    )
+
+        await self.database.write(job)
+
+class ReminderRepository(Repository):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reminders (
+        user_id INTEGER PRIMARY KEY,
+        time TEXT NOT NULL,
+        timezone TEXT NOT NULL,
+        frequency INTEGER NOT NULL,
+        last_reminded TEXT NOT NULL DEFAULT '',
+        next_fire REAL
+    );
+    """
+    LEGACY_KEY = "legacy_reminders_imported"
+
+    def __init__(self, database: Database):
+        super().__init__(database)
+        # Databases created before next_fire was precomputed need the column added.
+        columns = [row[1] for row in self.database.read_sync("PRAGMA table_info(reminders)")]
+        if "next_fire" not in columns:
+            self.database.execute_script("ALTER TABLE reminders ADD COLUMN next_fire REAL")
+
+    def legacy_rows(self) -> list:
+        rows = []
+        if not LEGACY_REMINDERS_DIR.exists():
+            return rows
+        for reminder_file in LEGACY_REMINDERS_DIR.glob("*.json"):
+            try:
+                user_id = int(reminder_file.stem)
+                with open(reminder_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                rows.append((user_id, data["time"], data["timezone"], int(data["frequency"]), data.get("last_reminded", "")))
+            except Exception as e:
+                Logger.error(f"Skipping legacy reminder file {reminder_file}: {e}")
+        return rows
+
+    def insert_legacy_rows(self, connection, rows: list):
+        connection.executemany("INSERT OR REPLACE INTO reminders (user_id, time, timezone, frequency, last_reminded) VALUES (?, ?, ?, ?, ?)", rows)
+
+    async def upsert(self, user_id: int, reminder_data: dict):
+        await self.database.execute(
+            "INSERT OR REPLACE INTO reminders (user_id, time, timezone, frequency, last_reminded, next_fire) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, reminder_data["time"], reminder_data["timezone"], reminder_data["frequency"], reminder_data.get("last_reminded", ""), reminder_data.get("next_fire"))
+        )
+
+    async def all(self) -> list:
+        """Return [(user_id, reminder_data), ...]."""
+        rows = await self.database.fetchall("SELECT user_id, time, timezone, frequency, last_reminded, next_fire FROM reminders")
+        return [
+            (user_id, {"time": time_str, "timezone": timezone, "frequency": frequency, "last_reminded": last_reminded, "next_fire": next_fire})
+            for user_id, time_str, timezone, frequency, last_reminded, next_fire in rows
+        ]
+
+    async def set_next_fire_many(self, next_fires: dict):
+        """Store precomputed next fire timestamps ({user_id: timestamp}) in one write."""
+        await self.database.executemany(
+            "UPDATE reminders SET next_fire = ? WHERE user_id = ?",
+            [(next_fire, user_id) for user_id, next_fire in next_fires.items()]
+        )
+
+    async def record_fired_many(self, last_reminded: str, next_fires: dict):
+        """After a delivery batch: set last_reminded and each user's next fire in one write."""
+        await self.database.executemany(
+            "UPDATE reminders SET last_reminded = ?, next_fire = ? WHERE user_id = ?",
+            [(last_reminded, next_fire, user_id) for user_id, next_fire in next_fires.items()]
+        )
+
+class WaitlistRepository(Repository):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS waitlist (
+        position INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS waitlist_overflow (
+        position INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL UNIQUE
+    );
+    """
+    LEGACY_KEY = "legacy_waitlist_imported"
+
+    def legacy_rows(self) -> list:
+        if not LEGACY_WAITLIST_FILE.exists():
+            return []
+        try:
+            with open(LEGACY_WAITLIST_FILE, "r", encoding="utf-8") as f:
+                return [(int(user_id),) for user_id in json.load(f)]
+        except Exception as e:
+            Logger.error(f"Error reading legacy waitlist file {LEGACY_WAITLIST_FILE}: {e}")
+            return []
+
+    def insert_legacy_rows(self, connection, rows: list):
+        connection.executemany("INSERT OR IGNORE INTO waitlist (user_id) VALUES (?)", rows)
+
+    async def all(self) -> list:
+        """Return waitlisted user IDs in join order."""
+        rows = await self.database.fetchall("SELECT user_id FROM waitlist ORDER BY position")
+        return [user_id for (user_id,) in rows]
+
+    async def overflow(self) -> list:
+        """Return user IDs queued behind a full waitlist, oldest first."""
+        rows = await self.database.fetchall("SELECT user_id FROM waitlist_overflow ORDER BY position")
+        return [user_id for (user_id,) in rows]
+
+    async def replace(self, members: list, overflow: list):
+        """Atomically replace the stored waitlist and overflow queue with a snapshot."""
+        def job(connection):
+            connection.execute("DELETE FROM waitlist")
+            connection.executemany("INSERT INTO waitlist (user_id) VALUES (?)", [(user_id,) for user_id in members])
+            connection.execute("DELETE FROM waitlist_overflow")
+            connection.executemany("INSERT INTO waitlist_overflow (user_id) VALUES (?)", [(user_id,) for user_id in overflow])
+        await self.database.write(job)
+
+    async def message_location(self) -> tuple:
+        """Return (channel_id, message_id) of the posted waitlist embed, or (None, 0)."""
+        rows = await self.database.fetchall(
+            "SELECT key, value FROM meta WHERE key IN ('waitlist_channel_id', 'waitlist_message_id')"
+        )
+        values = {key: int(value) for key, value in rows if value}
+        return values.get("waitlist_channel_id"), values.get("waitlist_message_id", 0)
+
+    async def set_message_location(self, channel_id: int, message_id: int):
+        def job(connection):
+            connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("waitlist_channel_id", str(channel_id)), ("waitlist_message_id", str(message_id))]
+            )
+        await self.database.write(job)
+
+class RoleJobRepository(Repository):
+    """Bulk role removal jobs, stored so an interrupted job can resume after a restart."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS role_jobs (
+        job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        role_id INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        finished_at REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS role_job_members (
+        job_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (job_id, user_id)
+    );
+    """
+
+    def __init__(self, database: Database):
+        super().__init__(database)
+        # Databases created before retries were capped need the counters added.
+        columns = [row[1] for row in self.database.read_sync("PRAGMA table_info(role_jobs)")]
+        for column in ("attempts", "failed"):
+            if column not in columns:
+                self.database.execute_script(f"ALTER TABLE role_jobs ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+    async def create(self, guild_id: int, role_id: int, user_ids: list) -> int:
+        """Create a job with every pending member in one write and return its ID."""
+        def job(connection):
+            job_id = connection.execute(
+                "INSERT INTO role_jobs (guild_id, role_id, total, created_at) VALUES (?, ?, ?, ?)",
+                (guild_id, role_id, len(user_ids), time.time())
+            ).lastrowid
+            connection.executemany("INSERT OR IGNORE INTO role_job_members (job_id, user_id) VALUES (?, ?)", [(job_id, user_id) for user_id in user_ids])
+            return job_id
+        return await self.database.write(job)
+
+    async def unfinished(self) -> list:
+        """Return [(job_id, guild_id, role_id, total), ...] for jobs that did not complete."""
+        return await self.database.fetchall("SELECT job_id, guild_id, role_id, total FROM role_jobs WHERE finished_at IS NULL ORDER BY job_id")
+
+    async def pending(self, job_id: int) -> list:
+        rows = await self.database.fetchall("SELECT user_id FROM role_job_members WHERE job_id = ?", (job_id,))
+        return [user_id for (user_id,) in rows]
+
+    async def start_attempt(self, job_id: int) -> int:
+        """Count a run of the job and return how many runs it has had, including this one."""
+        def job(connection):
+            connection.execute("UPDATE role_jobs SET attempts = attempts + 1 WHERE job_id = ?", (job_id,))
+            return connection.execute("SELECT attempts FROM role_jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+        return await self.database.write(job)
+
+    async def mark_done_many(self, job_id: int, user_ids: list, failed: int = 0):
+        """Remove members from the job; `failed` of them are counted as given up on."""
+        def job(connection):
+            connection.executemany("DELETE FROM role_job_members WHERE job_id = ? AND user_id = ?", [(job_id, user_id) for user_id in user_ids])
+            if failed:
+                connection.execute("UPDATE role_jobs SET failed = failed + ? WHERE job_id = ?", (failed, job_id))
+        await self.database.write(job)
+
+    async def finish(self, job_id: int) -> int:
+        """Mark the job finished and return how many of its members failed."""
+        def job(connection):
+            connection.execute("DELETE FROM role_job_members WHERE job_id = ?", (job_id,))
+            connection.execute("UPDATE role_jobs SET finished_at = ? WHERE job_id = ?", (time.time(), job_id))
+            return connection.execute("SELECT failed FROM role_jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+        return await self.database.write(job)
+
+class AIResponseRepository(Repository):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS ai_responses (
+        message_id INTEGER PRIMARY KEY,
+        original_message TEXT,
+        openai_response TEXT,
+        payload_token_count INTEGER,
+        response_token_count INTEGER,
+        good INTEGER NOT NULL DEFAULT 0,
+        bad INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS ai_feedback (
+        message_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (message_id, user_id)
+    );
+    """
+    LEGACY_KEY = "legacy_ai_responses_imported"
+
+    def legacy_rows(self) -> list:
+        if not LEGACY_AI_RESPONSES_FILE.exists():
+            return []
+        try:
+            with open(LEGACY_AI_RESPONSES_FILE, "r", encoding="utf-8") as f:
+                return [(int(message_id), entry) for message_id, entry in json.load(f).items()]
+        except Exception as e:
+            Logger.error(f"Error reading legacy AI responses file {LEGACY_AI_RESPONSES_FILE}: {e}")
+            return []
+
+    def insert_legacy_rows(self, connection, rows: list):
+        for message_id, entry in rows:
+            self._insert(connection, message_id, entry)
+            connection.executemany(
+                "INSERT OR IGNORE INTO ai_feedback (message_id, user_id) VALUES (?, ?)",
+                [(message_id, user_id) for user_id in entry.get("users", [])]
+            )
+
+    def _insert(self, connection, message_id: int, entry: dict):
+        connection.execute(
+            "INSERT OR REPLACE INTO ai_responses (message_id, original_message, openai_response, payload_token_count, response_token_count, good, bad) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (message_id, entry.get("original_message"), entry.get("openai_response"), entry.get("payload_token_count"),
+             entry.get("response_token_count"), entry.get("good", 0), entry.get("bad", 0))
+        )
+
+    async def add(self, message_id: int, entry: dict):
+        await self.database.write(lambda connection: self._insert(connection, message_id, entry))
+
+    async def ids(self) -> list:
+        rows = await self.database.fetchall("SELECT message_id FROM ai_responses")
+        return [message_id for (message_id,) in rows]
+
+    async def vote(self, message_id: int, user_id: int, good: bool) -> str:
+        """
+        Record a feedback vote. Returns "missing" if the response is unknown,
+        "duplicate" if the user already voted, otherwise "recorded".
+        """
+        def job(connection):
+            if connection.execute("SELECT 1 FROM ai_responses WHERE message_id = ?", (message_id,)).fetchone() is None:
+                return "missing"
+            cursor = connection.execute("INSERT OR IGNORE INTO ai_feedback (message_id, user_id) VALUES (?, ?)", (message_id, user_id))
+            if cursor.rowcount == 0:
+                return "duplicate"
+            column = "good" if good else "bad"
+            connection.execute(f"UPDATE ai_responses SET {column} = {column} + 1 WHERE message_id = ?", (message_id,))
+            return "recorded"
+
+        return await self.database.write(job)
+
+class ViolationRepository(Repository):
+    """
+    Moderation violation log.
+    Keeps an in-memory per-user counter index so the number of previous
+    violations for a user is a dictionary lookup.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS violations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        message_id INTEGER,
+        original_message TEXT,
+        reason TEXT,
+        category_scores TEXT,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_violations_user ON violations (user_id);
+    CREATE INDEX IF NOT EXISTS idx_violations_created ON violations (created_at);
+    """
+    LEGACY_KEY = "legacy_moderation_migrated"
+
+    def __init__(self, database: Database):
+        super().__init__(database)
+        rows = self.database.read_sync("SELECT user_id, COUNT(*) FROM violations GROUP BY user_id")
+        self._counts = {user_id: count for user_id, count in rows}
+        Logger.info(f"Violation log loaded with {sum(self._counts.values())} violation(s) for {len(self._counts)} user(s).")
+
+    def legacy_rows(self) -> list:
+        rows = []
+        if not LEGACY_MODERATION_DIR.exists():
+            return rows
+        for user_file in LEGACY_MODERATION_DIR.glob("*.json"):
+            try:
+                user_id = int(user_file.stem)
+                with open(user_file, "r", encoding="utf-8") as f:
+                    violations = json.load(f)
+            except Exception as e:
+                Logger.error(f"Skipping legacy moderation file {user_file}: {e}")
+                continue
+            for entry in violations:
+                rows.append((
+                    user_id,
+                    entry.get("message_id"),
+                    entry.get("original_message"),
+                    entry.get("reason"),
+                    json.dumps(entry.get("category_scores", {})),
+                    parse_legacy_time(entry.get("time", ""))
+                ))
+        return rows
+
+    def insert_legacy_rows(self, connection, rows: list):
+        connection.executemany(
+            "INSERT INTO violations (user_id, message_id, original_message, reason, category_scores, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+    def count(self, user_id: int) -> int:
+        """Return the number of recorded violations for a user."""
+        return self._counts.get(user_id, 0)
+
+    async def add(self, user_id: int, message_id: int, original_message: str, reason: str,
+                  category_scores: dict, created_at: float = None) -> int:
+        """Append a violation and return the user's new violation count."""
+        created_at = created_at if created_at is not None else time.time()
+        await self.database.execute(
+            "INSERT INTO violations (user_id, message_id, original_message, reason, category_scores, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, message_id, original_message, reason, json.dumps(category_scores), created_at)
+        )
+        # Counted only once the row is stored, so a failed write cannot advance the penalty ladder.
+        self._counts[user_id] = self._counts.get(user_id, 0) + 1
+        return self._counts[user_id]
+
+    def top_offenders(self, since: float, limit: int = 10) -> list:
+        """Return [(user_id, count), ...] for violations created at or after `since`."""
+        return self.database.read_sync(
+            "SELECT user_id, COUNT(*) AS total FROM violations WHERE created_at >= ? GROUP BY user_id ORDER BY total DESC LIMIT ?",
+            (since, limit)
+        )
+
+    def violations_since(self, since: float) -> list:
+        """Return [(user_id, created_at), ...] for violations at or after `since`, oldest first."""
+        return self.database.read_sync(
+            "SELECT user_id, created_at FROM violations WHERE created_at >= ? ORDER BY created_at",
+            (since,)
+        )
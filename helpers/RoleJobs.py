@@ -0,0 +1,130 @@
+import asyncio
+import discord
+from helpers.Logger import Logger
+from helpers.Repositories import RoleJobRepository
+
+# Concurrent remove-role requests per job; the RestQueue handles 429 pauses.
+DEFAULT_CONCURRENCY = 3
+# Completed members are persisted at least this often (seconds) while a job runs.
+PROGRESS_FLUSH_SECONDS = 2.0
+# Runs (the first one plus resumes) before members with transient errors are given up on.
+MAX_ATTEMPTS = 5
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Forbidden and other 4xx responses (except 429) fail the same way on every retry."""
+    return isinstance(error, discord.HTTPException) and 400 <= error.status < 500 and error.status != 429
+
+class BulkRoleRemover:
+    """
+    Removes a role from many members through the bot's RestQueue.
+
+    A job and its pending members are stored before any request is made, and
+    completed members are deleted from the job in batches, so a job cut short
+    by a restart resumes with only the members that are left. A permanent
+    failure (Forbidden or another 4xx) is counted as failed and the member is
+    done. After a transient one (5xx, RateLimited, connection errors) the
+    member stays pending and the job stays unfinished, so it is retried on the
+    next resume; after MAX_ATTEMPTS runs the job gives up on those members
+    too. Progress is reported through an optional async callback(done, total).
+    """
+
+    def __init__(self, bot: discord.Client, concurrency: int = DEFAULT_CONCURRENCY):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.jobs = RoleJobRepository(bot.database)
+        self._tasks = {}
+
+    async def start(self, guild_id: int, role_id: int, user_ids: list, progress=None) -> int:
+        """Store a new job and run it in the background. Returns the job ID."""
+        user_ids = list(dict.fromkeys(user_ids))
+        job_id = await self.jobs.create(guild_id, role_id, user_ids)
+        Logger.info(f"Role job {job_id}: removing role {role_id} from {len(user_ids)} member(s).")
+        self._spawn(job_id, guild_id, role_id, user_ids, len(user_ids), progress)
+        return job_id
+
+    async def resume(self):
+        """Resume jobs left unfinished by a previous run (call once at startup)."""
+        await self.bot.wait_until_ready()
+        for job_id, guild_id, role_id, total in await self.jobs.unfinished():
+            if job_id in self._tasks:
+                continue
+            pending = await self.jobs.pending(job_id)
+            Logger.info(f"Role job {job_id}: resuming with {len(pending)} of {total} member(s) left.")
+            self._spawn(job_id, guild_id, role_id, pending, total, None)
+
+    def _spawn(self, job_id: int, guild_id: int, role_id: int, user_ids: list, total: int, progress):
+        task = asyncio.create_task(self._run(job_id, guild_id, role_id, user_ids, total, progress))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _remove(self, guild_id: int, role_id: int, user_id: int):
+        # The raw route needs no member object, so uncached members cost no extra fetch.
+        await self.bot.rest_queue.call(
+            lambda: self.bot.http.remove_role(guild_id, user_id, role_id, reason="Waitlist reset"),
+            f"remove role {role_id} from {user_id}"
+        )
+
+    async def _run(self, job_id: int, guild_id: int, role_id: int, user_ids: list, total: int, progress):
+        queue = asyncio.Queue()
+        for user_id in user_ids:
+            queue.put_nowait(user_id)
+        done_base = total - len(user_ids)
+        processed = 0
+        unsaved = []
+        unsaved_failed = []
+        retrying = []
+
+        async def worker():
+            nonlocal processed
+            while not queue.empty():
+                user_id = queue.get_nowait()
+                try:
+                    await self._remove(guild_id, role_id, user_id)
+                except discord.NotFound:
+                    # Member left the guild; nothing to remove.
+                    pass
+                except Exception as e:
+                    processed += 1
+                    if is_permanent_failure(e):
+                        Logger.error(f"Role job {job_id}: cannot remove role from {user_id}, giving up: {e}")
+                        unsaved_failed.append(user_id)
+                    else:
+                        # Left pending so a resumed job retries it.
+                        Logger.error(f"Role job {job_id}: failed to remove role from {user_id}: {e}")
+                        retrying.append(user_id)
+                    continue
+                processed += 1
+                unsaved.append(user_id)
+
+        async def report():
+            done = done_base + processed
+            if unsaved or unsaved_failed:
+                batch, failed_batch = unsaved[:], unsaved_failed[:]
+                del unsaved[:len(batch)]
+                del unsaved_failed[:len(failed_batch)]
+                await self.jobs.mark_done_many(job_id, batch + failed_batch, failed=len(failed_batch))
+            if progress is not None:
+                try:
+                    await progress(done, total)
+                except Exception as e:
+                    Logger.error(f"Role job {job_id}: progress update failed: {e}")
+
+        workers = []
+        try:
+            attempt = await self.jobs.start_attempt(job_id)
+            workers = [asyncio.create_task(worker()) for _ in range(max(1, self.concurrency))]
+            while not all(task.done() for task in workers):
+                await asyncio.wait(workers, timeout=PROGRESS_FLUSH_SECONDS)
+                await report()
+            if retrying:
+                if attempt < MAX_ATTEMPTS:
+                    Logger.warning(f"Role job {job_id}: {len(retrying)} member(s) failed and stay pending; they are retried on the next resume (attempt {attempt}/{MAX_ATTEMPTS}).")
+                    return
+                Logger.error(f"Role job {job_id}: giving up on {len(retrying)} member(s) after {attempt} attempts.")
+                await self.jobs.mark_done_many(job_id, retrying, failed=len(retrying))
+            failed = await self.jobs.finish(job_id)
+            Logger.info(f"Role job {job_id}: finished, {total} member(s) processed, {failed} failed.")
+        except Exception as e:
+            Logger.error(f"Role job {job_id} stopped and will resume on restart: {e}")
+            for task in workers:
+                task.cancel()
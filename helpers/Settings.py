@@ -0,0 +1,179 @@
+import asyncio
+import json
+import inspect
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+from helpers.Logger import Logger
+
+SETTINGS_PATH = Path("./settings.json")
+
+def _section(cls, values: dict):
+    """Build a typed section from its JSON object, ignoring unknown keys."""
+    names = {f.name for f in dataclasses.fields(cls)}
+    return cls(**{key: value for key, value in (values or {}).items() if key in names})
+
+@dataclass(frozen=True)
+class BotSettings:
+    version: str = ""
+    environment: str = "development"
+
+    @property
+    def is_development(self) -> bool:
+        return self.environment == "development"
+
+@dataclass(frozen=True)
+class AISettings:
+    enabled: bool = False
+    model: str = "gpt-4o-mini"
+    max_input_tokens: int = 100000
+    max_completion_tokens: int = 5000
+    previous_messages: int = 5
+    handler_timeout: float = 180
+    development_channel: int = None
+    production_channel: int = None
+
+@dataclass(frozen=True)
+class WaitlistSettings:
+    waitlist_role: int = None
+    edit_interval: float = 2.0
+    capacity: int = 30
+
+@dataclass(frozen=True)
+class ReminderSettings:
+    dev_channel_id: int = None
+    production_channel_id: int = None
+
+@dataclass(frozen=True)
+class EmbeddingSettings:
+    backend: str = "onnx"
+    model: str = "all-MiniLM-L6-v2"
+    model_directory: str = ""
+    quantize: bool = False
+    batch_size: int = 32
+    threads: int = 0
+    max_length: int = 256
+    worker: bool = True
+    max_pending_batches: int = 2
+
+class Settings:
+    """
+    settings.json, parsed once and shared as bot.settings.
+
+    Sections are available as plain dicts (settings["wiki"], settings.get("tips", {}))
+    and, for the ones read on hot paths, as typed frozen dataclasses
+    (settings.ai, settings.waitlist, ...). The returned dicts are shared:
+    treat them as read-only. Runtime state does not belong here; it lives in
+    memory or in the database so this file is never written by the bot.
+
+    start_watching() reloads the file when it changes (via watchfiles) and
+    calls every subscriber with the new Settings. A file that fails to parse
+    is logged and ignored, keeping the last good configuration.
+    """
+
+    def __init__(self, path: Path = SETTINGS_PATH):
+        self.path = Path(path)
+        self._raw = {}
+        self._subscribers = []
+        self._watch_task = None
+        self._apply(self._read())
+        Logger.info(f"Loaded settings from {self.path}")
+
+    def _read(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _apply(self, raw: dict):
+        self._raw = raw
+        self.bot = _section(BotSettings, raw.get("bot"))
+        self.ai = _section(AISettings, raw.get("ai"))
+        self.waitlist = _section(WaitlistSettings, raw.get("waitlist"))
+        self.reminders = _section(ReminderSettings, raw.get("reminders"))
+        self.embeddings = _section(EmbeddingSettings, raw.get("embeddings"))
+
+    # ----- Raw access -----
+
+    def __getitem__(self, key: str):
+        return self._raw[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._raw
+
+    def get(self, key: str, default=None):
+        return self._raw.get(key, default)
+
+    @property
+    def environment(self) -> str:
+        return self.bot.environment
+
+    # ----- Hot reload -----
+
+    def subscribe(self, callback):
+        """
+        Call `callback(settings)` (a function or coroutine function) after every
+        successful reload. Returns a function that removes the subscription.
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+    async def reload(self) -> bool:
+        try:
+            raw = await asyncio.to_thread(self._read)
+        except Exception as e:
+            Logger.error(f"Ignoring settings change, {self.path} could not be loaded: {e}")
+            return False
+        if raw == self._raw:
+            return False
+        self._apply(raw)
+        Logger.info(f"Reloaded settings from {self.path}")
+        for callback in list(self._subscribers):
+            try:
+                result = callback(self)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                Logger.error(f"Settings subscriber {getattr(callback, '__qualname__', callback)} failed: {e}")
+        return True
+
+    def start_watching(self):
+        """Start the file watcher (needs a running event loop)."""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            Logger.warning("watchfiles is not installed; settings will not hot-reload.")
+            return
+        target = self.path.resolve()
+        # Watch the directory rather than the file so editors that save by
+        # replacing the file are still picked up.
+        try:
+            async for _ in awatch(target.parent, recursive=False, watch_filter=lambda _, path: Path(path).resolve() == target):
+                await self.reload()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            Logger.error(f"Settings watcher stopped: {e}")
+
+    async def close(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+_shared = None
+
+def get_settings(path: Path = SETTINGS_PATH) -> Settings:
+    """
+    The process-wide Settings instance (bot.settings), loaded from `path` on
+    first use; later calls return the same instance.
+    """
+    global _shared
+    if _shared is None:
+        _shared = Settings(path)
+    return _shared
@@ -0,0 +1,145 @@
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from helpers.Logger import Logger
+
+DATABASE_PATH = Path("./data/hatebot.db")
+# Maximum number of queued writes committed together in one transaction.
+MAX_WRITE_BATCH = 256
+
+class Database:
+    """
+    Shared SQLite database in WAL mode.
+
+    Reads run on a dedicated reader connection in a worker thread. Every write
+    goes through a single writer task, which drains the write queue and commits
+    whatever is waiting in one transaction (each write in its own savepoint so a
+    failing write does not roll back its neighbours). Because there is only one
+    writer, read-modify-write operations expressed as a single write job cannot
+    lose updates.
+    """
+
+    def __init__(self, path: Path = DATABASE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = self._connect()
+        self._reader = self._connect()
+        self._writer_lock = threading.Lock()
+        self._reader_lock = threading.Lock()
+        self._queue = None
+        self._writer_task = None
+        self.execute_script("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        Logger.info(f"Database opened at {self.path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are managed explicitly by the writer.
+        connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    def execute_script(self, script: str):
+        """Run schema statements synchronously (used by repositories at startup)."""
+        with self._writer_lock:
+            self._writer.executescript(script)
+
+    # ----- Reads -----
+
+    def read_sync(self, sql: str, params: tuple = ()) -> list:
+        with self._reader_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> list:
+        return await asyncio.to_thread(self.read_sync, sql, params)
+
+    async def fetchone(self, sql: str, params: tuple = ()):
+        rows = await self.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    # ----- Writes -----
+
+    def write_sync(self, job):
+        """Run `job(connection)` in its own transaction on the writer connection."""
+        with self._writer_lock:
+            self._writer.execute("BEGIN")
+            try:
+                result = job(self._writer)
+                self._writer.execute("COMMIT")
+                return result
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+
+    async def write(self, job):
+        """Queue `job(connection)` for the writer task and wait for its result."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._run_writer())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future))
+        return await future
+
+    async def execute(self, sql: str, params: tuple = ()) -> int:
+        """Queue a single statement and return the number of affected rows."""
+        return await self.write(lambda connection: connection.execute(sql, params).rowcount)
+
+    async def executemany(self, sql: str, rows: list) -> int:
+        return await self.write(lambda connection: connection.executemany(sql, rows).rowcount)
+
+    async def _run_writer(self):
+        Logger.debug("Database writer task started.")
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < MAX_WRITE_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await asyncio.to_thread(self._commit_batch, batch)
+            except Exception as e:
+                Logger.error(f"Database writer failed to commit a batch of {len(batch)} write(s): {e}")
+                results = [(None, e)] * len(batch)
+            for (_, future), (result, error) in zip(batch, results):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _commit_batch(self, batch: list) -> list:
+        results = []
+        with self._writer_lock:
+            self._writer.execute("BEGIN")
+            try:
+                for job, _ in batch:
+                    self._writer.execute("SAVEPOINT job")
+                    try:
+                        results.append((job(self._writer), None))
+                        self._writer.execute("RELEASE job")
+                    except Exception as e:
+                        self._writer.execute("ROLLBACK TO job")
+                        self._writer.execute("RELEASE job")
+                        results.append((None, e))
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+        return results
+
+    # ----- Meta -----
+
+    def get_meta(self, key: str):
+        rows = self.read_sync("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    async def set_meta(self, key: str, value):
+        await self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def close(self):
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        with self._writer_lock:
+            self._writer.close()
+        with self._reader_lock:
+            self._reader.close()
@@ -0,0 +1,134 @@
+import bisect
+import difflib
+import datetime
+import functools
+from zoneinfo import ZoneInfo
+import pytz
+
+# Discord allows at most 25 autocomplete choices.
+MAX_CHOICES = 25
+
+# Abbreviations people type instead of IANA names. Some are also legacy
+# fixed-offset zone names (EST, MST, HST, CET, EET, WET); the alias wins even
+# for those, in any casing, so users get the DST-aware city zone they mean.
+# GMT is left alone: the GMT zone is what people typing it mean.
+ALIASES = {
+    "est": "America/New_York",
+    "edt": "America/New_York",
+    "eastern": "America/New_York",
+    "cst": "America/Chicago",
+    "cdt": "America/Chicago",
+    "central": "America/Chicago",
+    "mst": "America/Denver",
+    "mdt": "America/Denver",
+    "mountain": "America/Denver",
+    "pst": "America/Los_Angeles",
+    "pdt": "America/Los_Angeles",
+    "pacific": "America/Los_Angeles",
+    "akst": "America/Anchorage",
+    "hst": "Pacific/Honolulu",
+    "bst": "Europe/London",
+    "wet": "Europe/Lisbon",
+    "cet": "Europe/Paris",
+    "cest": "Europe/Paris",
+    "eet": "Europe/Athens",
+    "msk": "Europe/Moscow",
+    "ist": "Asia/Kolkata",
+    "sgt": "Asia/Singapore",
+    "hkt": "Asia/Hong_Kong",
+    "jst": "Asia/Tokyo",
+    "kst": "Asia/Seoul",
+    "aest": "Australia/Sydney",
+    "acst": "Australia/Adelaide",
+    "awst": "Australia/Perth",
+    "nzst": "Pacific/Auckland",
+    "brt": "America/Sao_Paulo",
+}
+
+# Suggested when the user has not typed anything yet.
+DEFAULT_SUGGESTIONS = [
+    "UTC", "America/New_York", "America/Chicago", "America/Denver", "America/Los_Angeles",
+    "Europe/London", "Europe/Paris", "Europe/Berlin", "Asia/Kolkata", "Asia/Tokyo", "Australia/Sydney"
+]
+
+class TimezoneIndex:
+    """
+    Prebuilt lookup structures over pytz timezone names.
+    Validation is a set lookup; suggestions come from exact aliases, then
+    binary-searched prefix matches on the full name and on each path segment
+    or word (so "york" finds America/New_York), then fuzzy matches for typos.
+    """
+
+    def __init__(self, names=None):
+        self.names = frozenset(names if names is not None else pytz.all_timezones)
+        self._by_lower = {name.lower(): name for name in self.names}
+        self._sorted = sorted(self._by_lower)
+        # (segment, full name) pairs for each path segment and each word in it,
+        # e.g. ("new_york", "America/New_York") and ("york", "America/New_York").
+        segments = set()
+        for name in self.names:
+            for segment in name.lower().split("/")[1:]:
+                segments.add((segment, name))
+                for word in segment.replace("-", "_").split("_")[1:]:
+                    segments.add((word, name))
+        self._segments = sorted(segments)
+        self._segment_keys = [segment for segment, _ in self._segments]
+        # Common zones rank ahead of legacy ones such as US/Eastern.
+        self._common = frozenset(pytz.common_timezones)
+
+    def is_valid(self, name: str) -> bool:
+        return name in self.names
+
+    def resolve(self, text: str):
+        """
+        Map user input (an alias, an exact name, or a name in any casing) to a
+        zone name, or None. Aliases are checked first, so "est" and "EST" are
+        the DST-aware America/New_York rather than the fixed-offset EST zone.
+        """
+        key = text.strip().lower().replace(" ", "_")
+        if key in ALIASES:
+            return ALIASES[key]
+        if text in self.names:
+            return text
+        return self._by_lower.get(key)
+
+    def _prefixed(self, keys: list, prefix: str) -> range:
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_right(keys, prefix + "\uffff")
+        return range(start, end)
+
+    @functools.lru_cache(maxsize=2048)
+    def search(self, query: str, limit: int = MAX_CHOICES) -> tuple:
+        key = query.strip().lower().replace(" ", "_")
+        if not key:
+            return tuple(name for name in DEFAULT_SUGGESTIONS if name in self.names)[:limit]
+
+        results = []
+        seen = set()
+
+        def add(names):
+            for name in sorted(names, key=lambda name: (name not in self._common, name)):
+                if name not in seen:
+                    seen.add(name)
+                    results.append(name)
+
+        if key in ALIASES:
+            add([ALIASES[key]])
+        add(self._by_lower[self._sorted[i]] for i in self._prefixed(self._sorted, key))
+        add(self._segments[i][1] for i in self._prefixed(self._segment_keys, key))
+        if len(results) < limit:
+            close = difflib.get_close_matches(key, self._segment_keys, n=limit, cutoff=0.7)
+            add(name for segment, name in self._segments if segment in close)
+        return tuple(results[:limit])
+
+def utc_offset_label(name: str, now: datetime.datetime = None) -> str:
+    """Current UTC offset of a zone, e.g. 'UTC-04:00'."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    offset = now.astimezone(ZoneInfo(name)).utcoffset()
+    minutes = int(offset.total_seconds() // 60)
+    sign = "+" if minutes >= 0 else "-"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+# Built once at import; the name list is static for the life of the process.
+TIMEZONES = TimezoneIndex()
@@ -0,0 +1,78 @@
+import os
+import json
+import functools
+import threading
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from helpers.Logger import Logger
+
+# Until setup_tracing() installs a provider this is the API's no-op tracer,
+# so instrumented code costs next to nothing when tracing is disabled.
+tracer = trace.get_tracer("hatebot")
+
+class FileSpanExporter(SpanExporter):
+    """Writes finished spans as JSON lines for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(json.dumps(json.loads(span.to_json()), separators=(",", ":")) + "\n")
+            return SpanExportResult.SUCCESS
+        except Exception as e:
+            Logger.error(f"Failed to write {len(spans)} span(s) to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+
+    def shutdown(self):
+        pass
+
+def setup_tracing(tracing_settings: dict) -> bool:
+    """
+    Install the tracer provider from the "tracing" settings section:
+    {"enabled": false, "exporter": "otlp" or "file", "endpoint": "http://localhost:4317",
+     "file_path": "logs/traces.jsonl", "service_name": "hatebot"}
+    """
+    if not tracing_settings.get("enabled", False):
+        return False
+    exporter_name = tracing_settings.get("exporter", "otlp")
+    try:
+        if exporter_name == "file":
+            exporter = FileSpanExporter(tracing_settings.get("file_path", "logs/traces.jsonl"))
+        else:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter(
+                endpoint=tracing_settings.get("endpoint", "http://localhost:4317"),
+                insecure=tracing_settings.get("insecure", True)
+            )
+        provider = TracerProvider(resource=Resource.create({"service.name": tracing_settings.get("service_name", "hatebot")}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        Logger.info(f"Tracing enabled with the {exporter_name} exporter.")
+        return True
+    except Exception as e:
+        Logger.error(f"Failed to set up tracing: {e}")
+        return False
+
+def traced(name: str):
+    """Run the decorated coroutine function inside a span called `name`."""
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def set_attributes(**attributes):
+    """Set attributes on the current span (no-op when tracing is disabled)."""
+    span = trace.get_current_span()
+    if span.is_recording():
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
@@ -0,0 +1,50 @@
+import time
+import asyncio
+import discord
+from helpers.Logger import Logger
+
+class UserResolver:
+    """
+    Cached, concurrent user lookups.
+    Checks the gateway cache first, then a small TTL cache of fetched users,
+    and only then calls fetch_user through the bot's RestQueue. Concurrent
+    lookups of the same ID share one request.
+    """
+
+    def __init__(self, bot: discord.Client, ttl: float = 600.0, max_concurrency: int = 5):
+        self.bot = bot
+        self.ttl = ttl
+        self._cache = {}
+        self._pending = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _fetch(self, user_id: int):
+        async with self._semaphore:
+            return await self.bot.rest_queue.call(lambda: self.bot.fetch_user(user_id), f"fetch_user {user_id}")
+
+    async def resolve(self, user_id: int):
+        """Return the discord.User for `user_id`, or None if it cannot be fetched."""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user
+        cached = self._cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        task = self._pending.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(user_id))
+            self._pending[user_id] = task
+        try:
+            user = await asyncio.shield(task)
+        except Exception as e:
+            Logger.error(f"Failed to resolve user {user_id}: {e}")
+            return None
+        finally:
+            if task.done():
+                self._pending.pop(user_id, None)
+        self._cache[user_id] = (user, time.monotonic())
+        return user
+
+    async def resolve_many(self, user_ids: list) -> list:
+        """Resolve several users concurrently; results follow the input order."""
+        return list(await asyncio.gather(*(self.resolve(user_id) for user_id in user_ids)))
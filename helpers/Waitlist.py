@@ -0,0 +1,208 @@
+import asyncio
+from collections import deque
+import discord
+from helpers.Logger import Logger
+from helpers.WriteBehind import DebouncedWriter
+
+WAITLIST_TITLE = "Hateocracy 2 Guild Waitlist"
+WAITLIST_DESCRIPTION = "Click below to sign up for the Hateocracy 2 guild waitlist"
+DEFAULT_CAPACITY = 30
+# Minimum seconds between two edits of the waitlist message.
+DEFAULT_EDIT_INTERVAL = 2.0
+
+def build_waitlist_embed(waitlist: list, capacity: int = DEFAULT_CAPACITY, queued: int = 0) -> discord.Embed:
+    """Build the waitlist embed. Mentions are rendered from IDs, so no user lookups are needed."""
+    embed = discord.Embed(title=WAITLIST_TITLE, description=WAITLIST_DESCRIPTION, color=discord.Color.blue())
+    waitlist_str = "\n".join(f"<@{uid}>" for uid in waitlist) if waitlist else "No Players Yet..."
+    embed.add_field(name="Current Waitlist", value=waitlist_str, inline=False)
+    footer = f"Players {len(waitlist)}/{capacity}"
+    if queued:
+        footer += f" | {queued} in queue"
+    embed.set_footer(text=footer)
+    return embed
+
+class WaitlistService:
+    """
+    In-memory waitlist shared by the Signup and SignupClear cogs.
+
+    Membership is an ordered list plus a set for O(1) checks, guarded by an
+    asyncio lock. Joins beyond `capacity` go to an overflow queue and are
+    promoted in order as places free up. Every change is persisted as one
+    atomic snapshot through a debounced write-behind.
+    """
+
+    def __init__(self, repository, capacity: int = DEFAULT_CAPACITY, flush_delay: float = 1.0):
+        self.repository = repository
+        self.capacity = capacity
+        self._lock = asyncio.Lock()
+        self._members = []
+        self._member_set = set()
+        self._overflow = deque()
+        self._overflow_set = set()
+        self.writer = DebouncedWriter(self._persist, delay=flush_delay, name="waitlist writer")
+
+    async def load(self):
+        async with self._lock:
+            members = await self.repository.all()
+            overflow = await self.repository.overflow()
+            self._members = members[:self.capacity]
+            # Anyone past a lowered capacity moves to the front of the queue.
+            self._overflow = deque(members[self.capacity:] + overflow)
+            self._member_set = set(self._members)
+            self._overflow_set = set(self._overflow)
+            self._promote()
+        Logger.info(f"Waitlist loaded with {len(self._members)} player(s) and {len(self._overflow)} queued.")
+
+    @property
+    def members(self) -> list:
+        return list(self._members)
+
+    @property
+    def queued(self) -> int:
+        return len(self._overflow)
+
+    async def _persist(self, _keys):
+        await self.repository.replace(list(self._members), list(self._overflow))
+
+    def _promote(self) -> list:
+        promoted = []
+        while self._overflow and len(self._members) < self.capacity:
+            user_id = self._overflow.popleft()
+            self._overflow_set.discard(user_id)
+            self._members.append(user_id)
+            self._member_set.add(user_id)
+            promoted.append(user_id)
+        return promoted
+
+    async def join(self, user_id: int) -> str:
+        """Returns "joined", "queued", "already_joined" or "already_queued"."""
+        async with self._lock:
+            if user_id in self._member_set:
+                return "already_joined"
+            if user_id in self._overflow_set:
+                return "already_queued"
+            if len(self._members) < self.capacity:
+                self._members.append(user_id)
+                self._member_set.add(user_id)
+                result = "joined"
+            else:
+                self._overflow.append(user_id)
+                self._overflow_set.add(user_id)
+                result = "queued"
+            self.writer.mark()
+            return result
+
+    async def leave(self, user_id: int) -> tuple:
+        """
+        Returns (result, promoted) where result is "left", "left_queue" or
+        "missing" and promoted lists users moved up from the overflow queue.
+        """
+        async with self._lock:
+            if user_id in self._member_set:
+                self._members.remove(user_id)
+                self._member_set.discard(user_id)
+                promoted = self._promote()
+                self.writer.mark()
+                return "left", promoted
+            if user_id in self._overflow_set:
+                self._overflow.remove(user_id)
+                self._overflow_set.discard(user_id)
+                self.writer.mark()
+                return "left_queue", []
+            return "missing", []
+
+    async def clear(self) -> list:
+        """Empty the waitlist and queue, persist immediately and return who was on the list."""
+        async with self._lock:
+            removed = self._members + list(self._overflow)
+            self._members = []
+            self._member_set = set()
+            self._overflow = deque()
+            self._overflow_set = set()
+            self.writer.mark()
+        await self.writer.flush()
+        return removed
+
+    async def close(self):
+        await self.writer.close()
+
+class WaitlistRenderer:
+    """
+    Coalesces waitlist changes into at most one message edit per interval.
+
+    request() only records the latest state and returns immediately; a single
+    background flush edits the message with whatever state is current when it
+    runs. The message object is cached after the first fetch, so steady-state
+    updates cost exactly one edit.
+    """
+
+    def __init__(self, bot: discord.Client, view_factory, interval: float = DEFAULT_EDIT_INTERVAL):
+        self.bot = bot
+        self.channel_id = None
+        self.message_id = 0
+        self.view_factory = view_factory
+        self.interval = interval
+        self.capacity = DEFAULT_CAPACITY
+        self._state = None
+        self._flush_task = None
+        self._last_edit = 0.0
+        self._message = None
+
+    def request(self, waitlist: list, queued: int = 0):
+        """Schedule the embed to show `waitlist`. Never waits on Discord."""
+        self._state = (list(waitlist), queued)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    def set_location(self, channel_id: int, message_id: int):
+        """Point the renderer at the waitlist message, e.g. after /signup posts a new one."""
+        self.channel_id = channel_id
+        self.message_id = message_id or 0
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget the cached message."""
+        self._message = None
+
+    async def _resolve_message(self):
+        message_id = self.message_id
+        channel_id = self.channel_id
+        if not message_id or channel_id is None:
+            Logger.error("Waitlist embed has not been posted yet; run /signup.")
+            return None
+        if self._message is not None and self._message.id == message_id:
+            return self._message
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            Logger.error("Waitlist channel not found during embed update.")
+            return None
+        self._message = await self.bot.rest_queue.call(lambda: channel.fetch_message(message_id), "fetch waitlist message")
+        return self._message
+
+    async def _flush(self):
+        loop = asyncio.get_running_loop()
+        delay = self._last_edit + self.interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Everything requested up to this point is rendered by this one edit.
+        waitlist, queued = self._state
+        self._state = None
+        try:
+            message = await self._resolve_message()
+            if message is None:
+                return
+            embed = build_waitlist_embed(waitlist, self.capacity, queued)
+            edited = await self.bot.rest_queue.call(lambda: message.edit(embed=embed, view=self.view_factory()), "edit waitlist embed")
+            if edited is not None:
+                self._message = edited
+            Logger.info(f"Updated waitlist embed (ID: {message.id}) with {len(waitlist)} player(s).")
+        except discord.NotFound:
+            Logger.error("Waitlist message no longer exists; cached message dropped.")
+            self._message = None
+        except Exception as e:
+            Logger.error("Error updating waitlist embed: " + str(e))
+        finally:
+            self._last_edit = loop.time()
+            # Changes that arrived during the edit get their own (rate-limited) flush.
+            if self._state is not None:
+                self._flush_task = asyncio.create_task(self._flush())
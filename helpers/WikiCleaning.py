@@ -0,0 +1,42 @@
+from pathlib import Path
+import nltk
+from nltk.tokenize import word_tokenize
+
+def add_nltk_paths(paths: list):
+    """Make NLTK data directories known to this process (the bot adds its own in bot.py)."""
+    for path in paths:
+        if path not in nltk.data.path:
+            nltk.data.path.append(path)
+
+def clean_file(file: Path, stop_words: set, purge_special_chars: bool = False, purge_lines=()) -> tuple:
+    """
+    Purge boilerplate lines and stop words from a downloaded wiki page in place.
+    Returns (original lines, cleaned lines, stop words removed).
+    Blocking and CPU-bound; the bot runs it in the embedding worker process.
+    """
+    with open(file, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    cleaned_lines = []
+    total_stopwords_removed = 0
+    for line in lines:
+        stripped_line = line.strip()
+        # Purge conditions:
+        if purge_special_chars and len(stripped_line) == 1 and not stripped_line.isalnum():
+            continue
+        if stripped_line in purge_lines:
+            continue
+        if stripped_line.startswith("Honest Trailers Commentary"):
+            continue
+        # Remove stop words in the line.
+        tokens = word_tokenize(stripped_line)
+        filtered_tokens = [token for token in tokens if token.lower() not in stop_words]
+        removed_count = len(tokens) - len(filtered_tokens)
+        total_stopwords_removed += removed_count
+        new_line = " ".join(filtered_tokens)
+        # Only include non-empty lines.
+        if new_line.strip():
+            cleaned_lines.append(new_line)
+    new_content = "\n".join(cleaned_lines)
+    with open(file, "w", encoding="utf-8") as f:
+        f.write(new_content)
+    return len(lines), len(cleaned_lines), total_stopwords_removed
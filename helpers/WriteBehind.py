@@ -0,0 +1,53 @@
+import asyncio
+from helpers.Logger import Logger
+
+class DebouncedWriter:
+    """
+    Coalesces changes and persists them at most once per `delay` seconds.
+
+    Callers mark keys as dirty; the first mark schedules a flush, and every key
+    marked before the flush runs is written together by `flush_callback`, which
+    receives the set of dirty keys. Failed flushes put the keys back so the
+    next flush retries them.
+    """
+
+    def __init__(self, flush_callback, delay: float = 1.0, name: str = "writer"):
+        self.flush_callback = flush_callback
+        self.delay = delay
+        self.name = name
+        self._dirty = set()
+        self._task = None
+
+    def mark(self, key=None):
+        """Mark `key` as changed and make sure a flush is scheduled."""
+        self._dirty.add(key)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        await self.flush()
+        # Keys marked while the callback ran found this task still running and did not schedule one.
+        if self._dirty and self._task is asyncio.current_task():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Persist every dirty key now."""
+        if not self._dirty:
+            return
+        keys = self._dirty
+        self._dirty = set()
+        try:
+            await self.flush_callback(keys)
+            Logger.debug(f"{self.name}: flushed {len(keys)} change(s).")
+        except Exception as e:
+            Logger.error(f"{self.name}: failed to flush {len(keys)} change(s), will retry: {e}")
+            self._dirty |= keys
+            if self._task is None or self._task.done() or self._task is asyncio.current_task():
+                self._task = asyncio.create_task(self._flush_later())
+
+    async def close(self):
+        """Cancel the pending timer and flush immediately."""
+        if self._task is not None and not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+        await self.flush()
@@ -4,34 +4,21 @@ import asyncio
 import json
 from pathlib import Path
 import time
+import logging
 import openai
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 import re
 from helpers.Logger import Logger
+from helpers.Repositories import AIResponseRepository
+from helpers.Tracing import tracer, traced, set_attributes
+from helpers.Settings import AISettings
+from helpers.EmbeddingWorker import get_embedding_worker
+from helpers.Metrics import AI_WAIT_SECONDS, AI_COMPLETION_SECONDS, AI_SKIPPED, AI_TOKENS, CHROMA_QUERY_SECONDS
 import chromadb
 from chromadb.config import Settings
 import tiktoken
 
-# Load settings.json configuration.
-SETTINGS_PATH = Path("./settings.json")
-with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
-    settings = json.load(f)
-# Extract AI settings.
-ai_settings = settings["ai"]
-# Extract wiki settings (used for local knowledge base persist directory).
-wiki_settings = settings["wiki"]
-# Extract Token Settings
-token_settings = settings["tokens"]
-try:
-    openai_api_key = token_settings["openai_api_key"]
-    model = ai_settings["model"]
-    max_input_tokens = ai_settings["max_input_tokens"]
-    max_completion_tokens = ai_settings["max_completion_tokens"]
-    previous_message_count = ai_settings["previous_messages"]
-except KeyError as ke:
-    raise Exception(f"Missing required AI setting: {ke}")
-
 # Helper function to get token count using tiktoken.
 def num_tokens_from_string(string: str, encoding_name: str) -> int:
     encoding = tiktoken.encoding_for_model(encoding_name)
@@ -55,109 +42,74 @@ def remove_stopwords(text: str) -> str:
     filtered_tokens = [word for word in tokens if word not in custom_stop_words]
     return ' '.join(filtered_tokens)
 
-# File path for storing AI responses ratings.
-AI_RESPONSES_FILE = Path("./data/ai_responses.json")
-def load_ai_responses():
-    if AI_RESPONSES_FILE.exists():
-        try:
-            with open(AI_RESPONSES_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            Logger.error(f"Error loading {AI_RESPONSES_FILE}: {e}")
-            return {}
-    else:
-        return {}
-
-def save_ai_responses(data: dict):
-    try:
-        with open(AI_RESPONSES_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-        Logger.debug("Saved AI responses data.")
-    except Exception as e:
-        Logger.error(f"Error saving {AI_RESPONSES_FILE}: {e}")
-
 # Persistent Feedback View for rating the AI response.
 class FeedbackView(discord.ui.View):
-    def __init__(self, message_id: int):
+    def __init__(self, message_id: int, responses: AIResponseRepository):
         # Set timeout to None for persistence.
         super().__init__(timeout=None)
-        self.message_id = str(message_id)
+        self.message_id = int(message_id)
+        self.responses = responses
 
-    @discord.ui.button(label="Good", style=discord.ButtonStyle.green, custom_id="ai_feedback_good")
-    async def good_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_id = interaction.user.id
-        data = load_ai_responses()
-        entry = data.get(self.message_id)
-        if not entry:
+    async def record_vote(self, interaction: discord.Interaction, good: bool):
+        # The vote is checked and counted in a single write, so double clicks cannot count twice.
+        result = await self.responses.vote(self.message_id, interaction.user.id, good)
+        if result == "missing":
             await interaction.response.send_message("Feedback entry not found.", ephemeral=True)
             return
-        if user_id in entry["users"]:
+        if result == "duplicate":
             await interaction.response.send_message("You have already voted.", ephemeral=True)
             return
-        entry["good"] += 1
-        entry["users"].append(user_id)
-        save_ai_responses(data)
         await interaction.response.send_message("Thanks for your feedback!", ephemeral=True)
 
+    @discord.ui.button(label="Good", style=discord.ButtonStyle.green, custom_id="ai_feedback_good")
+    async def good_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.record_vote(interaction, True)
+
     @discord.ui.button(label="Needs Work", style=discord.ButtonStyle.red, custom_id="ai_feedback_bad")
     async def bad_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_id = interaction.user.id
-        data = load_ai_responses()
-        entry = data.get(self.message_id)
-        if not entry:
-            await interaction.response.send_message("Feedback entry not found.", ephemeral=True)
-            return
-        if user_id in entry["users"]:
-            await interaction.response.send_message("You have already voted.", ephemeral=True)
-            return
-        entry["bad"] += 1
-        entry["users"].append(user_id)
-        save_ai_responses(data)
-        await interaction.response.send_message("Thanks for your feedback!", ephemeral=True)
-
-def update_currently_processing(value: bool, settings_path: Path):
-    try:
-        with open(settings_path, "r", encoding="utf-8") as f:
-            settings_local = json.load(f)
-        settings_local["ai"]["currently_processing"] = value
-        with open(settings_path, "w", encoding="utf-8") as f:
-            json.dump(settings_local, f, indent=4)
-        Logger.info(f"Set currently_processing to {value} in settings.json")
-    except Exception as e:
-        Logger.error(f"Error updating settings.json: {e}")
+        await self.record_vote(interaction, False)
 
-async def call_openai(system_prompt: str, user_text: str, max_tokens: int) -> str:
+@traced("openai.completion")
+async def call_openai(system_prompt: str, user_text: str, ai: AISettings, api_key: str) -> str:
     from openai import AsyncOpenAI
-    client = AsyncOpenAI(api_key=openai_api_key)
+    client = AsyncOpenAI(api_key=api_key)
+    model = ai.model
+    max_input_tokens = ai.max_input_tokens
     tokens = word_tokenize(user_text)
     if len(tokens) > max_input_tokens:
         Logger.warning(f"Truncating user input from {len(tokens)} tokens to {max_input_tokens} tokens.")
         tokens = tokens[:max_input_tokens]
         user_text = ' '.join(tokens)
-    Logger.info(f"Final user text token count (using nltk): {len(word_tokenize(user_text))} tokens.")
+    Logger.info("Final user text token count (using nltk): %d tokens.", len(tokens))
+    set_attributes(**{"ai.input_tokens": len(tokens), "ai.model": model})
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_text}
     ]
     async def run_api():
-        update_currently_processing(True, SETTINGS_PATH)
-        try:
-            completion = await client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=1,
-                max_completion_tokens=max_tokens
-            )
-            Logger.debug(f"Raw OpenAI response: {completion.model_dump()}")
-            finish_reason = completion.choices[0].finish_reason
-            Logger.info(f"OpenAI finish_reason: {finish_reason}")
-            result = completion.choices[0].message.content.strip()
-            return result
-        finally:
-            update_currently_processing(False, SETTINGS_PATH)
+        completion = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=1,
+            max_completion_tokens=ai.max_completion_tokens
+        )
+        # model_dump() is expensive; only build it when debug logging is on.
+        if Logger.is_enabled_for(logging.DEBUG):
+            Logger.debug("Raw OpenAI response: %s", completion.model_dump())
+        finish_reason = completion.choices[0].finish_reason
+        Logger.info("OpenAI finish_reason: %s", finish_reason)
+        if completion.usage is not None:
+            set_attributes(**{
+                "ai.prompt_tokens": completion.usage.prompt_tokens,
+                "ai.completion_tokens": completion.usage.completion_tokens
+            })
+        set_attributes(**{"ai.finish_reason": str(finish_reason)})
+        result = completion.choices[0].message.content.strip()
+        return result
     # Wrap run_api using asyncio.to_thread.
     result = await asyncio.to_thread(lambda: asyncio.run(run_api()))
-    Logger.info(f"OpenAI returned a response of length {len(result)}")
+    Logger.info("OpenAI returned a response of length %d", len(result))
+    set_attributes(**{"ai.response_length": len(result)})
     if not result or result.isspace():
         Logger.error("OpenAI returned an empty response.")
         raise Exception("Empty response from OpenAI")
@@ -166,67 +118,78 @@ async def call_openai(system_prompt: str, user_text: str, max_tokens: int) -> st
 class AIHelper(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.responses = AIResponseRepository(bot.database)
+        # The wiki task indexes with the same backend; the question must be embedded by the same model.
+        self.embeddings = get_embedding_worker()
+        # True while a reply is being built (formerly ai.currently_processing in settings.json).
+        self.processing = False
 
+    @traced("ai.pong")
     async def pong(self, message: discord.Message):
-        Logger.debug(f"Executing pong in AITask for user {message.author} in channel {message.channel.id}")
-        # Load settings.
-        settings_path = Path("./settings.json")
-        try:
-            with open(settings_path, "r", encoding="utf-8") as f:
-                local_settings = json.load(f)
-            ai_settings_local = local_settings["ai"]
-            currently_processing = ai_settings_local["currently_processing"]
-        except Exception as e:
-            Logger.error(f"Error loading settings.json in AITask: {e}")
-            await message.channel.send("Something went wrong. Error Code: AITASK001")
-            return
-        if currently_processing:
+        Logger.debug("Executing pong in AITask for user %s in channel %s", message.author, message.channel.id)
+        # Only one reply is built at a time; messages arriving meanwhile are skipped.
+        if self.processing:
             Logger.info("Currently processing OpenAI API request, skipping AITask Pong message.")
+            AI_SKIPPED.inc()
             return
+        self.processing = True
+        try:
+            await self.respond(message)
+        finally:
+            self.processing = False
+
+    async def respond(self, message: discord.Message):
+        ai = self.bot.settings.ai
         # Build conversation history.
         original_message = {
             "user": message.author.id,
             "message": remove_stopwords(message.content)
         }
         previous_messages = []
-        try:
-            history = []
-            async for msg in message.channel.history(limit=previous_message_count, before=message):
-                history.append(msg)
-            history = list(reversed(history))
-            for msg in history:
-                previous_messages.append({
-                    "user": msg.author.id,
-                    "message": remove_stopwords(msg.content)
-                })
-        except Exception as e:
-            Logger.error(f"Error fetching previous messages: {e}")
+        with tracer.start_as_current_span("ai.channel_history"):
+            try:
+                history = []
+                async for msg in message.channel.history(limit=ai.previous_messages, before=message):
+                    history.append(msg)
+                history = list(reversed(history))
+                for msg in history:
+                    previous_messages.append({
+                        "user": msg.author.id,
+                        "message": remove_stopwords(msg.content)
+                    })
+                set_attributes(**{"ai.history_messages": len(previous_messages)})
+            except Exception as e:
+                Logger.error(f"Error fetching previous messages: {e}")
         # Query local knowledge base using ChromaDB.
         context_info = ""
-        try:
-            Logger.info("Querying local knowledge base for additional context...")
-            client = chromadb.Client(
-                settings=Settings(
-                    persist_directory=str(Path(wiki_settings["chroma_persist_directory"])),
-                    anonymized_telemetry=False
+        with tracer.start_as_current_span("ai.retrieval"):
+            try:
+                Logger.info("Querying local knowledge base for additional context...")
+                client = chromadb.Client(
+                    settings=Settings(
+                        persist_directory=str(Path(self.bot.settings["wiki"]["chroma_persist_directory"])),
+                        anonymized_telemetry=False
+                    )
                 )
-            )
-            collection = client.get_collection("wiki")
-            query_results = await asyncio.to_thread(
-                lambda: collection.query(query_texts=[message.content], n_results=3, include=["documents"])
-            )
-            documents_list = query_results.get("documents", [])
-            if documents_list:
-                if isinstance(documents_list[0], list):
-                    context_info = "\n\n".join(documents_list[0])
-                else:
-                    context_info = "\n\n".join(documents_list)
-            # Replace newlines with spaces.
-            context_info = " ".join(context_info.split())
-            Logger.info(f"Retrieved knowledge base context with {len(context_info.split())} tokens.")
-        except Exception as e:
-            Logger.error(f"Error querying knowledge base: {e}")
-            context_info = ""
+                collection = client.get_collection("wiki")
+                query_embeddings = await self.embeddings.encode([message.content])
+                with CHROMA_QUERY_SECONDS.time():
+                    query_results = await asyncio.to_thread(
+                        lambda: collection.query(query_embeddings=query_embeddings, n_results=3, include=["documents"])
+                    )
+                documents_list = query_results.get("documents", [])
+                if documents_list:
+                    if isinstance(documents_list[0], list):
+                        context_info = "\n\n".join(documents_list[0])
+                    else:
+                        context_info = "\n\n".join(documents_list)
+                # Replace newlines with spaces.
+                context_info = " ".join(context_info.split())
+                Logger.info(f"Retrieved knowledge base context with {len(context_info.split())} tokens.")
+                set_attributes(**{"ai.context_documents": len(documents_list), "ai.context_words": len(context_info.split())})
+            except Exception as e:
+                Logger.error(f"Error querying knowledge base: {e}")
+                context_info = ""
         # Construct final payload.
         user_payload = {
             "original_message": original_message,
@@ -236,49 +199,52 @@ class AIHelper(commands.Cog):
             }
         }
         user_text = json.dumps(user_payload, indent=4)
-        Logger.info(f"Constructed user_text payload for OpenAI API:\n{user_text}")
+        Logger.debug("Constructed user_text payload for OpenAI API:\n%s", user_text)
         try:
-            Logger.debug(f"Calling OpenAI API for user {message.author} with payload.")
-            openai_reply = await call_openai(system_prompt, user_text, max_completion_tokens)
+            Logger.debug("Calling OpenAI API for user %s with payload.", message.author)
+            AI_WAIT_SECONDS.observe(max(time.time() - message.created_at.timestamp(), 0))
+            with AI_COMPLETION_SECONDS.time():
+                openai_reply = await call_openai(system_prompt, user_text, ai, self.bot.settings["tokens"].get("openai_api_key"))
         except Exception as e:
             Logger.error(f"Error in OpenAI API call: {e}")
             await message.channel.send("Something went wrong. Error Code: AITASK002")
             return
         # Compute token counts with tiktoken.
-        payload_token_count = num_tokens_from_string(user_text, model)
-        response_token_count = num_tokens_from_string(openai_reply, model)
+        payload_token_count = num_tokens_from_string(user_text, ai.model)
+        response_token_count = num_tokens_from_string(openai_reply, ai.model)
+        AI_TOKENS.labels(kind="payload").inc(payload_token_count)
+        AI_TOKENS.labels(kind="response").inc(response_token_count)
+        set_attributes(**{"ai.payload_tokens": payload_token_count, "ai.response_tokens": response_token_count})
         # Send OpenAI response with persistent feedback buttons.
         try:
-            response_message = await message.channel.send(openai_reply, view=FeedbackView(0))
-            # Create a new entry in the ai_responses file including token count details.
-            ai_data = load_ai_responses()
-            ai_data[str(response_message.id)] = {
+            with tracer.start_as_current_span("ai.send_reply"):
+                response_message = await message.channel.send(openai_reply, view=FeedbackView(0, self.responses))
+            # Create a new ai_responses entry including token count details.
+            await self.responses.add(response_message.id, {
                 "original_message": message.content,
                 "openai_response": openai_reply,
                 "payload_token_count": payload_token_count,
                 "response_token_count": response_token_count,
                 "good": 0,
-                "bad": 0,
-                "users": []
-            }
-            save_ai_responses(ai_data)
+                "bad": 0
+            })
             # Update the view with the actual message id.
-            feedback_view = FeedbackView(response_message.id)
-            await response_message.edit(view=feedback_view)
+            feedback_view = FeedbackView(response_message.id, self.responses)
+            with tracer.start_as_current_span("ai.feedback_view_edit"):
+                await response_message.edit(view=feedback_view)
             self.bot.add_view(feedback_view)
             Logger.info(f"Feedback view added for message id: {response_message.id}")
             # Log the payload token count and response token count.
-            Logger.info(f"Payload token count: {payload_token_count}")
-            Logger.info(f"Response token count: {response_token_count}")
+            Logger.info("Payload token count: %d", payload_token_count)
+            Logger.info("Response token count: %d", response_token_count)
         except Exception as e:
             Logger.error(f"Error sending feedback view: {e}")
 
 # On startup, register persistent feedback views from stored AI responses.
-async def register_persistent_views(bot: commands.Bot):
-    ai_data = load_ai_responses()
-    for message_id in ai_data.keys():
+async def register_persistent_views(bot: commands.Bot, responses: AIResponseRepository):
+    for message_id in await responses.ids():
         try:
-            view = FeedbackView(int(message_id))
+            view = FeedbackView(message_id, responses)
             bot.add_view(view)
             Logger.info(f"Registered persistent feedback view for message id: {message_id}")
         except Exception as e:
@@ -289,4 +255,4 @@ async def setup(bot: commands.Bot):
     await bot.add_cog(cog)
     Logger.info("AITask cog loaded from tasks/AIHelper.py")
     # Register persistent views so that feedback buttons work after restarts.
-    await register_persistent_views(bot)
\ No newline at end of file
+    await register_persistent_views(bot, cog.responses)
\ No newline at end of file
@@ -1,90 +1,87 @@
 import discord
 from discord.ext import commands
-import json
-from pathlib import Path
+from discord import app_commands
 import asyncio
 import datetime
-import re
-import openai
 from openai import OpenAI  # Import the new OpenAI client
 from helpers.Logger import Logger
-
-def parse_timeout(duration_str: str) -> datetime.timedelta:
-    """
-    Parse a duration string formatted as a number followed by 'm', 'h', or 'd'
-    into a datetime.timedelta object.
-    Example: "1m" -> 1 minute, "2h" -> 2 hours, "3d" -> 3 days.
-    Returns None if parsing fails.
-    """
-    match = re.match(r"(\d+)([mhd])", duration_str)
-    if not match:
-        return None
-    value = int(match.group(1))
-    unit = match.group(2)
-    if unit == "m":
-        return datetime.timedelta(minutes=value)
-    elif unit == "h":
-        return datetime.timedelta(hours=value)
-    elif unit == "d":
-        return datetime.timedelta(days=value)
-    return None
+from helpers.Repositories import ViolationRepository
+from helpers.Penalties import PenaltyEngine
+from helpers.ModerationActions import ModerationActionExecutor
+from helpers.Metrics import MODERATION_SECONDS, MODERATION_VERDICTS
+from helpers.Tracing import tracer, traced, set_attributes
 
 class AutoModeration(commands.Cog):
     def __init__(self, bot: discord.ext.commands.Bot):
         self.bot = bot
-        # Load moderation settings from settings.json.
-        settings_path = Path("./settings.json")
+        # Moderation settings come from the shared settings service.
+        self.mod_settings = bot.settings.get("moderation", {})
+        self.environment = bot.settings.environment
+        # Get the OpenAI API key from the "tokens" section.
+        self.openai_api_key = bot.settings.get("tokens", {}).get("openai_api_key")
+        # Exclusions, thresholds and the API key follow settings.json edits; the
+        # penalty ladder keeps its state and is only rebuilt on restart.
+        self._unsubscribe = bot.settings.subscribe(self.on_settings_reloaded)
+        # Open the violation log (runs the one-shot legacy file import on first start).
+        self.store = ViolationRepository(bot.database)
+        # Build the escalation ladder and seed its sliding window from recent violations.
         try:
-            with open(settings_path, "r", encoding="utf-8") as f:
-                settings = json.load(f)
-            self.mod_settings = settings.get("moderation", {})
-            self.environment = settings["bot"]["environment"]
-            # Get the OpenAI API key from the "tokens" section.
-            self.openai_api_key = settings["tokens"].get("openai_api_key")
-            Logger.info("AutoModeration settings loaded successfully.")
+            self.penalties = PenaltyEngine.from_settings(self.mod_settings, store=self.store)
         except Exception as e:
-            Logger.error(f"Error loading moderation settings: {e}")
-            self.mod_settings = {}
-            self.environment = "development"
-            self.openai_api_key = None
+            Logger.error(f"Invalid penalty settings, falling back to a single timeout step: {e}")
+            self.penalties = PenaltyEngine.from_settings({"timeout_duration": self.mod_settings.get("timeout_duration", "1m")}, store=self.store)
+        # Side effects share the bot's rate-limit-aware REST queue.
+        self.actions = ModerationActionExecutor(bot.rest_queue, self.mod_settings.get("log_batch_window", 2.0))
 
-    async def process_moderation(self, message: discord.Message):
-        Logger.debug(f"Starting AutoModeration for message {message.id} from {message.author}")
-        
-        # Check if the message author is excluded.
-        excluded_users = self.mod_settings.get("excluded_users", [])
-        if message.author.id in excluded_users:
-            Logger.debug(f"Message {message.id} author {message.author.id} is excluded from moderation.")
-            return
+    def on_settings_reloaded(self, settings):
+        self.mod_settings = settings.get("moderation", {})
+        self.openai_api_key = settings.get("tokens", {}).get("openai_api_key")
 
-        # Check if the message is in any excluded channel.
-        excluded_channels = self.mod_settings.get("excluded_channels", [])
-        if message.channel.id in excluded_channels:
-            Logger.debug(f"Message {message.id} is in an excluded channel: {message.channel.id}")
-            return
+    async def cog_unload(self):
+        self._unsubscribe()
 
+    def should_moderate(self, message: discord.Message) -> bool:
+        """Cheap pre-check used by the message dispatcher before scheduling moderation."""
+        # Other bots and webhooks are moderated like members; only our own messages are skipped.
+        if message.author == self.bot.user:
+            return False
+        # Check if the message author is excluded.
+        if message.author.id in self.mod_settings.get("excluded_users", []):
+            return False
+        # Check if the message is in any excluded channel.
+        if message.channel.id in self.mod_settings.get("excluded_channels", []):
+            return False
         # Check if the message is in any excluded category.
-        excluded_categories = self.mod_settings.get("excluded_categories", [])
-        if message.channel.category and message.channel.category.id in excluded_categories:
-            Logger.debug(f"Message {message.id} is in an excluded category: {message.channel.category.id}")
+        category = getattr(message.channel, "category", None)
+        if category and category.id in self.mod_settings.get("excluded_categories", []):
+            return False
+        return True
+
+    @traced("moderation")
+    async def process_moderation(self, message: discord.Message):
+        Logger.debug("Starting AutoModeration for message %s from %s", message.id, message.author)
+        if not self.should_moderate(message):
+            Logger.debug("Message %s is excluded from moderation.", message.id)
             return
 
         # Construct payload for moderation API.
         payload = f"UserID: {message.author.id}\nMessage: {message.content}"
-        Logger.debug(f"Payload for moderation: {payload}")
+        Logger.debug("Payload for moderation: %s", payload)
 
         # Call OpenAI Moderation endpoint using new OpenAI library syntax.
         try:
             client = OpenAI(api_key=self.openai_api_key)
-            response = await asyncio.to_thread(
-                lambda: client.moderations.create(
-                    model=self.mod_settings.get("model", "omni-moderation-latest"),
-                    input=payload
+            with MODERATION_SECONDS.time(), tracer.start_as_current_span("moderation.api"):
+                response = await asyncio.to_thread(
+                    lambda: client.moderations.create(
+                        model=self.mod_settings.get("model", "omni-moderation-latest"),
+                        input=payload
+                    )
                 )
-            )
-            Logger.debug(f"OpenAI moderation response: {response}")
+            Logger.debug("OpenAI moderation response: %s", response)
         except Exception as e:
             Logger.error(f"Error calling OpenAI Moderation API: {e}")
+            MODERATION_VERDICTS.labels(verdict="error").inc()
             return
 
         # Parse the moderation result.
@@ -100,7 +97,7 @@ class AutoModeration(commands.Cog):
             if flagged:
                 score = result.category_scores.__dict__.get(cat)
                 full_flagged[cat] = score
-        Logger.info(f"Full flagged categories for message {message.id}: {full_flagged}")
+        Logger.info("Full flagged categories for message %s: %s", message.id, full_flagged)
 
         # Retrieve additional settings.
         min_score = self.mod_settings.get("minimum_category_score", 0.85)
@@ -126,52 +123,83 @@ class AutoModeration(commands.Cog):
                 else:
                     skipped_categories[cat] = f"score {score} not in range [{min_score}, 1.0)"
         
-        Logger.info(f"Applicable categories for message {message.id}: {applicable_categories} with scores: {flagged_scores_dict}")
-        Logger.info(f"Skipped categories during filtering for message {message.id}: {skipped_categories}")
+        Logger.info("Applicable categories for message %s: %s with scores: %s", message.id, applicable_categories, flagged_scores_dict)
+        Logger.info("Skipped categories during filtering for message %s: %s", message.id, skipped_categories)
 
         if not applicable_categories:
-            Logger.debug(f"Message {message.id} passed moderation after filtering categories.")
+            Logger.debug("Message %s passed moderation after filtering categories.", message.id)
+            MODERATION_VERDICTS.labels(verdict="filtered" if full_flagged else "clean").inc()
+            set_attributes(**{"moderation.verdict": "filtered" if full_flagged else "clean"})
             return
 
         violation_reason = ", ".join(applicable_categories)
-        Logger.info(f"Message {message.id} flagged for violation: {violation_reason} | Scores: {flagged_scores_dict}")
+        MODERATION_VERDICTS.labels(verdict="flagged").inc()
+        set_attributes(**{"moderation.verdict": "flagged", "moderation.categories": ",".join(applicable_categories)})
+        Logger.info("Message %s flagged for violation: %s | Scores: %s", message.id, violation_reason, flagged_scores_dict)
+
+        # Look up the user's previous violations from the in-memory counter index.
+        previous_violations_count = self.store.count(message.author.id)
+        current_violation_number = previous_violations_count + 1
+        # Decide the escalation step from the violations inside the decay window;
+        # the violation only counts towards the window once its row is saved.
+        penalty_step, timeout_delta, window_count = self.penalties.decide(message.author.id)
+        Logger.info(f"Penalty for user {message.author.id}: {penalty_step} ({window_count} violation(s) in the decay window)")
+
+        # Delete the original message first so it disappears after a single round-trip.
+        removal = None
+        if self.mod_settings.get("delete_original_message", False):
+            removal = message.delete
+        else:
+            Logger.info(f"delete_original_message is disabled; not deleting message {message.id}.")
+
+        async def record_violation():
+            await self.store.add(
+                message.author.id,
+                message.id,
+                message.content,
+                violation_reason,
+                flagged_scores_dict
+            )
+            self.penalties.record(message.author.id)
+
+        # The remaining side effects are independent of each other and run concurrently.
+        actions = [(f"record violation for user {message.author.id}", record_violation)]
 
         # Check if dm_user is true before sending a DM.
         if self.mod_settings.get("dm_user", True):
-            try:
-                rules_channel_id = self.mod_settings.get("rules_channel")
-                rules_channel_mention = f"<#{rules_channel_id}>" if rules_channel_id else "the rules channel"
-                dm_embed = discord.Embed(
-                    title="Moderation Warning",
-                    color=discord.Color.red(),
-                    timestamp=datetime.datetime.utcnow()
-                )
-                dm_embed.add_field(name="Notice", value="Your message violated our moderation policies.", inline=False)
-                dm_embed.add_field(name="Rules", value=f"Please review the rules here: {rules_channel_mention}", inline=False)
-                dm_embed.add_field(name="Original Message", value=message.content, inline=False)
-                dm_embed.add_field(name="Reason", value=violation_reason, inline=False)
-                await message.author.send(embed=dm_embed)
-                Logger.info(f"Sent DM warning embed to user {message.author.id} for message {message.id}")
-            except Exception as e:
-                Logger.error(f"Failed to send DM warning to user {message.author.id}: {e}")
+            rules_channel_id = self.mod_settings.get("rules_channel")
+            rules_channel_mention = f"<#{rules_channel_id}>" if rules_channel_id else "the rules channel"
+            dm_embed = discord.Embed(
+                title="Moderation Warning",
+                color=discord.Color.red(),
+                timestamp=datetime.datetime.utcnow()
+            )
+            dm_embed.add_field(name="Notice", value="Your message violated our moderation policies.", inline=False)
+            dm_embed.add_field(name="Rules", value=f"Please review the rules here: {rules_channel_mention}", inline=False)
+            dm_embed.add_field(name="Original Message", value=message.content, inline=False)
+            dm_embed.add_field(name="Reason", value=violation_reason, inline=False)
+            actions.append((f"DM warning to user {message.author.id}", lambda: message.author.send(embed=dm_embed)))
         else:
             Logger.debug(f"DMing disabled; not sending warning to user {message.author.id}")
 
-        # Prepare to update user's moderation violation file.
-        mod_data_dir = Path("./data/moderation")
-        mod_data_dir.mkdir(parents=True, exist_ok=True)
-        user_file = mod_data_dir / f"{message.author.id}.json"
-        violations = []
-        if user_file.exists():
-            try:
-                with open(user_file, "r", encoding="utf-8") as f:
-                    violations = json.load(f)
-            except Exception as e:
-                Logger.error(f"Error reading moderation file for user {message.author.id}: {e}")
-        previous_violations_count = len(violations)
-        current_violation_number = previous_violations_count + 1
+        # If timeout is enabled, apply the escalation step (a "warn" step has no timeout).
+        if self.mod_settings.get("timeout_enabled", False) and message.guild:
+            if self.penalties.dry_run:
+                Logger.info(f"Penalty dry run; would have applied '{penalty_step}' to user {message.author.id}")
+            elif timeout_delta:
+                member = message.guild.get_member(message.author.id)
+                if member:
+                    # Pass the timeout_delta as a positional argument.
+                    actions.append((
+                        f"timeout user {message.author.id} for {timeout_delta}",
+                        lambda: member.timeout(timeout_delta, reason="Content moderation violation")
+                    ))
+                else:
+                    Logger.error(f"Could not find member object for user {message.author.id} in the guild.")
 
-        # Logging the violation in an embed.
+        # Logging the violation in an embed; embeds are batched per log channel.
+        log_channel = None
+        log_embed = None
         if self.mod_settings.get("logging_enabled", True):
             if self.environment == "development":
                 log_channel_id = self.mod_settings.get("logging_channel_development")
@@ -193,58 +221,44 @@ class AutoModeration(commands.Cog):
                 scores_str = "\n".join(f"**{cat}**: {score}" for cat, score in flagged_scores_dict.items())
                 log_embed.add_field(name="Category Scores", value=scores_str, inline=False)
             log_embed.add_field(name="Previous Violations", value=current_violation_number, inline=False)
+            penalty_value = f"{penalty_step} (dry run)" if self.penalties.dry_run else penalty_step
+            log_embed.add_field(name="Penalty", value=penalty_value, inline=False)
             log_embed.add_field(name="Time", value=violation_time, inline=False)
             log_embed.add_field(name="Message Link", value=msg_link, inline=False)
-            if log_channel:
-                try:
-                    await log_channel.send(embed=log_embed)
-                    Logger.info(f"Logged violation for message {message.id} in channel {log_channel_id}")
-                except Exception as e:
-                    Logger.error(f"Failed to send log embed to channel {log_channel_id}: {e}")
-            else:
+            if log_channel is None:
                 Logger.error(f"Logging channel with ID {log_channel_id} not found.")
 
-        # Create violation entry and update user's moderation file.
-        violation_entry = {
-            "original_message": message.content,
-            "message_id": message.id,
-            "reason": violation_reason,
-            "category_scores": flagged_scores_dict,
-            "time": datetime.datetime.utcnow().isoformat() + " UTC"
-        }
-        violations.append(violation_entry)
+        with tracer.start_as_current_span("moderation.actions") as span:
+            span.set_attribute("moderation.action_count", len(actions) + (1 if removal else 0))
+            await self.actions.execute(removal=removal, actions=actions, log_channel=log_channel, log_embed=log_embed)
+        Logger.info(f"Finished moderation actions for message {message.id}")
+
+    @app_commands.command(name="moderation-top", description="Show the users with the most violations in the last N days")
+    @app_commands.default_permissions(moderate_members=True)
+    async def moderation_top(self, interaction: discord.Interaction, days: int = 7):
+        if days < 1:
+            await interaction.response.send_message("Days must be a positive integer.", ephemeral=True)
+            return
+        since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)).timestamp()
         try:
-            with open(user_file, "w", encoding="utf-8") as f:
-                json.dump(violations, f, indent=4)
-            Logger.debug(f"Updated moderation file for user {message.author.id}")
+            offenders = await asyncio.to_thread(self.store.top_offenders, since, 10)
         except Exception as e:
-            Logger.error(f"Error writing moderation file for user {message.author.id}: {e}")
-
-        # If timeout is enabled, timeout the user.
-        if self.mod_settings.get("timeout_enabled", False) and message.guild:
-            timeout_str = self.mod_settings.get("timeout_duration", "1m")
-            timeout_delta = parse_timeout(timeout_str)
-            if timeout_delta:
-                member = message.guild.get_member(message.author.id)
-                if member:
-                    try:
-                        # Pass the timeout_delta as a positional argument.
-                        await member.timeout(timeout_delta, reason="Content moderation violation")
-                        Logger.info(f"Timed out user {message.author.id} for duration {timeout_delta}")
-                    except Exception as e:
-                        Logger.error(f"Failed to timeout user {message.author.id}: {e}")
-                else:
-                    Logger.error(f"Could not find member object for user {message.author.id} in the guild.")
-
-        # Delete the original message if delete_original_message is true.
-        if self.mod_settings.get("delete_original_message", False):
-            try:
-                await message.delete()
-                Logger.info(f"Deleted message {message.id} due to moderation violation.")
-            except Exception as e:
-                Logger.error(f"Failed to delete message {message.id}: {e}")
+            Logger.error(f"Error querying top offenders: {e}")
+            await interaction.response.send_message("Something went wrong. Error Code: MODTOP001", ephemeral=True)
+            return
+        embed = discord.Embed(
+            title=f"Top Offenders (last {days} day(s))",
+            color=discord.Color.red(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        if offenders:
+            lines = [f"{index}. <@{user_id}> - {count} violation(s) ({self.store.count(user_id)} total)"
+                     for index, (user_id, count) in enumerate(offenders, start=1)]
+            embed.description = "\n".join(lines)
         else:
-            Logger.info(f"delete_original_message is disabled; not deleting message {message.id}.")
+            embed.description = "No violations recorded in this period."
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        Logger.info(f"Top offenders for the last {days} day(s) requested by {interaction.user}")
 
     async def setup(bot: commands.Bot):
         pass  # Not used
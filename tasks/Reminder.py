@@ -1,40 +1,186 @@
-import os
-import json
+import heapq
 import asyncio
 import datetime
-import pytz
 import discord
 from helpers.Logger import Logger
-
-REMINDERS_DIR = "./data/Reminders"
-SETTINGS_FILE = "./settings.json"
+from helpers.Recurrence import Recurrence, UTC
+from helpers.Metrics import REMINDER_LAG_SECONDS
+from helpers.Repositories import ReminderRepository
+
+# Discord's message length limit.
+MAX_MESSAGE_LENGTH = 2000
+# Reminders due within this many seconds of each other are delivered together.
+BATCH_WINDOW_SECONDS = 2
+# Routine scheduling logs; level set by "logging.levels.reminders" in settings.
+log = Logger.get("reminders")
+
+def pack_mentions(user_ids: list, suffix: str) -> list:
+    """
+    Pack user mentions into as few messages as possible, each ending with
+    `suffix` and no longer than MAX_MESSAGE_LENGTH.
+    Returns [(message_text, [user_id, ...]), ...].
+    """
+    messages = []
+    mentions = []
+    members = []
+    length = len(suffix)
+    for user_id in user_ids:
+        mention = f"<@{user_id}>"
+        added = len(mention) + (1 if mentions else 0)
+        if mentions and length + added > MAX_MESSAGE_LENGTH:
+            messages.append((" ".join(mentions) + suffix, members))
+            mentions = []
+            members = []
+            length = len(suffix)
+            added = len(mention)
+        mentions.append(mention)
+        members.append(user_id)
+        length += added
+    if mentions:
+        messages.append((" ".join(mentions) + suffix, members))
+    return messages
+
+class ReminderScheduler:
+    """
+    Event-driven reminder scheduler.
+    Keeps a min-heap of (next fire UTC timestamp, version, user_id) and sleeps
+    until the earliest entry is due. Changed reminders bump the user's version,
+    so stale heap entries are skipped when they surface.
+    Next fire instants are precomputed by helpers.Recurrence and stored with the
+    reminder, so each tick only compares timestamps.
+    """
+
+    def __init__(self, bot: discord.Client, reminders: ReminderRepository):
+        self.bot = bot
+        self.reminders = reminders
+        self._heap = []
+        self._entries = {}
+        self._versions = {}
+        self._wakeup = asyncio.Event()
+
+    async def load(self):
+        now_utc = datetime.datetime.now(UTC)
+        computed = {}
+        for user_id, reminder_data in await self.reminders.all():
+            missing = reminder_data.get("next_fire") is None
+            self._push(user_id, reminder_data, now_utc)
+            if missing and reminder_data.get("next_fire") is not None:
+                computed[user_id] = reminder_data["next_fire"]
+        if computed:
+            # Reminders saved before next fires were stored get theirs persisted once.
+            await self.reminders.set_next_fire_many(computed)
+        log.info(f"Reminder scheduler loaded {len(self._entries)} reminder(s).")
+
+    def _push(self, user_id: int, reminder_data: dict, now_utc: datetime.datetime):
+        try:
+            if reminder_data.get("next_fire") is None:
+                recurrence = Recurrence.from_reminder(reminder_data)
+                reminder_data["next_fire"] = recurrence.initial_fire(reminder_data.get("last_reminded", ""), now_utc).timestamp()
+        except Exception as e:
+            Logger.error(f"Invalid reminder for user {user_id}, not scheduling it: {str(e)}")
+            self._entries.pop(user_id, None)
+            return
+        version = self._versions.get(user_id, 0) + 1
+        self._versions[user_id] = version
+        self._entries[user_id] = reminder_data
+        heapq.heappush(self._heap, (reminder_data["next_fire"], version, user_id))
+        log.debug("Scheduled reminder for user %s at %s", user_id, reminder_data["next_fire"])
+
+    def schedule(self, user_id: int, reminder_data: dict):
+        """Add or replace a user's reminder and wake the scheduler."""
+        self._push(user_id, reminder_data, datetime.datetime.now(UTC))
+        self._wakeup.set()
+
+    def _discard_stale(self):
+        while self._heap:
+            _, version, user_id = self._heap[0]
+            if user_id in self._entries and self._versions.get(user_id) == version:
+                return
+            heapq.heappop(self._heap)
+
+    async def _sleep_until_due(self):
+        self._discard_stale()
+        self._wakeup.clear()
+        if not self._heap:
+            await self._wakeup.wait()
+            return
+        delay = self._heap[0][0] - datetime.datetime.now(UTC).timestamp()
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, channel: discord.abc.Messageable):
+        while True:
+            await self._sleep_until_due()
+            # Everything due in this tick (plus a short window) is delivered as one batch.
+            cutoff = datetime.datetime.now(UTC).timestamp() + BATCH_WINDOW_SECONDS
+            due = []
+            while self._heap and self._heap[0][0] <= cutoff:
+                _, version, user_id = heapq.heappop(self._heap)
+                if self._versions.get(user_id) != version or user_id not in self._entries:
+                    continue
+                due.append(user_id)
+            if due:
+                await self._fire_batch(channel, due)
+
+    async def _fire_batch(self, channel: discord.abc.Messageable, user_ids: list):
+        # Group by frequency because the reminder text includes it.
+        by_frequency = {}
+        for user_id in user_ids:
+            by_frequency.setdefault(self._entries[user_id]["frequency"], []).append(user_id)
+        delivered = []
+        failed = []
+        for frequency_days, group in by_frequency.items():
+            suffix = f" Hey, this is your every {frequency_days} day reminder at this time to remind you to play The Tower!"
+            for message_text, members in pack_mentions(group, suffix):
+                try:
+                    await self.bot.rest_queue.call(lambda message_text=message_text: channel.send(message_text), "reminder batch")
+                    delivered.extend(members)
+                except Exception as e:
+                    Logger.error(f"Failed to send reminder batch for {len(members)} user(s): {str(e)}")
+                    failed.extend(members)
+        log.info(f"Delivered {len(delivered)} reminder(s) in channel {channel.id}; {len(failed)} failed.")
+
+        now_utc = datetime.datetime.now(UTC)
+        if delivered:
+            new_last_reminded = now_utc.isoformat()
+            next_fires = {}
+            for user_id in delivered:
+                reminder_data = self._entries[user_id]
+                REMINDER_LAG_SECONDS.observe(max(now_utc.timestamp() - reminder_data["next_fire"], 0))
+                # The next fire is anchored to the scheduled instant, not the send time, so delays never drift it.
+                previous_fire = datetime.datetime.fromtimestamp(reminder_data["next_fire"], UTC)
+                next_fire = Recurrence.from_reminder(reminder_data).next_after(previous_fire, now_utc)
+                reminder_data["last_reminded"] = new_last_reminded
+                reminder_data["next_fire"] = next_fire.timestamp()
+                next_fires[user_id] = reminder_data["next_fire"]
+            try:
+                # One persisted state update for the whole batch.
+                await self.reminders.record_fired_many(new_last_reminded, next_fires)
+            except Exception as e:
+                Logger.error(f"Failed to update reminder state for {len(delivered)} user(s): {str(e)}")
+            for user_id in delivered:
+                self._push(user_id, self._entries[user_id], now_utc)
+        for user_id in failed:
+            # Retry in a minute rather than dropping the reminder.
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            heapq.heappush(self._heap, (now_utc.timestamp() + 60, version, user_id))
 
 async def run_reminder_task(bot: discord.Client):
     Logger.info("Reminder task started.")
+    scheduler = bot.reminder_scheduler
     while True:
         try:
-            # Load settings to retrieve updated config and environment details
-            try:
-                with open(SETTINGS_FILE, "r", encoding="utf-8") as settings_file:
-                    settings = json.load(settings_file)
-                Logger.info("Settings file loaded successfully for reminders task.")
-            except Exception as e:
-                Logger.error("Failed to load settings.json in reminders task: " + str(e))
-                await asyncio.sleep(60)  # fallback sleep time if settings cannot be loaded
-                continue
-
-            # Determine environment and set detailed logging flag
-            bot_env = settings.get("bot", {}).get("environment", "development")
-            detailed_logging = bot_env == "development"
-            reminders_settings = settings.get("reminders", {})
-            if bot_env == "development":
-                channel_id = reminders_settings.get("dev_channel_id")
-                if detailed_logging:
-                    Logger.info("Environment: development. Using dev channel id for reminders.")
+            # Channel for the current environment, from the shared settings service.
+            reminders_settings = bot.settings.reminders
+            if bot.settings.bot.is_development:
+                channel_id = reminders_settings.dev_channel_id
             else:
-                channel_id = reminders_settings.get("production_channel_id")
-                if detailed_logging:
-                    Logger.info("Environment: production. Using production channel id for reminders.")
+                channel_id = reminders_settings.production_channel_id
 
             if channel_id is None:
                 Logger.error("Reminder channel id not defined in settings.json.")
@@ -47,147 +193,16 @@ async def run_reminder_task(bot: discord.Client):
                 Logger.error(f"Reminder channel with ID {channel_id} not found.")
                 await asyncio.sleep(60)
                 continue
-            else:
-                if detailed_logging:
-                    Logger.info(f"Reminder channel (ID: {channel_id}) obtained successfully.")
+            Logger.info(f"Reminder channel (ID: {channel_id}) obtained successfully.")
 
-            # Process reminder files only if REMINDERS_DIR exists
-            if not os.path.exists(REMINDERS_DIR):
-                if detailed_logging:
-                    Logger.info("Reminders directory does not exist, skipping processing this iteration.")
-            else:
-                if detailed_logging:
-                    Logger.info("Reminders directory exists, processing reminder files.")
-                for filename in os.listdir(REMINDERS_DIR):
-                    if detailed_logging:
-                        Logger.info(f"Processing file: {filename}")
-                    if not filename.endswith(".json"):
-                        if detailed_logging:
-                            Logger.info(f"Skipping non-JSON file: {filename}")
-                        continue
-
-                    file_path = os.path.join(REMINDERS_DIR, filename)
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            reminder_data = json.load(f)
-                        if detailed_logging:
-                            Logger.info(f"Loaded reminder data from {file_path}.")
-                    except Exception as e:
-                        Logger.error(f"Failed to load reminder file {file_path}: {str(e)}")
-                        continue
-
-                    # Extract user ID from filename
-                    user_id_str = os.path.splitext(filename)[0]
-                    try:
-                        user_id = int(user_id_str)
-                        if detailed_logging:
-                            Logger.info(f"Extracted user id {user_id} from filename {filename}.")
-                    except Exception as e:
-                        Logger.error(f"Invalid user id in filename {filename}: {str(e)}")
-                        continue
-
-                    remind_time_str = reminder_data.get("time")
-                    user_timezone_str = reminder_data.get("timezone")
-                    frequency_days = reminder_data.get("frequency")
-                    last_reminded_str = reminder_data.get("last_reminded", "")
-
-                    if not (remind_time_str and user_timezone_str and frequency_days):
-                        Logger.error(f"Incomplete reminder data for user {user_id} in file {filename}.")
-                        continue
-                    else:
-                        if detailed_logging:
-                            Logger.info(f"Reminder data for user {user_id}: time={remind_time_str}, timezone={user_timezone_str}, frequency={frequency_days}, last_reminded='{last_reminded_str}'")
-
-                    try:
-                        user_tz = pytz.timezone(user_timezone_str)
-                        if detailed_logging:
-                            Logger.info(f"Validated timezone for user {user_id}: {user_timezone_str}.")
-                    except Exception as e:
-                        Logger.error(f"Invalid timezone '{user_timezone_str}' for user {user_id}: {str(e)}")
-                        continue
-
-                    now_user = datetime.datetime.now(user_tz)
-                    if detailed_logging:
-                        Logger.info(f"Current time for user {user_id} in timezone {user_timezone_str}: {now_user.strftime('%Y-%m-%d %H:%M:%S')}")
-
-                    # Parse the remind time (expected military format: HHMM)
-                    try:
-                        remind_hour = int(remind_time_str[:2])
-                        remind_minute = int(remind_time_str[2:])
-                        if detailed_logging:
-                            Logger.info(f"Parsed remind time for user {user_id} as {remind_hour}:{remind_minute:02d}.")
-                    except Exception as e:
-                        Logger.error(f"Failed to parse remind time '{remind_time_str}' for user {user_id}: {str(e)}")
-                        continue
-
-                    # Set the scheduled reminder datetime for today in the user's timezone
-                    scheduled_time = now_user.replace(hour=remind_hour, minute=remind_minute, second=0, microsecond=0)
-                    if detailed_logging:
-                        Logger.info(f"Scheduled reminder time for user {user_id}: {scheduled_time.strftime('%Y-%m-%d %H:%M:%S')}.")
-
-                    send_reminder = False
-
-                    # Determine if we can send a reminder based on last_reminded and current time
-                    if last_reminded_str == "":
-                        if detailed_logging:
-                            Logger.info(f"No previous reminder recorded for user {user_id}.")
-                        if now_user >= scheduled_time:
-                            send_reminder = True
-                            if detailed_logging:
-                                Logger.info(f"User {user_id} has passed scheduled time; marked for reminder.")
-                        else:
-                            if detailed_logging:
-                                Logger.info(f"User {user_id} current time is before scheduled time; skipping reminder.")
-                    else:
-                        try:
-                            last_reminded = datetime.datetime.fromisoformat(last_reminded_str)
-                            if last_reminded.tzinfo is None:
-                                last_reminded = user_tz.localize(last_reminded)
-                            if detailed_logging:
-                                Logger.info(f"Parsed last_reminded for user {user_id}: {last_reminded.strftime('%Y-%m-%d %H:%M:%S')}.")
-                        except Exception as e:
-                            Logger.error(f"Error parsing last_reminded for user {user_id}: {str(e)}")
-                            continue
-
-                        next_eligible = last_reminded + datetime.timedelta(days=frequency_days)
-                        if detailed_logging:
-                            Logger.info(f"Next eligible reminder time for user {user_id}: {next_eligible.strftime('%Y-%m-%d %H:%M:%S')}.")
-                        if now_user >= scheduled_time and now_user >= next_eligible:
-                            send_reminder = True
-                            if detailed_logging:
-                                Logger.info(f"User {user_id} is eligible for a reminder now.")
-                        else:
-                            if detailed_logging:
-                                Logger.info(f"User {user_id} is not yet eligible for a reminder; skipping.")
-
-                    if send_reminder:
-                        try:
-                            reminder_message = f"<@{user_id}> Hey, this is your every {frequency_days} day reminder at this time to remind you to play The Tower!"
-                            await channel.send(reminder_message)
-                            Logger.info(f"Reminder sent to user {user_id} in channel {channel_id}.")
-                            
-                            new_last_reminded = datetime.datetime.now(pytz.utc).isoformat()
-                            reminder_data["last_reminded"] = new_last_reminded
-                            with open(file_path, "w", encoding="utf-8") as f:
-                                json.dump(reminder_data, f, indent=4)
-                            Logger.info(f"Updated last_reminded for user {user_id} in file {filename}.")
-                        except Exception as e:
-                            Logger.error(f"Failed to send reminder for user {user_id}: {str(e)}")
-                    else:
-                        if detailed_logging:
-                            Logger.info(f"No reminder sent for user {user_id} this iteration.")
-            
-            # Sleep for sleep_seconds value from settings in the reminders section; default to 60 if not set
-            sleep_seconds = reminders_settings.get("sleep_seconds", 60)
-            if detailed_logging:
-                Logger.info(f"Iteration complete. Sleeping for {sleep_seconds} seconds before next reminder check.")
-            else:
-                Logger.info(f"Sleeping for {sleep_seconds} seconds.")
-            await asyncio.sleep(sleep_seconds)
+            await scheduler.load()
+            await scheduler.run(channel)
         except Exception as e:
             Logger.error("An unhandled exception occurred in the reminders task loop: " + str(e))
             await asyncio.sleep(60)
 
 async def setup(bot: discord.Client):
+    # Expose the scheduler so /remindme can push new reminders straight into the heap.
+    bot.reminder_scheduler = ReminderScheduler(bot, ReminderRepository(bot.database))
     bot.loop.create_task(run_reminder_task(bot))
-    Logger.info("Reminder task has been scheduled successfully.")
\ No newline at end of file
+    Logger.info("Reminder task has been scheduled successfully.")
@@ -5,19 +5,22 @@ import json
 import asyncio
 import time
 import re
+from contextlib import contextmanager
 from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
 import chromadb
 from chromadb.config import Settings
 from helpers.Logger import Logger
-from nltk.tokenize import word_tokenize
+from helpers.Metrics import WIKI_STAGE_SECONDS
+from helpers.Settings import get_settings
+from helpers.Tracing import tracer
+from helpers.EmbeddingWorker import get_embedding_worker
 from nltk.corpus import stopwords
 
-# Load settings.json configuration.
-SETTINGS_PATH = Path("./settings.json")
-with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
-    settings = json.load(f)
+# Shared settings (the same instance as bot.settings). The values below are read
+# once at import, so wiki and FlareSolverr changes apply after a reload of this task.
+settings = get_settings()
 # Extract wiki settings.
 wiki_settings = settings["wiki"]
 BASE_URL = wiki_settings["base_url"]
@@ -36,6 +39,9 @@ flaresolverr_settings = settings["apps"]["flaresolverr"]
 FLARESOLVERR_URL = flaresolverr_settings["base_url"]
 FLARESOLVERR_TIMEOUT = flaresolverr_settings["max_timeout"]
 FLARESOLVERR_HEADERS = flaresolverr_settings["headers"]
+# Shared with AIHelper so documents and queries are embedded by the same model.
+# The model (and the clean stage) runs in the worker process, started on first use.
+embedding_worker = get_embedding_worker()
 
 # Define the file that stores last download timestamps.
 LAST_DOWNLOADED_FILE = Path("./data/wiki_last_downloaded.json")
@@ -102,20 +108,21 @@ def get_with_flaresolverr(target_url: str):
         Logger.error(f"Error contacting FlareSolverr for URL {target_url}: {e}")
         return None, None
 
+@contextmanager
+def stage(name: str):
+    """
+    Time one crawl/index stage into WIKI_STAGE_SECONDS and run it inside a
+    "wiki.<name>" span (tools/benchmark_wiki.py attributes memory by these spans).
+    """
+    started = time.perf_counter()
+    with tracer.start_as_current_span(f"wiki.{name}"):
+        yield
+    WIKI_STAGE_SECONDS.labels(stage=name).observe(time.perf_counter() - started)
+
 async def async_get_with_flaresolverr(target_url: str):
     """Wrap get_with_flaresolverr in asyncio.to_thread."""
     return await asyncio.to_thread(get_with_flaresolverr, target_url)
 
-# Load local embedding model using SentenceTransformer.
-try:
-    from sentence_transformers import SentenceTransformer
-    Logger.info("Loading local embedding model using SentenceTransformer...")
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-    Logger.info("Local embedding model loaded.")
-except ModuleNotFoundError as e:
-    Logger.error("Module 'sentence_transformers' not found. Please install it with 'pip install sentence-transformers'.")
-    raise e
-
 async def index_wiki_pages():
     Logger.info("Starting Wiki task: Updating wiki pages and indexing with ChromaDB...")
     
@@ -128,206 +135,193 @@ async def index_wiki_pages():
         expiration_seconds = PAGE_EXPIRATION_DAYS * 86400  # Convert days to seconds
         pages = []
         next_page_url = WIKI_ALL_PAGES_URL
-        try:
-            # Loop through all pages from the All Pages listing.
-            while next_page_url:
-                Logger.info(f"Fetching wiki pages list from {next_page_url}")
-                content, status_code = await async_get_with_flaresolverr(next_page_url)
-                if content:
-                    snippet = content[:300] + ("..." if len(content) > 300 else "")
-                    Logger.debug(f"Raw HTML snippet from {next_page_url}: {snippet}")
-                if status_code != 200:
-                    raise Exception(f"Error fetching wiki pages list. Status code: {status_code}")
-                soup = BeautifulSoup(content, "html.parser")
+        with stage("discover"):
+            try:
+                # Loop through all pages from the All Pages listing.
+                while next_page_url:
+                    Logger.info(f"Fetching wiki pages list from {next_page_url}")
+                    content, status_code = await async_get_with_flaresolverr(next_page_url)
+                    if content:
+                        snippet = content[:300] + ("..." if len(content) > 300 else "")
+                        Logger.debug(f"Raw HTML snippet from {next_page_url}: {snippet}")
+                    if status_code != 200:
+                        raise Exception(f"Error fetching wiki pages list. Status code: {status_code}")
+                    soup = BeautifulSoup(content, "html.parser")
                 
-                # Extract page links.
-                page_links = soup.select("ul.mw-allpages-chunk li a")
-                if not page_links:
-                    page_links = soup.select("div.mw-allpages-body ul li a")
-                for a in page_links:
-                    title = a.get_text(strip=True)
-                    # Skip ignored pages.
-                    if title in IGNORED_PAGES:
-                        Logger.info(f"Ignoring page '{title}' as it is in the ignored_pages list.")
-                        continue
-                    href = a.get("href")
-                    if href and title:
-                        if not href.startswith("http"):
-                            href = BASE_URL + href
-                        pages.append({"title": title, "url": href})
+                    # Extract page links.
+                    page_links = soup.select("ul.mw-allpages-chunk li a")
+                    if not page_links:
+                        page_links = soup.select("div.mw-allpages-body ul li a")
+                    for a in page_links:
+                        title = a.get_text(strip=True)
+                        # Skip ignored pages.
+                        if title in IGNORED_PAGES:
+                            Logger.info(f"Ignoring page '{title}' as it is in the ignored_pages list.")
+                            continue
+                        href = a.get("href")
+                        if href and title:
+                            if not href.startswith("http"):
+                                href = BASE_URL + href
+                            pages.append({"title": title, "url": href})
                 
-                Logger.info(f"Found {len(page_links)} pages on current listing. Total pages so far: {len(pages)}")
+                    Logger.info(f"Found {len(page_links)} pages on current listing. Total pages so far: {len(pages)}")
                 
-                # Follow Next page link.
-                next_link = soup.select_one("div.mw-allpages-nav a[title='Special:AllPages']")
-                if next_link and "Next page" in next_link.get_text():
-                    href = next_link.get("href")
-                    if href:
-                        next_page_url = BASE_URL + href
-                        Logger.info(f"Next page found. Moving to {next_page_url}")
+                    # Follow Next page link.
+                    # From the second listing on, the nav starts with a "Previous page" link.
+                    nav_links = soup.select("div.mw-allpages-nav a[title='Special:AllPages']")
+                    next_link = next((a for a in nav_links if "Next page" in a.get_text()), None)
+                    if next_link:
+                        href = next_link.get("href")
+                        if href:
+                            next_page_url = BASE_URL + href
+                            Logger.info(f"Next page found. Moving to {next_page_url}")
+                        else:
+                            next_page_url = None
                     else:
                         next_page_url = None
-                else:
-                    next_page_url = None
-        except Exception as e:
-            Logger.error(f"Error fetching wiki pages list: {e}")
-            return
-        Logger.info(f"Total pages discovered: {len(pages)}")
+            except Exception as e:
+                Logger.error(f"Error fetching wiki pages list: {e}")
+                return
+            Logger.info(f"Total pages discovered: {len(pages)}")
         
         # Pre-process pages to assign unique sanitized titles.
-        used_ids = {}
-        unique_pages = []
-        for page in pages:
-            title = page["title"]
-            sanitized = sanitize_title(title)
-            if sanitized in used_ids:
-                used_ids[sanitized] += 1
-                unique_title = f"{sanitized}_{used_ids[sanitized]}"
-            else:
-                used_ids[sanitized] = 0
-                unique_title = sanitized
-            page["unique_title"] = unique_title
-            unique_pages.append(page)
-        pages = unique_pages
-        # Log discovered pages with unique titles.
-        for page in pages:
-            Logger.debug(f"Discovered URL: {page['url']} (Original: {page['title']}, Unique: {page['unique_title']})")
+        with stage("dedup"):
+            used_ids = {}
+            unique_pages = []
+            for page in pages:
+                title = page["title"]
+                sanitized = sanitize_title(title)
+                if sanitized in used_ids:
+                    used_ids[sanitized] += 1
+                    unique_title = f"{sanitized}_{used_ids[sanitized]}"
+                else:
+                    used_ids[sanitized] = 0
+                    unique_title = sanitized
+                page["unique_title"] = unique_title
+                unique_pages.append(page)
+            pages = unique_pages
+            # Log discovered pages with unique titles.
+            for page in pages:
+                Logger.debug(f"Discovered URL: {page['url']} (Original: {page['title']}, Unique: {page['unique_title']})")
     
         # Step 2: Download each page and save plain text from <div id="mw-content-text"> to DATA_DIR.
-        for page in pages:
-            title = page["title"]
-            unique_title = page["unique_title"]
-            last_time = last_downloaded.get(title, 0)
-            if current_time - last_time < expiration_seconds:
-                Logger.info(f"Skipping {title}: downloaded {current_time - last_time} sec ago (< {expiration_seconds} sec expiration).")
-                continue
+        with stage("download"):
+            for page in pages:
+                title = page["title"]
+                unique_title = page["unique_title"]
+                last_time = last_downloaded.get(title, 0)
+                if current_time - last_time < expiration_seconds:
+                    Logger.info(f"Skipping {title}: downloaded {current_time - last_time} sec ago (< {expiration_seconds} sec expiration).")
+                    continue
             
-            retry_count = 0
-            content = None
-            status_code = None
-            while retry_count < MAX_RETRIES:
-                Logger.debug(f"Attempt {retry_count+1} for downloading {title}")
-                content, status_code = await async_get_with_flaresolverr(page["url"])
-                if status_code == 500 and content and "Error solving the challenge" in content:
-                    retry_count += 1
-                    Logger.warning(f"Retry {retry_count} for downloading {title} due to challenge error.")
-                    await asyncio.sleep(1)
-                else:
-                    break
-            if retry_count == MAX_RETRIES:
-                Logger.error(f"Failed to download {title} after {MAX_RETRIES} retries. Setting its timestamp to 0.")
-                last_downloaded[title] = 0
-                save_last_downloaded(last_downloaded)
-                continue
-            if status_code != 200:
-                Logger.error(f"Error downloading {title}: Status code {status_code}.")
-                continue
-            try:
-                soup = BeautifulSoup(content, "html.parser")
-                # Only extract text from the <div id="mw-content-text">.
-                content_div = soup.find("div", id="mw-content-text")
-                if content_div:
-                    text_content = content_div.get_text(separator="\n", strip=True)
-                else:
-                    Logger.warning(f"Div with id 'mw-content-text' not found for {title}; extracting all text.")
-                    text_content = soup.get_text(separator="\n", strip=True)
-                filename = DATA_DIR / f"{unique_title}.txt"
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(text_content)
-                Logger.info(f"Downloaded and saved text for page: {title} as {unique_title}.txt")
-                last_downloaded[title] = int(time.time())
-                save_last_downloaded(last_downloaded)
-            except Exception as e:
-                Logger.error(f"Error processing page {title}: {e}")
-                continue
-
-        # Step 3: Clean up files prior to indexing.
-        try:
-            txt_files = list(DATA_DIR.glob("*.txt"))
-            Logger.info(f"Found {len(txt_files)} text files in {DATA_DIR} for cleanup.")
-            stop_words = set(stopwords.words('english'))
-            for file in txt_files:
+                retry_count = 0
+                content = None
+                status_code = None
+                while retry_count < MAX_RETRIES:
+                    Logger.debug(f"Attempt {retry_count+1} for downloading {title}")
+                    content, status_code = await async_get_with_flaresolverr(page["url"])
+                    if status_code == 500 and content and "Error solving the challenge" in content:
+                        retry_count += 1
+                        Logger.warning(f"Retry {retry_count} for downloading {title} due to challenge error.")
+                        await asyncio.sleep(1)
+                    else:
+                        break
+                if retry_count == MAX_RETRIES:
+                    Logger.error(f"Failed to download {title} after {MAX_RETRIES} retries. Setting its timestamp to 0.")
+                    last_downloaded[title] = 0
+                    save_last_downloaded(last_downloaded)
+                    continue
+                if status_code != 200:
+                    Logger.error(f"Error downloading {title}: Status code {status_code}.")
+                    continue
                 try:
-                    with open(file, "r", encoding="utf-8") as f:
-                        lines = f.readlines()
-                    cleaned_lines = []
-                    total_stopwords_removed = 0
-                    for line in lines:
-                        stripped_line = line.strip()
-                        # Purge conditions:
-                        if PURGE_SPECIAL_CHARS and len(stripped_line) == 1 and not stripped_line.isalnum():
-                            continue
-                        if stripped_line in PURGE_LINES:
-                            continue
-                        if stripped_line.startswith("Honest Trailers Commentary"):
-                            continue
-                        # Remove stop words in the line.
-                        tokens = word_tokenize(stripped_line)
-                        filtered_tokens = [token for token in tokens if token.lower() not in stop_words]
-                        removed_count = len(tokens) - len(filtered_tokens)
-                        total_stopwords_removed += removed_count
-                        new_line = " ".join(filtered_tokens)
-                        # Only include non-empty lines.
-                        if new_line.strip():
-                            cleaned_lines.append(new_line)
-                    new_content = "\n".join(cleaned_lines)
-                    with open(file, "w", encoding="utf-8") as f:
-                        f.write(new_content)
-                    Logger.debug(f"Cleaned file: {file.name} (original lines: {len(lines)}, cleaned lines: {len(cleaned_lines)}, stopwords removed: {total_stopwords_removed})")
+                    soup = BeautifulSoup(content, "html.parser")
+                    # Only extract text from the <div id="mw-content-text">.
+                    content_div = soup.find("div", id="mw-content-text")
+                    if content_div:
+                        text_content = content_div.get_text(separator="\n", strip=True)
+                    else:
+                        Logger.warning(f"Div with id 'mw-content-text' not found for {title}; extracting all text.")
+                        text_content = soup.get_text(separator="\n", strip=True)
+                    filename = DATA_DIR / f"{unique_title}.txt"
+                    with open(filename, "w", encoding="utf-8") as f:
+                        f.write(text_content)
+                    Logger.info(f"Downloaded and saved text for page: {title} as {unique_title}.txt")
+                    last_downloaded[title] = int(time.time())
+                    save_last_downloaded(last_downloaded)
                 except Exception as e:
-                    Logger.error(f"Error cleaning file {file.name}: {e}")
+                    Logger.error(f"Error processing page {title}: {e}")
                     continue
-        except Exception as e:
-            Logger.error(f"Error during file cleanup: {e}")
-            return
+
+        # Step 3: Clean up files prior to indexing.
+        with stage("clean"):
+            try:
+                txt_files = list(DATA_DIR.glob("*.txt"))
+                Logger.info(f"Found {len(txt_files)} text files in {DATA_DIR} for cleanup.")
+                stop_words = set(stopwords.words('english'))
+                for file in txt_files:
+                    try:
+                        # Tokenizing holds the GIL, so it runs in the embedding worker process.
+                        original, cleaned, removed = await embedding_worker.clean(file, stop_words, PURGE_SPECIAL_CHARS, PURGE_LINES)
+                        Logger.debug("Cleaned file: %s (original lines: %s, cleaned lines: %s, stopwords removed: %s)", file.name, original, cleaned, removed)
+                    except Exception as e:
+                        Logger.error(f"Error cleaning file {file.name}: {e}")
+                        continue
+            except Exception as e:
+                Logger.error(f"Error during file cleanup: {e}")
+                return
 
     # Check if indexing should be skipped.
     if SKIP_INDEXING:
         Logger.info("skip_indexing is set to true. Skipping the indexing using ChromaDB.")
     else:
         # Step 4: Index pages with local embeddings using ChromaDB.
-        try:
-            # If downloads were skipped, index only existing files.
-            txt_files = list(DATA_DIR.glob("*.txt"))
-            Logger.info(f"Found {len(txt_files)} text files in {DATA_DIR} for indexing.")
-            client = chromadb.Client(
-                settings=Settings(
-                    persist_directory=str(CHROMA_PERSIST_DIR),
-                    anonymized_telemetry=False
-                )
-            )
+        with stage("index"):
             try:
-                collection = client.get_collection("wiki")
-                Logger.info("Loaded existing 'wiki' collection from ChromaDB.")
-            except Exception:
-                collection = client.create_collection("wiki")
-                Logger.info("Created new 'wiki' collection in ChromaDB.")
-            
-            doc_ids = []
-            documents = []
-            metadatas = []
-            for file in txt_files:
+                # If downloads were skipped, index only existing files.
+                txt_files = list(DATA_DIR.glob("*.txt"))
+                Logger.info(f"Found {len(txt_files)} text files in {DATA_DIR} for indexing.")
+                client = chromadb.Client(
+                    settings=Settings(
+                        persist_directory=str(CHROMA_PERSIST_DIR),
+                        anonymized_telemetry=False
+                    )
+                )
                 try:
-                    with open(file, "r", encoding="utf-8") as f:
-                        text_content = f.read()
-                    Logger.debug(f"Generating embedding for file: {file.name}")
-                    embedding_vector = await asyncio.to_thread(lambda: embedding_model.encode(text_content).tolist())
-                    doc_id = sanitize_title(file.stem)
-                    doc_ids.append(doc_id)
-                    documents.append(text_content)
-                    metadatas.append({"filename": str(file)})
-                    Logger.info(f"Indexed file: {file.name} (token count approx: {len(text_content.split())})")
-                except Exception as e:
-                    Logger.error(f"Error processing file {file.name}: {e}")
-                    continue
-            if doc_ids:
-                await asyncio.to_thread(lambda: collection.upsert(ids=doc_ids, documents=documents, metadatas=metadatas))
-                Logger.info(f"Successfully upserted {len(doc_ids)} documents into the wiki collection.")
-            else:
-                Logger.warning("No documents to upsert into the wiki collection.")
-        except Exception as e:
-            Logger.error(f"Error during indexing with ChromaDB: {e}")
-            return
+                    collection = client.get_collection("wiki")
+                    Logger.info("Loaded existing 'wiki' collection from ChromaDB.")
+                except Exception:
+                    collection = client.create_collection("wiki")
+                    Logger.info("Created new 'wiki' collection in ChromaDB.")
+            
+                doc_ids = []
+                documents = []
+                metadatas = []
+                with stage("embed"):
+                    for file in txt_files:
+                        try:
+                            with open(file, "r", encoding="utf-8") as f:
+                                text_content = f.read()
+                            doc_id = sanitize_title(file.stem)
+                            doc_ids.append(doc_id)
+                            documents.append(text_content)
+                            metadatas.append({"filename": str(file)})
+                            Logger.debug(f"Queued file for embedding: {file.name} (token count approx: {len(text_content.split())})")
+                        except Exception as e:
+                            Logger.error(f"Error processing file {file.name}: {e}")
+                            continue
+                    # Bulk: the worker takes it in batches and serves AI channel queries in between.
+                    embeddings = await embedding_worker.encode(documents, bulk=True)
+                    Logger.info(f"Generated {len(embeddings)} embeddings with the {embedding_worker.name} backend.")
+                with stage("upsert"):
+                    if doc_ids:
+                        await asyncio.to_thread(lambda: collection.upsert(ids=doc_ids, embeddings=embeddings, documents=documents, metadatas=metadatas))
+                        Logger.info(f"Successfully upserted {len(doc_ids)} documents into the wiki collection.")
+                    else:
+                        Logger.warning("No documents to upsert into the wiki collection.")
+            except Exception as e:
+                Logger.error(f"Error during indexing with ChromaDB: {e}")
+                return
         Logger.info("Wiki task completed successfully.")
 
 async def setup(bot: commands.Bot):
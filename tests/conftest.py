@@ -0,0 +1,16 @@
+import os
+import sys
+from pathlib import Path
+import pytest
+
+# Tests import the bot's modules the same way bot.py does, from the repository root.
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+@pytest.fixture(autouse=True, scope="session")
+def logs_in_temp_directory(tmp_path_factory):
+    """helpers.Logger writes to ./logs; keep that out of the working tree."""
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("run"))
+    yield
+    os.chdir(previous)
@@ -0,0 +1,86 @@
+import random
+import datetime
+import pytest
+import pytz
+from helpers.Recurrence import Recurrence, UTC
+
+# A seeded loop rather than hypothesis: the same cases run everywhere, and every zone is covered.
+SEED = 20250309
+START = datetime.datetime(2020, 1, 1, tzinfo=UTC)
+SPAN_DAYS = 3650
+# Long enough for each chain to cross both DST transitions of a year.
+CHAIN_DAYS = 400
+
+def expected_fire(recurrence: Recurrence, date: datetime.date) -> datetime.datetime:
+    """
+    HH:MM local time on `date` by the documented rules: in an overlap the earlier
+    instant, in a gap the pre-transition offset (02:30 -> 03:30).
+    """
+    first, second = (
+        datetime.datetime(date.year, date.month, date.day, recurrence.hour, recurrence.minute, tzinfo=recurrence.zone, fold=fold)
+        for fold in (0, 1)
+    )
+    in_gap = first.astimezone(UTC).astimezone(recurrence.zone).replace(tzinfo=None) != first.replace(tzinfo=None)
+    if in_gap:
+        return first.astimezone(UTC)
+    instant = min(first.astimezone(UTC), second.astimezone(UTC))
+    assert instant.astimezone(recurrence.zone).time() == datetime.time(recurrence.hour, recurrence.minute)
+    return instant
+
+def random_case(rng: random.Random, timezone: str):
+    # Early-morning times land in DST gaps and overlaps far more often.
+    hour = rng.choice([0, 1, 2, 3, rng.randrange(24)])
+    minute = rng.choice([0, 30, rng.randrange(60)])
+    frequency = rng.choice([1, 1, 2, 3, 7])
+    now = START + datetime.timedelta(seconds=rng.randrange(SPAN_DAYS * 86400))
+    return Recurrence(f"{hour:02}{minute:02}", timezone, frequency), now
+
+@pytest.mark.parametrize("timezone", pytz.all_timezones)
+def test_fire_times_every_zone(timezone):
+    rng = random.Random(f"{SEED}:{timezone}")
+    for _ in range(3):
+        recurrence, now = random_case(rng, timezone)
+        fire = recurrence.first_fire(now)
+        assert fire >= now
+        today = now.astimezone(recurrence.zone).date()
+        date = today if expected_fire(recurrence, today) >= now else today + datetime.timedelta(days=1)
+        assert fire == expected_fire(recurrence, date)
+        # Deterministic: the same inputs always give the same instant.
+        assert recurrence.first_fire(now) == fire
+
+        end = fire + datetime.timedelta(days=CHAIN_DAYS)
+        while fire < end:
+            following = recurrence.next_after(fire, fire)
+            # Exactly `frequency` local days after the previous scheduled date.
+            date += datetime.timedelta(days=recurrence.frequency)
+            assert following == expected_fire(recurrence, date)
+            assert following > fire
+            fire = following
+
+@pytest.mark.parametrize("timezone", pytz.all_timezones)
+def test_missed_periods_are_skipped(timezone):
+    rng = random.Random(f"{SEED}:missed:{timezone}")
+    recurrence, now = random_case(rng, timezone)
+    previous = recurrence.first_fire(now)
+    later = previous + datetime.timedelta(days=rng.randrange(1, 60), seconds=rng.randrange(86400))
+    following = recurrence.next_after(previous, later)
+    assert following > later
+    # The first scheduled date after `later`: no missed period is replayed and none is skipped past it.
+    date = previous.astimezone(recurrence.zone).date()
+    while expected_fire(recurrence, date) <= later:
+        date += datetime.timedelta(days=recurrence.frequency)
+    assert following == expected_fire(recurrence, date)
+
+def test_gap_moves_forward_by_the_offset_change():
+    recurrence = Recurrence("0230", "America/New_York", 1)
+    # 2021-03-14 02:30 does not exist in New York; it resolves to 03:30 EDT.
+    fire = recurrence.first_fire(datetime.datetime(2021, 3, 14, 5, 0, tzinfo=UTC))
+    assert fire == datetime.datetime(2021, 3, 14, 7, 30, tzinfo=UTC)
+    assert fire.astimezone(recurrence.zone).strftime("%H:%M %Z") == "03:30 EDT"
+
+def test_overlap_uses_the_first_occurrence():
+    recurrence = Recurrence("0130", "America/New_York", 1)
+    # 2021-11-07 01:30 happens twice in New York; the EDT one comes first.
+    fire = recurrence.first_fire(datetime.datetime(2021, 11, 7, 4, 0, tzinfo=UTC))
+    assert fire == datetime.datetime(2021, 11, 7, 5, 30, tzinfo=UTC)
+    assert fire.astimezone(recurrence.zone).strftime("%H:%M %Z") == "01:30 EDT"
@@ -0,0 +1,19 @@
+import pytest
+from helpers.Timezones import ALIASES, TIMEZONES
+
+@pytest.mark.parametrize("text", ["EST", "MST", "HST", "CET", "EET", "WET"])
+def test_legacy_abbreviation_zones_resolve_to_their_alias(text):
+    assert TIMEZONES.resolve(text) == ALIASES[text.lower()]
+    assert TIMEZONES.resolve(text.lower()) == ALIASES[text.lower()]
+
+@pytest.mark.parametrize("text", ["GMT", "gmt", " Gmt "])
+def test_gmt_is_not_london(text):
+    assert TIMEZONES.resolve(text) == "GMT"
+
+def test_exact_and_case_insensitive_names():
+    assert TIMEZONES.resolve("Europe/Berlin") == "Europe/Berlin"
+    assert TIMEZONES.resolve("america/new york") == "America/New_York"
+    assert TIMEZONES.resolve("Not/AZone") is None
+
+def test_search_puts_the_alias_first():
+    assert TIMEZONES.search("est")[0] == "America/New_York"
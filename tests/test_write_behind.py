@@ -0,0 +1,66 @@
+import asyncio
+from helpers.WriteBehind import DebouncedWriter
+
+def test_changes_are_coalesced_into_one_flush():
+    async def scenario():
+        flushed = []
+
+        async def flush(keys):
+            flushed.append(set(keys))
+
+        writer = DebouncedWriter(flush, delay=0.01)
+        for key in (1, 2, 1, 3):
+            writer.mark(key)
+        await asyncio.sleep(0.1)
+        return flushed
+
+    assert asyncio.run(scenario()) == [{1, 2, 3}]
+
+def test_mark_during_flush_is_flushed_afterwards():
+    async def scenario():
+        flushed = []
+
+        async def flush(keys):
+            flushed.append(set(keys))
+            if len(flushed) == 1:
+                writer.mark(2)
+            await asyncio.sleep(0.02)
+
+        writer = DebouncedWriter(flush, delay=0.01)
+        writer.mark(1)
+        await asyncio.sleep(0.2)
+        return flushed, writer._dirty
+
+    flushed, dirty = asyncio.run(scenario())
+    assert flushed == [{1}, {2}]
+    assert not dirty
+
+def test_failed_flush_is_retried():
+    async def scenario():
+        attempts = []
+
+        async def flush(keys):
+            attempts.append(set(keys))
+            if len(attempts) == 1:
+                raise RuntimeError("database is locked")
+
+        writer = DebouncedWriter(flush, delay=0.01)
+        writer.mark(1)
+        await asyncio.sleep(0.1)
+        return attempts
+
+    assert asyncio.run(scenario()) == [{1}, {1}]
+
+def test_close_flushes_pending_changes():
+    async def scenario():
+        flushed = []
+
+        async def flush(keys):
+            flushed.append(set(keys))
+
+        writer = DebouncedWriter(flush, delay=60)
+        writer.mark("a")
+        await writer.close()
+        return flushed
+
+    assert asyncio.run(scenario()) == [{"a"}]
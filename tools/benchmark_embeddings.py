@@ -0,0 +1,158 @@
+# tools/benchmark_embeddings.py
+# Compares the embedding backends in helpers/Embeddings.py on the wiki corpus.
+# Each backend runs in its own process so RSS is not shared between them
+# (torch alone adds hundreds of MB). For each one the report has the load time,
+# RSS after loading and peak RSS while encoding, corpus throughput (documents
+# per second through one batched encode) and per-query latency for the
+# questions in tools/retrieval_questions.json.
+# Agreement is measured against the first backend listed: mean and minimum
+# cosine similarity of the document vectors, and the overlap of the top-5
+# documents each backend retrieves for the questions.
+# Usage (from the repository root):
+#   python -m tools.benchmark_embeddings [--backends torch,onnx,onnx-int8] [--batch-size 32] [--threads 0] [--output run.json]
+import sys
+import json
+import math
+import time
+import tempfile
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path
+import numpy as np
+
+QUESTIONS = Path("./tools/retrieval_questions.json")
+CORPUS = Path("./data/wiki")
+MB = 1024 * 1024
+
+def percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def create_backend(name: str, args):
+    from helpers.Settings import EmbeddingSettings
+    from helpers.Embeddings import create_embeddings
+    config = EmbeddingSettings(
+        backend="torch" if name == "torch" else "onnx",
+        model_directory=args["model_directory"],
+        quantize=name == "onnx-int8",
+        batch_size=args["batch_size"],
+        threads=args["threads"],
+    )
+    return create_embeddings(config)
+
+def measure(name: str, args: dict, directory: str, results):
+    """Runs in a child process: load, encode the corpus and the questions, save the vectors."""
+    import psutil
+    process = psutil.Process()
+    peak = [process.memory_info().rss]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(0.02):
+            peak[0] = max(peak[0], process.memory_info().rss)
+
+    threading.Thread(target=sample, daemon=True).start()
+    try:
+        documents = [path.read_text(encoding="utf-8") for path in sorted(Path(args["corpus"]).glob("*.txt"))][:args["limit"] or None]
+        with open(args["questions"], "r", encoding="utf-8") as f:
+            questions = [question["question"] for question in json.load(f)["questions"]]
+        rss_start = process.memory_info().rss
+
+        backend = create_backend(name, args)
+        started = time.perf_counter()
+        backend.load()
+        load_seconds = time.perf_counter() - started
+        rss_loaded = process.memory_info().rss
+
+        started = time.perf_counter()
+        corpus = backend.encode(documents)
+        corpus_seconds = time.perf_counter() - started
+
+        latencies = []
+        query_vectors = []
+        for question in questions:
+            started = time.perf_counter()
+            query_vectors.append(backend.encode([question])[0])
+            latencies.append((time.perf_counter() - started) * 1000)
+        stop.set()
+        np.save(Path(directory) / f"{name}-corpus.npy", corpus)
+        np.save(Path(directory) / f"{name}-queries.npy", np.vstack(query_vectors))
+        results.put((name, {
+            "dimensions": int(corpus.shape[1]),
+            "load_seconds": round(load_seconds, 3),
+            "rss_start_mb": round(rss_start / MB, 1),
+            "rss_loaded_mb": round(rss_loaded / MB, 1),
+            "rss_peak_mb": round(max(peak[0], process.memory_info().rss) / MB, 1),
+            "documents": len(documents),
+            "corpus_seconds": round(corpus_seconds, 3),
+            "documents_per_sec": round(len(documents) / corpus_seconds, 1) if corpus_seconds > 0 else 0.0,
+            "query_ms": {
+                "mean": round(sum(latencies) / len(latencies), 2),
+                "p50": round(percentile(latencies, 0.50), 2),
+                "p95": round(percentile(latencies, 0.95), 2),
+            },
+        }))
+    except Exception as e:
+        results.put((name, {"error": f"{type(e).__name__}: {e}"}))
+
+def agreement(directory: Path, reference: str, name: str, top: int = 5) -> dict:
+    corpus = np.load(directory / f"{name}-corpus.npy")
+    reference_corpus = np.load(directory / f"{reference}-corpus.npy")
+    cosines = (corpus * reference_corpus).sum(axis=1)
+    queries = np.load(directory / f"{name}-queries.npy")
+    reference_queries = np.load(directory / f"{reference}-queries.npy")
+    ranked = np.argsort(-(queries @ corpus.T), axis=1)[:, :top]
+    reference_ranked = np.argsort(-(reference_queries @ reference_corpus.T), axis=1)[:, :top]
+    overlap = [len(set(a) & set(b)) / top for a, b in zip(ranked, reference_ranked)]
+    return {
+        "reference": reference,
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "min_cosine": round(float(cosines.min()), 5),
+        f"top{top}_overlap": round(sum(overlap) / len(overlap), 4),
+    }
+
+def run(args) -> dict:
+    names = [name.strip() for name in args.backends.split(",") if name.strip()]
+    settings = {key: value for key, value in vars(args).items() if key not in ("backends", "output")}
+    report = {"config": dict(settings, backends=names), "backends": {}}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as temp:
+        for name in names:
+            results = context.Queue()
+            child = context.Process(target=measure, args=(name, settings, temp, results))
+            child.start()
+            # Read before join so a large result cannot block the child on a full pipe.
+            _, result = results.get()
+            child.join()
+            report["backends"][name] = result
+            print(f"{name}: {json.dumps(result)}", file=sys.stderr)
+        measured = [name for name in names if "error" not in report["backends"][name]]
+        for name in measured[1:]:
+            report["backends"][name]["agreement"] = agreement(Path(temp), measured[0], name)
+    return report
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(prog="python -m tools.benchmark_embeddings", description="Compare the embedding backends on the wiki corpus.")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8", help="comma separated; the first is the agreement reference")
+    parser.add_argument("--model-directory", default="", help="ONNX export to use (default: Chroma's MiniLM download)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads (0 = library default)")
+    parser.add_argument("--corpus", default=str(CORPUS))
+    parser.add_argument("--questions", default=str(QUESTIONS))
+    parser.add_argument("--limit", type=int, default=0, help="only encode the first N documents")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    report = run(args)
+    text = json.dumps(report, indent=4, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
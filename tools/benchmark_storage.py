@@ -0,0 +1,136 @@
+# tools/benchmark_storage.py
+# Measures storage throughput under concurrent events: many coroutines voting
+# on tips and joining the waitlist at the same time.
+# Compares the shared SQLite writer against the old load/mutate/dump JSON
+# pattern. As in the bot, tip votes change the in-memory entry and are written
+# behind by a DebouncedWriter (the Tips cog's flush_tips path), and waitlist
+# joins go through WaitlistService and are persisted as debounced snapshots.
+# Usage (from the repository root): python -m tools.benchmark_storage [events] [concurrency]
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+from helpers.Storage import Database
+from helpers.Repositories import TipRepository, WaitlistRepository
+from helpers.Waitlist import WaitlistService
+from helpers.WriteBehind import DebouncedWriter
+
+async def run_concurrently(operations: list, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(operation):
+        async with semaphore:
+            await operation()
+
+    await asyncio.gather(*(guarded(operation) for operation in operations))
+
+async def benchmark_sqlite(directory: Path, events: int, concurrency: int) -> dict:
+    database = Database(directory / "bench.db")
+    tips = TipRepository(database)
+    waitlist = WaitlistService(WaitlistRepository(database), capacity=events, flush_delay=0.05)
+    tip_entries = {1: {"content": "bench", "upvotes": 0, "downvotes": 0, "approved": False, "upvoters": set(), "downvoters": set()}}
+    await tips.add(1, tip_entries[1])
+
+    async def flush_tips(message_ids: set):
+        # Same snapshot-then-save_many as Tips.flush_tips.
+        entries = {}
+        for message_id in message_ids:
+            entry = dict(tip_entries[message_id])
+            entry["upvoters"] = set(entry["upvoters"])
+            entry["downvoters"] = set(entry["downvoters"])
+            entries[message_id] = entry
+        await tips.save_many(entries)
+
+    writer = DebouncedWriter(flush_tips, delay=0.05, name="Tips")
+
+    async def vote(user_id: int):
+        entry = tip_entries[1]
+        entry["upvoters"].add(user_id)
+        entry["upvotes"] = len(entry["upvoters"])
+        writer.mark(1)
+
+    operations = []
+    for index in range(events):
+        if index % 2 == 0:
+            operations.append(lambda index=index: vote(index))
+        else:
+            operations.append(lambda index=index: waitlist.join(index))
+    start = time.perf_counter()
+    await run_concurrently(operations, concurrency)
+    # Include the final flushes.
+    await writer.close()
+    await waitlist.close()
+    elapsed = time.perf_counter() - start
+    upvotes = (await tips.get(1))["upvotes"]
+    joined = len(await waitlist.repository.all())
+    database.close()
+    expected_votes = (events + 1) // 2
+    return {
+        "ops_per_sec": round(events / elapsed, 1),
+        "elapsed_sec": round(elapsed, 3),
+        "lost_updates": (expected_votes - upvotes) + (events // 2 - joined)
+    }
+
+async def benchmark_json(directory: Path, events: int, concurrency: int) -> dict:
+    tips_file = directory / "tips.json"
+    waitlist_file = directory / "waitlist.json"
+    tips_file.write_text(json.dumps({"1": {"upvotes": 0}}), encoding="utf-8")
+    waitlist_file.write_text("[]", encoding="utf-8")
+
+    async def vote():
+        data = await asyncio.to_thread(lambda: json.loads(tips_file.read_text(encoding="utf-8")))
+        data["1"]["upvotes"] += 1
+        await asyncio.to_thread(lambda: tips_file.write_text(json.dumps(data, indent=4), encoding="utf-8"))
+
+    async def join(user_id):
+        data = await asyncio.to_thread(lambda: json.loads(waitlist_file.read_text(encoding="utf-8")))
+        data.append(user_id)
+        await asyncio.to_thread(lambda: waitlist_file.write_text(json.dumps(data, indent=4), encoding="utf-8"))
+
+    failed = 0
+
+    async def safely(operation):
+        # Concurrent whole-file rewrites can be read half-written; count those as failures.
+        nonlocal failed
+        try:
+            await operation()
+        except Exception:
+            failed += 1
+
+    operations = [
+        (lambda: safely(vote)) if index % 2 == 0 else (lambda index=index: safely(lambda: join(index)))
+        for index in range(events)
+    ]
+    start = time.perf_counter()
+    await run_concurrently(operations, concurrency)
+    elapsed = time.perf_counter() - start
+    try:
+        upvotes = json.loads(tips_file.read_text(encoding="utf-8"))["1"]["upvotes"]
+        joined = len(json.loads(waitlist_file.read_text(encoding="utf-8")))
+    except Exception:
+        upvotes = joined = 0
+    expected_votes = (events + 1) // 2
+    return {
+        "ops_per_sec": round(events / elapsed, 1),
+        "elapsed_sec": round(elapsed, 3),
+        "failed_operations": failed,
+        "lost_updates": (expected_votes - upvotes) + (events // 2 - joined)
+    }
+
+async def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        results = {
+            "events": events,
+            "concurrency": concurrency,
+            "sqlite": await benchmark_sqlite(directory, events, concurrency),
+            "json": await benchmark_json(directory, events, concurrency),
+        }
+    print(json.dumps(results, indent=4))
+
+if __name__ == "__main__":
+    asyncio.run(main())
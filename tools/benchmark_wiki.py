@@ -0,0 +1,236 @@
+# tools/benchmark_wiki.py
+# Runs the full wiki pipeline (tasks/Wiki.py index_wiki_pages: discover, dedup,
+# download, clean, embed, upsert) against the local FlareSolverr stand-in
+# (tools/flaresolverr_mock.py) and reports per-stage time and memory as JSON.
+# Stages are the "wiki.<stage>" spans the task opens. For each one the report
+# has the wall time, process RSS (psutil, sampled) and the Python heap peak
+# (tracemalloc, which slows Python-heavy stages; --no-tracemalloc for clean timings).
+# Everything is written to a temporary directory; settings.json, data/wiki and
+# the Chroma directory are left untouched. Needs the task's normal dependencies
+# (chromadb, the embedding model from the "embeddings" settings and cached NLTK data).
+# Event loop lag (how late a 10 ms timer fires) is reported per stage and for the
+# run: it is what gateway heartbeats and commands would see while the bot indexes.
+# Compare the default run with --no-worker to see what the embedding worker buys
+# (it runs the clean stage and the model outside the bot process).
+# Usage (from the repository root):
+#   python -m tools.benchmark_wiki [--limit 100] [--delay 0.05] [--challenge-failure 0.02] [--skip-indexing] [--no-worker] [--output run.json]
+import sys
+import copy
+import json
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+import psutil
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider, SpanProcessor
+from tools.flaresolverr_mock import add_arguments, from_arguments
+
+EXAMPLE_SETTINGS = Path("./example.settings.json")
+MB = 1024 * 1024
+
+def build_settings(args, directory: Path, flaresolverr_url: str) -> Path:
+    """Write a settings.json that points the wiki task at the mock and the temporary directory."""
+    with open(EXAMPLE_SETTINGS, "r", encoding="utf-8") as f:
+        settings = copy.deepcopy(json.load(f))
+    settings["metrics"] = {"enabled": False}
+    settings["tracing"] = {"enabled": False}
+    settings["logging"] = {"compress": False}
+    settings["wiki"].update({
+        "skip_downloads": False,
+        "skip_indexing": args.skip_indexing,
+        "number_of_retries": args.retries,
+        "data_directory": str(directory / "wiki"),
+        "chroma_persist_directory": str(directory / "chroma"),
+    })
+    settings["apps"]["flaresolverr"]["base_url"] = flaresolverr_url
+    settings["embeddings"]["worker"] = args.worker
+    if args.model_directory:
+        settings["embeddings"]["model_directory"] = args.model_directory
+    path = directory / "settings.json"
+    path.write_text(json.dumps(settings, indent=4), encoding="utf-8")
+    return path
+
+class StageProfiler(SpanProcessor):
+    """
+    Records time and memory for every "wiki.*" span. Span callbacks run on the
+    event loop thread, so tracemalloc's peak is folded into all open stages and
+    reset at each boundary; that keeps nested stages (index > embed) correct.
+    A sampler thread tracks the RSS peak, which includes native allocations
+    (torch, onnxruntime, sqlite) that tracemalloc does not see.
+    """
+
+    def __init__(self, lag: "LoopLag", interval: float = 0.02):
+        self.process = psutil.Process()
+        self.lag = lag
+        self.interval = interval
+        self.open = {}
+        self.stages = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._sampler.start()
+
+    def _rss(self) -> int:
+        return self.process.memory_info().rss
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = self._rss()
+            with self._lock:
+                for stage in self.open.values():
+                    stage["rss_peak"] = max(stage["rss_peak"], rss)
+
+    def _fold_heap_peak(self):
+        if not tracemalloc.is_tracing():
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        for stage in self.open.values():
+            stage["heap_peak"] = max(stage["heap_peak"], peak)
+        tracemalloc.reset_peak()
+
+    def on_start(self, span, parent_context=None):
+        if not span.name.startswith("wiki."):
+            return
+        rss = self._rss()
+        heap = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        with self._lock:
+            self._fold_heap_peak()
+            self.open[span.context.span_id] = {
+                "stage": span.name[len("wiki."):],
+                "started": time.perf_counter(),
+                "rss_start": rss,
+                "rss_peak": rss,
+                "heap_start": heap,
+                "heap_peak": heap,
+                "lag_start": len(self.lag.samples),
+            }
+
+    def on_end(self, span):
+        with self._lock:
+            if span.context.span_id not in self.open:
+                return
+            self._fold_heap_peak()
+            stage = self.open.pop(span.context.span_id)
+        rss = self._rss()
+        heap = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        result = {
+            "stage": stage["stage"],
+            "seconds": round(time.perf_counter() - stage["started"], 3),
+            "rss_start_mb": round(stage["rss_start"] / MB, 1),
+            "rss_end_mb": round(rss / MB, 1),
+            "rss_peak_mb": round(max(stage["rss_peak"], rss) / MB, 1),
+            "loop_lag_ms": self.lag.summary(stage["lag_start"]),
+        }
+        if tracemalloc.is_tracing():
+            result["heap_peak_mb"] = round((stage["heap_peak"] - stage["heap_start"]) / MB, 2)
+            result["heap_retained_mb"] = round((heap - stage["heap_start"]) / MB, 2)
+        self.stages.append(result)
+
+    def shutdown(self):
+        self._stop.set()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+class LoopLag:
+    """Samples how late the event loop runs a timer, in ms."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append((time.perf_counter() - started - self.interval) * 1000)
+
+    def summary(self, start: int = 0) -> dict:
+        samples = sorted(self.samples[start:])
+        if not samples:
+            return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+        def at(fraction):
+            return round(samples[max(0, math.ceil(fraction * len(samples)) - 1)], 2)
+        return {"p50": at(0.50), "p99": at(0.99), "max": round(samples[-1], 2)}
+
+async def run(args) -> dict:
+    mock = from_arguments(args)
+    url = mock.start()
+    lag = LoopLag()
+    profiler = StageProfiler(lag)
+    provider = TracerProvider()
+    provider.add_span_processor(profiler)
+    trace.set_tracer_provider(provider)
+    report = {"config": {key: value for key, value in vars(args).items() if key != "output"}, "pages_served": len(mock.site.titles)}
+    worker = None
+    probe = None
+    try:
+        with tempfile.TemporaryDirectory() as temp:
+            directory = Path(temp)
+            # tasks.Wiki reads the shared settings once, at import.
+            from helpers.Settings import get_settings
+            get_settings(build_settings(args, directory, url))
+            from helpers.Logger import Logger
+            Logger.set_level(args.log_level)
+
+            started = time.perf_counter()
+            rss = profiler._rss()
+            import tasks.Wiki as wiki
+            report["import"] = {
+                "seconds": round(time.perf_counter() - started, 3),
+                "rss_mb": round(profiler._rss() / MB, 1),
+                "rss_delta_mb": round((profiler._rss() - rss) / MB, 1),
+            }
+            wiki.LAST_DOWNLOADED_FILE = directory / "wiki_last_downloaded.json"
+            worker = wiki.embedding_worker
+
+            if args.tracemalloc:
+                tracemalloc.start()
+            probe = asyncio.create_task(lag.run())
+            started = time.perf_counter()
+            await wiki.index_wiki_pages()
+            report["total_seconds"] = round(time.perf_counter() - started, 3)
+            report["loop_lag_ms"] = lag.summary()
+            report["embedding_backend"] = worker.name
+            report["stages"] = profiler.stages
+            report["peak_rss_mb"] = round(max([stage["rss_peak_mb"] for stage in profiler.stages], default=0.0), 1)
+            report["files_written"] = len(list((directory / "wiki").glob("*.txt")))
+            report["flaresolverr"] = dict(mock.stats)
+    finally:
+        if probe is not None:
+            probe.cancel()
+        if worker is not None:
+            await worker.close()
+        tracemalloc.stop()
+        provider.shutdown()
+        mock.stop()
+    return report
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(prog="python -m tools.benchmark_wiki", description="Benchmark the wiki crawl and index pipeline offline.")
+    add_arguments(parser)
+    parser.set_defaults(delay=0.05, jitter=0.01)
+    parser.add_argument("--retries", type=int, default=5, help="wiki.number_of_retries")
+    parser.add_argument("--skip-indexing", action="store_true", help="stop after the clean stage")
+    parser.add_argument("--model-directory", default="", help="embeddings.model_directory (an ONNX export)")
+    parser.add_argument("--no-worker", dest="worker", action="store_false", help="embed in a thread of this process (embeddings.worker = false)")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=4, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
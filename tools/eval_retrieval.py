@@ -0,0 +1,233 @@
+# tools/eval_retrieval.py
+# Retrieval quality and latency for the wiki knowledge base.
+# Indexes the wiki text files (data/wiki) with each retriever, asks the curated
+# questions in tools/retrieval_questions.json and scores the results:
+#   recall@k  share of questions with at least one relevant page in the top k
+#   mrr       mean reciprocal rank of the first relevant page (0 past the largest k)
+#   latency   per-query search time in ms (a warm-up query is not counted)
+# "chroma" is the bot's path (the embedding backend from helpers/Embeddings.py,
+# chosen with --embeddings, and a Chroma collection queried with the raw question
+# like AIHelper.respond); "bm25" is a dependency-free lexical baseline.
+# Any other retriever can be passed as module:Class, where the class has
+# index(documents: dict) taking {doc_id: text} and search(query, k) returning
+# doc ids best first. Pass --baseline with an earlier --output to add deltas.
+# Usage (from the repository root):
+#   python -m tools.eval_retrieval [--retrievers chroma,bm25] [--embeddings onnx] [--k 1,3,5,10] [--output run.json] [--baseline previous.json]
+import re
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+import importlib
+from pathlib import Path
+from collections import Counter
+
+QUESTIONS = Path("./tools/retrieval_questions.json")
+CORPUS = Path("./data/wiki")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def sanitize_title(title: str) -> str:
+    """Same document ids as tasks/Wiki.py."""
+    return re.sub(r'[^A-Za-z0-9]', '_', title)
+
+def load_corpus(directory: Path) -> dict:
+    return {sanitize_title(path.stem): path.read_text(encoding="utf-8") for path in sorted(directory.glob("*.txt"))}
+
+def digest(items) -> str:
+    sha = hashlib.sha256()
+    for item in items:
+        sha.update(item.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()[:16]
+
+def percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+# ----- Retrievers -----
+
+class ChromaRetriever:
+    """The bot's knowledge base: a Chroma collection filled and queried with our own embeddings."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def index(self, documents: dict):
+        import chromadb
+        from chromadb.config import Settings
+        client = chromadb.Client(settings=Settings(anonymized_telemetry=False))
+        try:
+            client.delete_collection("wiki-eval")
+        except Exception:
+            pass
+        self.collection = client.create_collection("wiki-eval")
+        ids = list(documents)
+        texts = [documents[doc_id] for doc_id in ids]
+        self.collection.upsert(ids=ids, embeddings=self.embeddings.encode(texts), documents=texts, metadatas=[{"filename": f"{doc_id}.txt"} for doc_id in ids])
+
+    def search(self, query: str, k: int) -> list:
+        results = self.collection.query(query_embeddings=self.embeddings.encode([query]), n_results=k, include=["documents"])
+        return results["ids"][0]
+
+class BM25Retriever:
+    """Okapi BM25 over lowercase alphanumeric tokens."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def index(self, documents: dict):
+        self.ids = list(documents)
+        self.frequencies = [Counter(TOKEN_PATTERN.findall(documents[doc_id].lower())) for doc_id in self.ids]
+        self.lengths = [sum(counts.values()) for counts in self.frequencies]
+        self.average_length = sum(self.lengths) / max(1, len(self.lengths))
+        document_frequency = Counter(term for counts in self.frequencies for term in counts)
+        total = len(self.ids)
+        self.idf = {term: math.log(1 + (total - n + 0.5) / (n + 0.5)) for term, n in document_frequency.items()}
+
+    def search(self, query: str, k: int) -> list:
+        terms = [term for term in set(TOKEN_PATTERN.findall(query.lower())) if term in self.idf]
+        scores = []
+        for position, counts in enumerate(self.frequencies):
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / self.average_length)
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((score, position))
+        scores.sort(reverse=True)
+        return [self.ids[position] for _, position in scores[:k]]
+
+def chroma_retriever(args) -> ChromaRetriever:
+    from helpers.Settings import EmbeddingSettings
+    from helpers.Embeddings import create_embeddings
+    config = EmbeddingSettings(
+        backend="torch" if args.embeddings == "torch" else "onnx",
+        model_directory=args.model_directory,
+        quantize=args.embeddings == "onnx-int8",
+    )
+    return ChromaRetriever(create_embeddings(config))
+
+RETRIEVERS = {"chroma": chroma_retriever, "bm25": lambda args: BM25Retriever()}
+
+def load_retriever(name: str, args):
+    if name in RETRIEVERS:
+        return RETRIEVERS[name](args)
+    if ":" in name:
+        module, attribute = name.split(":", 1)
+        return getattr(importlib.import_module(module), attribute)()
+    raise SystemExit(f"Unknown retriever: {name} (choose from {', '.join(RETRIEVERS)} or pass module:Class)")
+
+# ----- Evaluation -----
+
+def evaluate(retriever, documents: dict, questions: list, ks: list, repeat: int) -> dict:
+    depth = max(ks)
+    started = time.perf_counter()
+    retriever.index(documents)
+    result = {"index_seconds": round(time.perf_counter() - started, 3)}
+    # Model loading and caches warm up on the first query.
+    retriever.search(questions[0]["question"], depth)
+
+    queries = []
+    for question in questions:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            retrieved = list(retriever.search(question["question"], depth))[:depth]
+            timings.append(time.perf_counter() - started)
+        relevant = {sanitize_title(Path(name).stem) for name in question["relevant"]}
+        rank = next((position + 1 for position, doc_id in enumerate(retrieved) if doc_id in relevant), None)
+        queries.append({
+            "id": question["id"],
+            "rank": rank,
+            "latency_ms": round(sorted(timings)[len(timings) // 2] * 1000, 2),
+            "retrieved": retrieved,
+        })
+
+    total = len(queries)
+    for k in ks:
+        result[f"recall@{k}"] = round(sum(1 for query in queries if query["rank"] and query["rank"] <= k) / total, 4)
+    result["mrr"] = round(sum(1 / query["rank"] for query in queries if query["rank"]) / total, 4)
+    latencies = [query["latency_ms"] for query in queries]
+    result["latency_ms"] = {
+        "mean": round(sum(latencies) / total, 2),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "max": max(latencies),
+    }
+    result["misses"] = [query["id"] for query in queries if not query["rank"]]
+    result["queries"] = queries
+    return result
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Per retriever, current minus baseline for every headline number both runs have."""
+    if report["dataset"]["sha256"] != baseline.get("dataset", {}).get("sha256") or report["corpus"]["sha256"] != baseline.get("corpus", {}).get("sha256"):
+        print("Warning: the baseline used a different question set or corpus; deltas are not like for like.", file=sys.stderr)
+    deltas = {}
+    for name, current in report["retrievers"].items():
+        previous = baseline.get("retrievers", {}).get(name)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        delta = {key: round(current[key] - previous[key], 4) for key in current if (key.startswith("recall@") or key == "mrr") and key in previous}
+        for key in ("p50", "p95"):
+            delta[f"latency_{key}_ms"] = round(current["latency_ms"][key] - previous["latency_ms"][key], 2)
+        delta["new_misses"] = sorted(set(current["misses"]) - set(previous["misses"]))
+        delta["fixed"] = sorted(set(previous["misses"]) - set(current["misses"]))
+        deltas[name] = delta
+    return deltas
+
+def run(args) -> dict:
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)["questions"]
+    documents = load_corpus(Path(args.corpus))
+    ks = sorted({int(k) for k in args.k.split(",")})
+    report = {
+        "dataset": {"path": str(args.questions), "questions": len(questions), "sha256": digest(json.dumps(question, sort_keys=True) for question in questions)},
+        "corpus": {"path": str(args.corpus), "documents": len(documents), "sha256": digest(f"{doc_id}\0{text}" for doc_id, text in documents.items())},
+        "k": ks,
+        "repeat": args.repeat,
+        "retrievers": {},
+    }
+    for name in [name.strip() for name in args.retrievers.split(",") if name.strip()]:
+        try:
+            report["retrievers"][name] = evaluate(load_retriever(name, args), documents, questions, ks, args.repeat)
+        except Exception as e:
+            print(f"{name}: failed: {e}", file=sys.stderr)
+            report["retrievers"][name] = {"error": str(e)}
+            continue
+        summary = {key: value for key, value in report["retrievers"][name].items() if key not in ("queries", "misses")}
+        print(f"{name}: {json.dumps(summary)}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["delta"] = compare(report, json.load(f))
+    return report
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(prog="python -m tools.eval_retrieval", description="Evaluate wiki retrieval quality and latency.")
+    parser.add_argument("--retrievers", default="chroma,bm25", help="comma separated names or module:Class")
+    parser.add_argument("--embeddings", default="onnx", choices=["onnx", "onnx-int8", "torch"], help="embedding backend for the chroma retriever")
+    parser.add_argument("--model-directory", default="", help="ONNX export to use (default: Chroma's MiniLM download)")
+    parser.add_argument("--questions", default=str(QUESTIONS))
+    parser.add_argument("--corpus", default=str(CORPUS), help="directory of wiki text files")
+    parser.add_argument("--k", default="1,3,5,10", help="cut-offs for recall@k (the bot uses 3)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query; the median latency is reported")
+    parser.add_argument("--baseline", help="earlier --output to compare against")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    report = run(args)
+    text = json.dumps(report, indent=4, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
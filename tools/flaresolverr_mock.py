@@ -0,0 +1,213 @@
+# tools/flaresolverr_mock.py
+# Local stand-in for FlareSolverr (POST /v1, "request.get") that serves the saved
+# wiki instead of the real site, so the crawler can be exercised offline.
+# Pages come from a directory of saved pages: *.html files are served as-is and
+# *.txt files (data/wiki) are wrapped in the MediaWiki markup the crawler parses,
+# with some ad/player boilerplate for the cleanup stage to strip.
+# Special:AllPages listings are generated from the same directory, paginated like
+# MediaWiki. Every solve takes --delay (+/- --jitter) seconds, at most --workers
+# solves run at once (FlareSolverr drives one browser), and --challenge-failure
+# of them fail with "Error solving the challenge" (HTTP 500).
+# Usage (from the repository root):
+#   python -m tools.flaresolverr_mock [--pages data/wiki] [--port 8191] [--delay 0.2] [--challenge-failure 0.05]
+# then point apps.flaresolverr.base_url at http://127.0.0.1:8191/v1.
+import sys
+import html
+import json
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+VERSION = "3.3.21-mock"
+ALL_PAGES = "Special:AllPages"
+# Lines fandom injects into article bodies; most are in the default purge_lines.
+BOILERPLATE = ["Skip", "Ad", "Continue watching", "after the ad", "Visit Advertiser website", "Read More", "Video Player is loading.", "Play Video"]
+
+class WikiSite:
+    """The saved wiki pages, rendered as the HTML fandom would return."""
+
+    def __init__(self, directory: Path, limit: int = None, listing_size: int = 345):
+        self.directory = Path(directory)
+        files = sorted(path for path in self.directory.iterdir() if path.suffix in (".html", ".txt"))
+        if limit:
+            files = files[:limit]
+        # MediaWiki titles use spaces; URLs and saved file names use underscores.
+        self.pages = {path.stem.replace("_", " "): path for path in files}
+        self.titles = sorted(self.pages)
+        self.listing_size = listing_size
+
+    def render(self, url: str):
+        """Return (status, html) for a wiki URL."""
+        parts = urlsplit(url)
+        name = unquote(parts.path.rsplit("/wiki/", 1)[-1]).replace("_", " ")
+        if name == ALL_PAGES:
+            start = parse_qs(parts.query).get("from", [""])[0].replace("_", " ")
+            return 200, self.all_pages(start)
+        path = self.pages.get(name)
+        if path is None:
+            return 404, self.document(name, "<p>There is currently no text in this page.</p>")
+        text = path.read_text(encoding="utf-8")
+        if path.suffix == ".html":
+            return 200, text
+        return 200, self.article(name, text)
+
+    def all_pages(self, start: str = "") -> str:
+        index = next((i for i, title in enumerate(self.titles) if title >= start), len(self.titles))
+        chunk = self.titles[index:index + self.listing_size]
+        links = []
+        if index > 0:
+            previous = self.titles[max(0, index - self.listing_size)]
+            links.append(self.nav_link(previous, "Previous page"))
+        if index + self.listing_size < len(self.titles):
+            links.append(self.nav_link(self.titles[index + self.listing_size], "Next page"))
+        nav = f'<div class="mw-allpages-nav">{" | ".join(links)}</div>'
+        items = "".join(f'<li><a href="/wiki/{self.path(title)}" title="{html.escape(title)}">{html.escape(title)}</a></li>' for title in chunk)
+        body = f'{nav}<div class="mw-allpages-body"><ul class="mw-allpages-chunk">{items}</ul></div>{nav}'
+        return self.document(ALL_PAGES, body)
+
+    def nav_link(self, title: str, label: str) -> str:
+        href = html.escape(f"/wiki/{ALL_PAGES}?from={quote(title.replace(' ', '_'))}")
+        return f'<a href="{href}" title="{ALL_PAGES}">{label} ({html.escape(title)})</a>'
+
+    def article(self, title: str, text: str) -> str:
+        paragraphs = []
+        for number, line in enumerate(text.splitlines()):
+            if number % 40 == 10:
+                paragraphs.append(f"<div class=\"ad-slot\">{BOILERPLATE[number // 40 % len(BOILERPLATE)]}</div>")
+            paragraphs.append(f"<p>{html.escape(line)}</p>")
+        content = f'<div id="mw-content-text"><div class="mw-parser-output">{"".join(paragraphs)}</div></div>'
+        return self.document(title, content)
+
+    @staticmethod
+    def path(title: str) -> str:
+        return quote(title.replace(" ", "_"))
+
+    @staticmethod
+    def document(title: str, body: str) -> str:
+        return (
+            f"<!DOCTYPE html><html><head><title>{html.escape(title)} | The Tower Wiki | Fandom</title></head>"
+            f'<body><nav class="global-navigation">Fandom Games Movies TV</nav>'
+            f'<main class="page"><h1 id="firstHeading">{html.escape(title)}</h1>{body}</main>'
+            f"<footer>Community content is available under CC-BY-SA unless otherwise noted.</footer></body></html>"
+        )
+
+class MockFlareSolverr:
+    """A FlareSolverr v1 endpoint backed by a WikiSite, run on a background thread."""
+
+    def __init__(self, site: WikiSite, delay: float = 0.0, jitter: float = 0.0,
+                 challenge_failure: float = 0.0, workers: int = 1, seed: int = 1):
+        self.site = site
+        self.delay = delay
+        self.jitter = jitter
+        self.challenge_failure = challenge_failure
+        self.rng = random.Random(seed)
+        self.workers = threading.BoundedSemaphore(workers)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def solve(self, request: dict):
+        """Return (http_status, body) for one FlareSolverr request."""
+        started = int(time.time() * 1000)
+        if request.get("cmd") != "request.get" or not request.get("url"):
+            self.count("invalid")
+            return 500, {"status": "error", "message": f"Error: Request parameter 'cmd' = '{request.get('cmd')}' is invalid."}
+        with self._lock:
+            delay = max(0.0, self.delay + self.rng.uniform(-self.jitter, self.jitter))
+            failed = self.rng.random() < self.challenge_failure
+        with self.workers:
+            time.sleep(delay)
+        ended = int(time.time() * 1000)
+        if failed:
+            self.count("challenge_failures")
+            timeout = request.get("maxTimeout", 60000) / 1000
+            return 500, {"status": "error", "message": f"Error: Error solving the challenge. Timeout after {timeout} seconds.",
+                         "startTimestamp": started, "endTimestamp": ended, "version": VERSION}
+        status, page = self.site.render(request["url"])
+        self.count("listings" if ALL_PAGES in request["url"] else "pages" if status == 200 else "not_found")
+        solution = {"url": request["url"], "status": status, "headers": {}, "response": page, "cookies": [], "userAgent": "Mozilla/5.0"}
+        # Like FlareSolverr, the HTTP status reports the solve; the page's own status is in the solution.
+        return 200, {"status": "ok", "message": "Challenge not detected!", "solution": solution,
+                     "startTimestamp": started, "endTimestamp": ended, "version": VERSION}
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[key] += 1
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; returns the endpoint URL (port 0 picks a free port)."""
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except Exception as e:
+                    status, body = 500, {"status": "error", "message": f"Error: {e}"}
+                else:
+                    status, body = mock.solve(request)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="flaresolverr-mock", daemon=True)
+        self._thread.start()
+        return f"http://{host}:{self._server.server_address[1]}/v1"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Options shared with tools/benchmark_wiki.py."""
+    parser.add_argument("--pages", default="data/wiki", help="directory of saved pages (*.html or *.txt)")
+    parser.add_argument("--limit", type=int, default=None, help="serve only the first N pages")
+    parser.add_argument("--listing-size", type=int, default=345, help="titles per Special:AllPages listing")
+    parser.add_argument("--delay", type=float, default=0.2, help="mean time to solve one request (s)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--challenge-failure", type=float, default=0.0, help="probability a solve fails with HTTP 500")
+    parser.add_argument("--workers", type=int, default=1, help="requests solved concurrently")
+    parser.add_argument("--seed", type=int, default=1)
+
+def from_arguments(args) -> MockFlareSolverr:
+    site = WikiSite(Path(args.pages), args.limit, args.listing_size)
+    return MockFlareSolverr(site, args.delay, args.jitter, args.challenge_failure, args.workers, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tools.flaresolverr_mock", description="Local FlareSolverr stand-in serving the saved wiki.")
+    add_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8191)
+    args = parser.parse_args(sys.argv[1:])
+    mock = from_arguments(args)
+    url = mock.start(args.host, args.port)
+    print(f"Serving {len(mock.site.titles)} pages from {args.pages} at {url} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.stop()
+        print(json.dumps(dict(mock.stats)), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
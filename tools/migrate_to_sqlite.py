@@ -0,0 +1,42 @@
+# tools/migrate_to_sqlite.py
+# One-shot migration of the legacy JSON data files into data/hatebot.db.
+# Usage (from the repository root): python -m tools.migrate_to_sqlite [--force]
+#
+# Each repository also imports its legacy file automatically the first time the
+# bot starts; running this ahead of time lets the migration be checked offline.
+# --force clears the "already imported" markers so the files are imported again
+# (rows are upserted, violations are appended, so only use it on a fresh database).
+import sys
+from helpers.Storage import Database
+from helpers.Repositories import (
+    TipRepository,
+    ReminderRepository,
+    WaitlistRepository,
+    AIResponseRepository,
+    ViolationRepository,
+)
+
+REPOSITORIES = [TipRepository, ReminderRepository, WaitlistRepository, AIResponseRepository, ViolationRepository]
+
+def main():
+    force = "--force" in sys.argv[1:]
+    database = Database()
+    if force:
+        keys = [repository.LEGACY_KEY for repository in REPOSITORIES]
+        database.write_sync(lambda connection: connection.executemany("DELETE FROM meta WHERE key = ?", [(key,) for key in keys]))
+    for repository in REPOSITORIES:
+        # Constructing the repository creates its schema and runs the import once.
+        repository(database)
+    counts = {
+        "tips": database.read_sync("SELECT COUNT(*) FROM tips")[0][0],
+        "reminders": database.read_sync("SELECT COUNT(*) FROM reminders")[0][0],
+        "waitlist": database.read_sync("SELECT COUNT(*) FROM waitlist")[0][0],
+        "ai_responses": database.read_sync("SELECT COUNT(*) FROM ai_responses")[0][0],
+        "violations": database.read_sync("SELECT COUNT(*) FROM violations")[0][0],
+    }
+    for table, count in counts.items():
+        print(f"{table}: {count} row(s)")
+    database.close()
+
+if __name__ == "__main__":
+    main()
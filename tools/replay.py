@@ -0,0 +1,736 @@
+# tools/replay.py
+# Offline load test for the bot's event handlers.
+# Replays synthetic traffic through the real Client.on_message path (dispatcher,
+# AIHelper, AutoModeration, command processing), the Tips reaction listeners,
+# the waitlist buttons and the reminder scheduler. Discord REST, the gateway
+# cache, OpenAI completions, moderation, the query embedding and the Chroma query
+# are local stand-ins with configurable latency and rate limit (429) injection,
+# so nothing leaves the machine and runs are repeatable with --seed.
+# Needs the bot's normal dependencies plus cached NLTK and tiktoken data.
+# Reports throughput, p50/p99 latency and dropped events per scenario as JSON.
+# Usage (from the repository root):
+#   python -m tools.replay [--messages 500] [--rate 50] [--rest-latency 0.05] [--rest-429 0.02] [--output run.json]
+import sys
+import copy
+import json
+import math
+import time
+import types
+import random
+import asyncio
+import argparse
+import datetime
+import tempfile
+import itertools
+from pathlib import Path
+from collections import Counter
+
+EXAMPLE_SETTINGS = Path("./example.settings.json")
+
+# Fixed IDs for the simulated guild.
+GUILD_ID = 900000000000000000
+AI_CHANNEL_ID = 900000000000000001
+GENERAL_CHANNEL_ID = 900000000000000002
+MOD_LOG_CHANNEL_ID = 900000000000000003
+TIP_VOTING_CHANNEL_ID = 900000000000000004
+TIPS_CHANNEL_ID = 900000000000000005
+WAITLIST_CHANNEL_ID = 900000000000000006
+REMINDER_CHANNEL_ID = 900000000000000007
+WAITLIST_ROLE_ID = 900000000000000010
+BOT_USER_ID = 900000000000000099
+FIRST_USER_ID = 910000000000000000
+
+_snowflakes = itertools.count(920000000000000000)
+
+def next_id() -> int:
+    return next(_snowflakes)
+
+def percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def summarize(samples: list, elapsed: float, events: int, dropped: int, **extra) -> dict:
+    """Latencies in milliseconds; throughput is completed events per second."""
+    completed = events - dropped
+    summary = {
+        "events": events,
+        "completed": completed,
+        "dropped": dropped,
+        "elapsed_sec": round(elapsed, 3),
+        "throughput_per_sec": round(completed / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else 0.0,
+    }
+    summary.update(extra)
+    return summary
+
+def build_settings(args, directory: Path) -> Path:
+    """Write a settings.json for the simulated guild, based on example.settings.json."""
+    with open(EXAMPLE_SETTINGS, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    settings = copy.deepcopy(settings)
+    settings["bot"]["environment"] = "production"
+    settings["tokens"] = {"bot_token_production": "replay", "bot_token_development": "replay", "openai_api_key": "replay"}
+    settings["guild_production"] = {"guild_id": GUILD_ID}
+    settings["metrics"] = {"enabled": False}
+    settings["tracing"] = {"enabled": False}
+    settings["logging"] = {"compress": False}
+    settings["ai"].update({"enabled": True, "production_channel": AI_CHANNEL_ID, "handler_timeout": args.handler_timeout})
+    moderation = settings.setdefault("moderation", {})
+    moderation.update({
+        "handler_timeout": args.handler_timeout,
+        "logging_enabled": True,
+        "logging_channel_production": MOD_LOG_CHANNEL_ID,
+        "excluded_channels": [AI_CHANNEL_ID],
+        "excluded_categories": [],
+        "excluded_users": [],
+    })
+    settings["waitlist"] = {"waitlist_role": WAITLIST_ROLE_ID, "capacity": args.waitlist_capacity, "edit_interval": 2.0}
+    settings["tips"] = {
+        "min_votes": args.tip_min_votes,
+        "production": {"tip_voting_channel": TIP_VOTING_CHANNEL_ID, "tips_channel": TIPS_CHANNEL_ID},
+        "development": {"tip_voting_channel": TIP_VOTING_CHANNEL_ID, "tips_channel": TIPS_CHANNEL_ID},
+    }
+    settings["reminders"] = {"production_channel_id": REMINDER_CHANNEL_ID, "dev_channel_id": REMINDER_CHANNEL_ID}
+    settings["wiki"]["chroma_persist_directory"] = str(directory / "chroma")
+    path = directory / "settings.json"
+    path.write_text(json.dumps(settings, indent=4), encoding="utf-8")
+    return path
+
+# ----- Discord stand-ins -----
+
+class FakeRest:
+    """
+    Stand-in for Discord's REST API. Every call sleeps for the configured
+    latency and may fail with an injected rate limit (discord.RateLimited,
+    which the bot's RestQueue retries). Interaction responses are exempt.
+    """
+
+    def __init__(self, discord_module, rng: random.Random, latency: float, jitter: float, rate_limit: float, retry_after: float):
+        self.discord = discord_module
+        self.rng = rng
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.rate_limited = Counter()
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    async def request(self, route: str, limited: bool = True):
+        self.calls[route] += 1
+        await asyncio.sleep(self.delay())
+        if limited and self.rng.random() < self.rate_limit:
+            self.rate_limited[route] += 1
+            raise self.discord.RateLimited(self.retry_after)
+
+class FakeRole:
+    def __init__(self, role_id: int, guild):
+        self.id = role_id
+        self.guild = guild
+        self.name = f"role-{role_id}"
+        self.mention = f"<@&{role_id}>"
+
+    @property
+    def members(self) -> list:
+        return [member for member in self.guild.members if self in member.roles]
+
+class FakeMember:
+    def __init__(self, user_id: int, guild, rest: FakeRest, bot: bool = False):
+        self.id = user_id
+        self.guild = guild
+        self.rest = rest
+        self.bot = bot
+        self.name = f"user{user_id % 100000}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.roles = []
+
+    def __str__(self):
+        return self.name
+
+    async def add_roles(self, *roles, reason=None):
+        await self.rest.request("member.add_role")
+        self.roles.extend(role for role in roles if role not in self.roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        await self.rest.request("member.remove_role")
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.request("user.dm")
+
+    async def timeout(self, until, reason=None):
+        await self.rest.request("member.timeout")
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self._members = {}
+        self._roles = {}
+
+    @property
+    def members(self) -> list:
+        return list(self._members.values())
+
+    def get_member(self, user_id: int):
+        return self._members.get(user_id)
+
+    def get_role(self, role_id: int):
+        return self._roles.get(role_id)
+
+class FakeMessage:
+    def __init__(self, channel, author, content: str = "", embeds: list = None):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = embeds or []
+        self.reactions = []
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self._state = channel.state
+        self.mentions = []
+        self.role_mentions = []
+        self.attachments = []
+        self.webhook_id = None
+        self.type = None
+
+    async def edit(self, **kwargs):
+        await self.channel.rest.request("message.edit")
+        if "embed" in kwargs:
+            self.embeds = [kwargs["embed"]]
+        return self
+
+    async def delete(self, **kwargs):
+        await self.channel.rest.request("message.delete")
+        self.channel.messages.pop(self.id, None)
+
+    async def add_reaction(self, emoji):
+        await self.channel.rest.request("message.add_reaction")
+
+class FakeChannel:
+    def __init__(self, channel_id: int, guild: FakeGuild, rest: FakeRest, state, bot_user):
+        self.id = channel_id
+        self.guild = guild
+        self.rest = rest
+        self.state = state
+        self.bot_user = bot_user
+        self.category = None
+        self.name = f"channel-{channel_id % 1000}"
+        self.mention = f"<#{channel_id}>"
+        self.messages = {}
+        self.sent = []
+
+    def add(self, message: FakeMessage) -> FakeMessage:
+        self.messages[message.id] = message
+        return message
+
+    async def send(self, content=None, embed=None, embeds=None, view=None, **kwargs):
+        await self.rest.request("channel.send")
+        message = self.add(FakeMessage(self, self.bot_user, content or "", [embed] if embed else (embeds or [])))
+        self.sent.append((time.perf_counter(), message))
+        return message
+
+    async def fetch_message(self, message_id: int):
+        await self.rest.request("channel.fetch_message")
+        return self.messages[message_id]
+
+    async def history(self, limit: int = 100, before=None):
+        await self.rest.request("channel.history")
+        before_id = before.id if before is not None else None
+        older = [m for m in self.messages.values() if before_id is None or m.id < before_id]
+        for message in sorted(older, key=lambda m: m.id, reverse=True)[:limit]:
+            yield message
+
+class FakeInteractionResponse:
+    def __init__(self, rest: FakeRest):
+        self.rest = rest
+        self.done_at = None
+
+    def is_done(self) -> bool:
+        return self.done_at is not None
+
+    async def _respond(self):
+        if self.done_at is not None:
+            raise RuntimeError("Interaction has already been responded to")
+        await self.rest.request("interaction.respond", limited=False)
+        self.done_at = time.perf_counter()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond()
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+class FakeInteraction:
+    def __init__(self, user: FakeMember, channel: FakeChannel, rest: FakeRest):
+        self.user = user
+        self.guild = channel.guild
+        self.channel = channel
+        self.response = FakeInteractionResponse(rest)
+        self.followup = types.SimpleNamespace(send=self._followup)
+        self.rest = rest
+
+    async def _followup(self, content=None, **kwargs):
+        await self.rest.request("interaction.followup", limited=False)
+
+    async def edit_original_response(self, **kwargs):
+        await self.rest.request("interaction.edit_original", limited=False)
+
+class FakeGateway:
+    """The gateway cache: guild, channels and members the bot can see."""
+
+    def __init__(self, rest: FakeRest, state, member_count: int):
+        self.rest = rest
+        self.guild = FakeGuild(GUILD_ID)
+        self.bot_user = FakeMember(BOT_USER_ID, self.guild, rest, bot=True)
+        self.guild._roles[WAITLIST_ROLE_ID] = FakeRole(WAITLIST_ROLE_ID, self.guild)
+        self.channels = {
+            channel_id: FakeChannel(channel_id, self.guild, rest, state, self.bot_user)
+            for channel_id in (AI_CHANNEL_ID, GENERAL_CHANNEL_ID, MOD_LOG_CHANNEL_ID, TIP_VOTING_CHANNEL_ID,
+                               TIPS_CHANNEL_ID, WAITLIST_CHANNEL_ID, REMINDER_CHANNEL_ID)
+        }
+        for index in range(member_count):
+            member = FakeMember(FIRST_USER_ID + index, self.guild, rest)
+            self.guild._members[member.id] = member
+        self.users = self.guild.members
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def get_user(self, user_id: int):
+        return self.guild.get_member(user_id)
+
+    async def fetch_user(self, user_id: int):
+        await self.rest.request("user.fetch")
+        return self.guild.get_member(user_id)
+
+# ----- OpenAI / Chroma stand-ins -----
+
+class FakeOpenAIService:
+    """Chat completions and moderation with latency, injected 429s and a flag rate."""
+
+    def __init__(self, rng: random.Random, completion_latency: float, moderation_latency: float,
+                 rate_limit: float, flag_rate: float):
+        self.rng = rng
+        self.completion_latency = completion_latency
+        self.moderation_latency = moderation_latency
+        self.rate_limit = rate_limit
+        self.flag_rate = flag_rate
+        self.calls = Counter()
+        self.rate_limited = Counter()
+
+    def _maybe_limit(self, kind: str):
+        self.calls[kind] += 1
+        if self.rng.random() < self.rate_limit:
+            self.rate_limited[kind] += 1
+            raise RuntimeError(f"429 Too Many Requests (injected, {kind})")
+
+    def async_client(self, api_key=None, **kwargs):
+        service = self
+
+        async def create(model=None, messages=None, max_completion_tokens=None, **_):
+            await asyncio.sleep(service.completion_latency * service.rng.uniform(0.5, 1.5))
+            service._maybe_limit("completion")
+            content = "Replay answer: " + " ".join(["tower"] * 40)
+            usage = types.SimpleNamespace(prompt_tokens=len(str(messages)) // 4, completion_tokens=60)
+            choice = types.SimpleNamespace(finish_reason="stop", message=types.SimpleNamespace(content=content))
+            return types.SimpleNamespace(choices=[choice], usage=usage, model_dump=lambda: {"model": model})
+
+        return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+    def sync_client(self, api_key=None, **kwargs):
+        service = self
+
+        def create(model=None, input=None, **_):
+            # Called from a worker thread by AutoModeration.
+            time.sleep(service.moderation_latency * service.rng.uniform(0.5, 1.5))
+            service._maybe_limit("moderation")
+            flagged = service.rng.random() < service.flag_rate
+            categories = types.SimpleNamespace(harassment=flagged, hate=False)
+            scores = types.SimpleNamespace(harassment=0.95 if flagged else 0.01, hate=0.01)
+            return types.SimpleNamespace(results=[types.SimpleNamespace(categories=categories, category_scores=scores)])
+
+        return types.SimpleNamespace(moderations=types.SimpleNamespace(create=create))
+
+class FakeChroma:
+    """Module-shaped stand-in for chromadb with a fixed query latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def Client(self, settings=None):
+        latency = self.latency
+
+        def query(query_embeddings=None, query_texts=None, n_results=3, include=None):
+            time.sleep(latency)
+            return {"documents": [["Replay wiki context about the tower."] * n_results]}
+
+        collection = types.SimpleNamespace(query=query)
+        return types.SimpleNamespace(get_collection=lambda name: collection)
+
+class FakeEmbeddings:
+    """Stand-in for the embedding worker; the fake collection ignores the vectors."""
+
+    name = "replay"
+
+    async def encode(self, texts, bulk: bool = False) -> list:
+        return [[0.0] * 384 for _ in texts]
+
+def metric(name: str, labels: dict = None) -> float:
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+def handler_failures() -> float:
+    from prometheus_client import REGISTRY
+    total = 0.0
+    for family in REGISTRY.collect():
+        if family.name != "hatebot_message_handler":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_total") and sample.labels.get("outcome") in ("timeout", "error"):
+                total += sample.value
+    return total
+
+# ----- Scenarios -----
+
+async def replay_messages(client, gateway: FakeGateway, rng: random.Random, args) -> dict:
+    """Open-loop message arrivals at --rate per second, each dispatched like a gateway event."""
+    dispatched = {}
+    original_dispatch = client.dispatcher.dispatch
+
+    def dispatch(message):
+        tasks = original_dispatch(message)
+        dispatched[message.id] = tasks
+        return tasks
+
+    client.dispatcher.dispatch = dispatch
+    on_message_latency = []
+    end_to_end = []
+    errors = 0
+    skipped_before = metric("hatebot_ai_skipped_total")
+    failures_before = handler_failures()
+
+    async def deliver(message):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await client.on_message(message)
+            on_message_latency.append(time.perf_counter() - start)
+            # End to end: until every handler the dispatcher started has finished.
+            tasks = dispatched.pop(message.id, [])
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            end_to_end.append(time.perf_counter() - start)
+        except Exception:
+            errors += 1
+
+    ai_channel = gateway.channels[AI_CHANNEL_ID]
+    general = gateway.channels[GENERAL_CHANNEL_ID]
+    start = time.perf_counter()
+    pending = []
+    for index in range(args.messages):
+        channel = ai_channel if rng.random() < args.ai_share else general
+        author = rng.choice(gateway.users)
+        content = f"replay message {index} " + " ".join(rng.choice(["tower", "wave", "card", "perk", "lab"]) for _ in range(12))
+        message = channel.add(FakeMessage(channel, author, content))
+        pending.append(asyncio.create_task(deliver(message)))
+        if args.rate > 0:
+            await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - start
+    client.dispatcher.dispatch = original_dispatch
+
+    ai_skipped = int(metric("hatebot_ai_skipped_total") - skipped_before)
+    failed = int(handler_failures() - failures_before)
+    # Dropped: on_message raised, a handler failed or timed out, or the AI busy guard skipped it.
+    return summarize(
+        end_to_end, elapsed, args.messages, errors + failed + ai_skipped,
+        on_message_p50_ms=round(percentile(on_message_latency, 0.50) * 1000, 2),
+        on_message_p99_ms=round(percentile(on_message_latency, 0.99) * 1000, 2),
+        ai_skipped=ai_skipped,
+        handler_failures=failed,
+        on_message_errors=errors,
+    )
+
+async def replay_tips(client, gateway: FakeGateway, rng: random.Random, args) -> dict:
+    """Concurrent reaction adds/removes on a set of pending tips."""
+    cog = client.get_cog("Tips")
+    voting_channel = gateway.channels[TIP_VOTING_CHANNEL_ID]
+    tip_ids = []
+    for index in range(args.tips):
+        vote_message = voting_channel.add(FakeMessage(voting_channel, gateway.bot_user, f"tip {index}"))
+        author = rng.choice(gateway.users)
+        entry = {
+            "original_message_id": next_id(), "original_channel_id": GENERAL_CHANNEL_ID, "content": f"Replay tip {index}",
+            "upvotes": 0, "downvotes": 0, "approved": False, "submitted_by": author.id, "original_author": author.id,
+            "upvoters": set(), "downvoters": set()
+        }
+        await cog.tips.add(vote_message.id, entry)
+        cog.tip_entries[vote_message.id] = entry
+        cog.tracked_message_ids.add(vote_message.id)
+        tip_ids.append(vote_message.id)
+
+    # Each (tip, voter) pair reacts once; some remove their reaction afterwards.
+    events = []
+    expected = {tip_id: {"👍": set(), "👎": set()} for tip_id in tip_ids}
+    for _ in range(args.reactions):
+        tip_id = rng.choice(tip_ids)
+        user = rng.choice(gateway.users)
+        emoji = "👍" if rng.random() < 0.8 else "👎"
+        if user.id in expected[tip_id]["👍"] or user.id in expected[tip_id]["👎"]:
+            continue
+        removed = rng.random() < 0.1
+        expected[tip_id][emoji].add(user.id)
+        if removed:
+            expected[tip_id][emoji].discard(user.id)
+        events.append((tip_id, user.id, emoji, removed))
+
+    latencies = []
+    errors = 0
+
+    async def react(tip_id, user_id, emoji, removed):
+        nonlocal errors
+        payload = types.SimpleNamespace(message_id=tip_id, user_id=user_id, emoji=emoji, guild_id=GUILD_ID, channel_id=TIP_VOTING_CHANNEL_ID)
+        start = time.perf_counter()
+        try:
+            await cog.on_raw_reaction_add(payload)
+            if removed:
+                await cog.on_raw_reaction_remove(payload)
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors += 1
+
+    start = time.perf_counter()
+    pending = []
+    for event in events:
+        pending.append(asyncio.create_task(react(*event)))
+        if args.rate > 0:
+            await asyncio.sleep(rng.expovariate(args.rate * 4))
+    await asyncio.gather(*pending)
+    await cog.writer.flush()
+    elapsed = time.perf_counter() - start
+
+    stored = await cog.tips.all()
+    lost_votes = 0
+    for tip_id, voters in expected.items():
+        entry = stored.get(tip_id, {})
+        lost_votes += abs(len(voters["👍"]) - entry.get("upvotes", 0)) + abs(len(voters["👎"]) - entry.get("downvotes", 0))
+    approved = sum(1 for entry in stored.values() if entry.get("approved"))
+    return summarize(latencies, elapsed, len(events), errors, lost_votes=lost_votes, approved_tips=approved)
+
+def button_callback(view, name: str):
+    # discord.py replaces decorated button methods with Button items on the view instance.
+    item = getattr(view, name)
+    if isinstance(item, types.MethodType):
+        return lambda interaction: item(interaction, None)
+    return item.callback
+
+async def replay_waitlist(client, gateway: FakeGateway, rng: random.Random, args) -> dict:
+    """Players hammering Join/Leave; latency is time to the ephemeral reply."""
+    channel = gateway.channels[WAITLIST_CHANNEL_ID]
+    signup = client.get_cog("Signup")
+    embed_message = channel.add(FakeMessage(channel, gateway.bot_user, ""))
+    client.waitlist_renderer.set_location(channel.id, embed_message.id)
+    join = button_callback(signup.view, "join_waitlist")
+    leave = button_callback(signup.view, "leave_waitlist")
+    players = rng.sample(gateway.users, min(args.waitlist_players, len(gateway.users)))
+    leavers = {player.id for player in players if rng.random() < args.waitlist_leave_share}
+    latencies = []
+    unanswered = 0
+    edits_before = gateway.rest.calls["message.edit"]
+
+    async def click(callback, player):
+        nonlocal unanswered
+        interaction = FakeInteraction(player, channel, gateway.rest)
+        start = time.perf_counter()
+        try:
+            await callback(interaction)
+        except Exception:
+            pass
+        if interaction.response.done_at is None:
+            unanswered += 1
+        else:
+            latencies.append(interaction.response.done_at - start)
+
+    async def player_session(player):
+        await asyncio.sleep(rng.uniform(0, args.waitlist_spread))
+        await click(join, player)
+        if player.id in leavers:
+            await asyncio.sleep(rng.uniform(0, args.waitlist_spread))
+            await click(leave, player)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(player_session(player) for player in players))
+    elapsed = time.perf_counter() - start
+    service = client.waitlist_service
+    await service.writer.flush()
+    # Let the renderer's coalesced edit land before counting edits.
+    await asyncio.sleep(client.waitlist_renderer.interval + args.rest_latency * 4)
+    expected = len(players) - len(leavers)
+    actual = len(service.members) + service.queued
+    return summarize(
+        latencies, elapsed, len(players) + len(leavers), unanswered,
+        lost_entries=abs(expected - actual),
+        embed_edits=gateway.rest.calls["message.edit"] - edits_before,
+    )
+
+async def replay_reminders(client, gateway: FakeGateway, rng: random.Random, args) -> dict:
+    """
+    Reminders due over --reminder-window seconds; latency is the signed delivery
+    lag behind schedule. Batching may deliver a reminder early, which shows up
+    as negative lag and in early_deliveries / max_early_ms.
+    """
+    from helpers.Repositories import ReminderRepository
+    from tasks.Reminder import ReminderScheduler
+    channel = gateway.channels[REMINDER_CHANNEL_ID]
+    repository = ReminderRepository(client.database)
+    scheduler = ReminderScheduler(client, repository)
+    now = time.time()
+    scheduled = {}
+    users = rng.sample(gateway.users, min(args.reminders, len(gateway.users)))
+    for user in users:
+        fire_at = now + 1 + rng.uniform(0, args.reminder_window)
+        scheduled[user.id] = fire_at
+        # A daily reminder, so each one fires exactly once during the run.
+        await repository.upsert(user.id, {"time": "0000", "timezone": "UTC", "frequency": 1, "last_reminded": "", "next_fire": fire_at})
+    await scheduler.load()
+    sent_before = len(channel.sent)
+    start = time.perf_counter()
+    runner = asyncio.create_task(scheduler.run(channel))
+    deadline = time.time() + args.reminder_window + 15
+    delivered = {}
+    while time.time() < deadline and len(delivered) < len(scheduled):
+        await asyncio.sleep(0.2)
+        for _, message in channel.sent[sent_before:]:
+            for token in message.content.split():
+                if token.startswith("<@") and token.endswith(">"):
+                    user_id = int(token[2:-1])
+                    delivered.setdefault(user_id, message.created_at.timestamp())
+    runner.cancel()
+    elapsed = time.perf_counter() - start
+    lags = [delivered[user_id] - scheduled[user_id] for user_id in delivered if user_id in scheduled]
+    early = [-lag for lag in lags if lag < 0]
+    return summarize(
+        lags, elapsed, len(scheduled), len(scheduled) - len(lags),
+        early_deliveries=len(early),
+        max_early_ms=round(max(early) * 1000, 2) if early else 0.0,
+        messages_sent=len(channel.sent) - sent_before
+    )
+
+# ----- Setup -----
+
+async def build_client(args, directory: Path, rng: random.Random):
+    import discord
+    import openai
+    from helpers.Storage import Database
+    import bot
+    import tasks.AIHelper as ai_module
+    import tasks.AutoModeration as moderation_module
+    from tasks.AIHelper import AIHelper
+    from tasks.AutoModeration import AutoModeration
+    from cogs.Tips import Tips
+    from cogs.Guild.Signup import Signup
+
+    client = bot.Client(database=Database(directory / "replay.db"))
+    rest = FakeRest(discord, rng, args.rest_latency, args.rest_jitter, args.rest_429, args.retry_after)
+    gateway = FakeGateway(rest, client._connection, args.members)
+    # Route the client's cache and lookups to the simulated guild; it never logs in.
+    client._connection.user = gateway.bot_user
+    client.get_channel = gateway.get_channel
+    client.get_user = gateway.get_user
+    client.fetch_user = gateway.fetch_user
+    client.get_guild = lambda guild_id: gateway.guild if guild_id == GUILD_ID else None
+
+    async def ready():
+        return None
+
+    client.wait_until_ready = ready
+
+    service = FakeOpenAIService(rng, args.openai_latency, args.moderation_latency, args.openai_429, args.flag_rate)
+    openai.AsyncOpenAI = service.async_client
+    moderation_module.OpenAI = service.sync_client
+    ai_module.chromadb = FakeChroma(args.chroma_latency)
+
+    ai_helper = AIHelper(client)
+    ai_helper.embeddings = FakeEmbeddings()
+    for cog in (ai_helper, AutoModeration(client), Tips(client), Signup(client)):
+        await client.add_cog(cog)
+    return client, gateway, service
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as temp:
+        directory = Path(temp)
+        # The shared settings must point at the simulated guild before bot.py is imported.
+        from helpers.Settings import get_settings
+        get_settings(build_settings(args, directory))
+        from helpers.Logger import Logger
+        client, gateway, service = await build_client(args, directory, rng)
+        Logger.set_level(args.log_level)
+
+        report = {"seed": args.seed, "config": {key: value for key, value in vars(args).items() if key != "output"}}
+        scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+        runners = {"messages": replay_messages, "tips": replay_tips, "waitlist": replay_waitlist, "reminders": replay_reminders}
+        for name in scenarios:
+            if name not in runners:
+                raise SystemExit(f"Unknown scenario: {name} (choose from {', '.join(runners)})")
+            report[name] = await runners[name](client, gateway, rng, args)
+            print(f"{name}: {json.dumps(report[name])}", file=sys.stderr)
+        report["rest_calls"] = dict(gateway.rest.calls)
+        report["rest_rate_limited"] = dict(gateway.rest.rate_limited)
+        report["openai_calls"] = dict(service.calls)
+        report["openai_rate_limited"] = dict(service.rate_limited)
+        for cog_name in ("Tips", "Signup"):
+            await client.remove_cog(cog_name)
+        await client.dispatcher.close()
+        client.database.close()
+        return report
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(prog="python -m tools.replay", description="Offline load test for the bot's event handlers.")
+    parser.add_argument("--scenarios", default="messages,tips,waitlist,reminders")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--members", type=int, default=2000, help="simulated guild members")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=50.0, help="message arrivals per second (0 = as fast as possible)")
+    parser.add_argument("--ai-share", type=float, default=0.1, help="fraction of messages sent in the AI channel")
+    parser.add_argument("--handler-timeout", type=float, default=60.0)
+    parser.add_argument("--rest-latency", type=float, default=0.05, help="mean Discord REST latency (s)")
+    parser.add_argument("--rest-jitter", type=float, default=0.02)
+    parser.add_argument("--rest-429", type=float, default=0.0, help="probability a REST call is rate limited")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After of injected 429s (s)")
+    parser.add_argument("--openai-latency", type=float, default=1.5, help="mean chat completion latency (s)")
+    parser.add_argument("--moderation-latency", type=float, default=0.2)
+    parser.add_argument("--openai-429", type=float, default=0.0, help="probability an OpenAI call is rate limited")
+    parser.add_argument("--flag-rate", type=float, default=0.02, help="fraction of messages moderation flags")
+    parser.add_argument("--chroma-latency", type=float, default=0.05)
+    parser.add_argument("--tips", type=int, default=20)
+    parser.add_argument("--reactions", type=int, default=1000)
+    parser.add_argument("--tip-min-votes", type=int, default=5)
+    parser.add_argument("--waitlist-players", type=int, default=200)
+    parser.add_argument("--waitlist-capacity", type=int, default=30)
+    parser.add_argument("--waitlist-leave-share", type=float, default=0.3)
+    parser.add_argument("--waitlist-spread", type=float, default=2.0, help="seconds over which clicks are spread")
+    parser.add_argument("--reminders", type=int, default=500)
+    parser.add_argument("--reminder-window", type=float, default=10.0, help="seconds over which reminders fall due")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=4, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()